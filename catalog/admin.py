@@ -3,7 +3,9 @@ from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse
-from .models import Brand, Tire, Disk, Supplier
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Brand, Tire, Disk, Supplier, OutboxEmail
 
 import json
 import uuid
@@ -12,9 +14,21 @@ import tempfile
 import os
 
 
+def _supplier_product_count(model, **filters):
+    """COUNT of a supplier's products as a correlated subquery (NULL -> 0)"""
+    counts = (
+        model.objects.filter(supplier=OuterRef("pk"), **filters)
+        .order_by().values("supplier").annotate(count=Count("id")).values("count")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
-    list_display = ["name", "code", "is_preorder", "markup_percent", "delivery_days", "is_active", "product_count"]
+    list_display = [
+        "name", "code", "is_preorder", "markup_percent", "delivery_days", "is_active",
+        "tire_count", "tire_in_stock", "disk_count", "disk_in_stock",
+    ]
     list_filter = ["is_preorder", "is_active"]
     search_fields = ["name", "code"]
     list_editable = ["markup_percent", "delivery_days", "is_active"]
@@ -35,23 +49,48 @@ class SupplierAdmin(admin.ModelAdmin):
         }),
     )
 
-    def product_count(self, obj):
-        tires = obj.tires.count()
-        disks = obj.disks.count()
-        return f"{tires} шин, {disks} дисків"
-    product_count.short_description = "Товарів"
+    def get_queryset(self, request):
+        # All four counts come with the supplier rows, in the changelist's
+        # single SELECT, instead of two COUNT queries per row. Subqueries
+        # rather than joins: joining tires and disks together would
+        # multiply the rows.
+        return super().get_queryset(request).annotate(
+            tire_count=_supplier_product_count(Tire),
+            tire_in_stock=_supplier_product_count(Tire, in_stock=True),
+            disk_count=_supplier_product_count(Disk),
+            disk_in_stock=_supplier_product_count(Disk, in_stock=True),
+        )
+
+    @admin.display(description="Шин", ordering="tire_count")
+    def tire_count(self, obj):
+        return obj.tire_count
+
+    @admin.display(description="Шин в наявності", ordering="tire_in_stock")
+    def tire_in_stock(self, obj):
+        return obj.tire_in_stock
+
+    @admin.display(description="Дисків", ordering="disk_count")
+    def disk_count(self, obj):
+        return obj.disk_count
+
+    @admin.display(description="Дисків в наявності", ordering="disk_in_stock")
+    def disk_in_stock(self, obj):
+        return obj.disk_in_stock
 
     @admin.action(description="Перерахувати ціни для обраних постачальників")
     def recalculate_prices(self, request, queryset):
         from .import_service import recalculate_prices_for_supplier
+        from .versions import defer_bumps
 
         total_tires = 0
         total_disks = 0
 
-        for supplier in queryset:
-            tires, disks = recalculate_prices_for_supplier(supplier)
-            total_tires += tires
-            total_disks += disks
+        # One bump (and one feed publish) for all the suppliers
+        with defer_bumps():
+            for supplier in queryset:
+                tires, disks = recalculate_prices_for_supplier(supplier)
+                total_tires += tires
+                total_disks += disks
 
         self.message_user(
             request,
@@ -71,7 +110,7 @@ class BrandAdmin(admin.ModelAdmin):
 class TireAdmin(admin.ModelAdmin):
     list_display = [
         "article",
-        "brand",
+        "brand_name",
         "model_name",
         "width",
         "profile",
@@ -85,7 +124,7 @@ class TireAdmin(admin.ModelAdmin):
         "supplier",
     ]
     list_filter = ["brand", "season", "studded", "in_stock", "is_featured", "diameter", "supplier"]
-    search_fields = ["model_name", "article", "brand__name"]
+    search_fields = ["model_name", "article", "brand_name"]
     prepopulated_fields = {"slug": ("model_name",)}
     list_editable = ["price", "is_featured", "studded"]
     raw_id_fields = ["supplier"]
@@ -95,7 +134,7 @@ class TireAdmin(admin.ModelAdmin):
 class DiskAdmin(admin.ModelAdmin):
     list_display = [
         "article",
-        "brand",
+        "brand_name",
         "model_name",
         "diameter",
         "width",
@@ -110,12 +149,30 @@ class DiskAdmin(admin.ModelAdmin):
         "supplier",
     ]
     list_filter = ["brand", "disk_type", "in_stock", "is_featured", "diameter", "bolts", "supplier"]
-    search_fields = ["model_name", "article", "brand__name"]
+    search_fields = ["model_name", "article", "brand_name"]
     prepopulated_fields = {"slug": ("model_name",)}
     list_editable = ["price", "is_featured"]
     raw_id_fields = ["supplier"]
 
 
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ["subject", "recipients", "status", "attempts", "created_at", "sent_at"]
+    list_filter = ["status"]
+    search_fields = ["subject", "recipients"]
+    readonly_fields = ["created_at", "sent_at", "last_error"]
+    actions = ["retry_now"]
+
+    @admin.action(description="Надіслати повторно")
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+
+        count = queryset.exclude(status=OutboxEmail.STATUS_SENT).update(
+            status=OutboxEmail.STATUS_PENDING, attempts=0, send_after=timezone.now()
+        )
+        messages.success(request, f"Поставлено в чергу: {count}")
+
+
 # Custom Admin Site with import functionality
 class CatalogAdminSite(admin.AdminSite):
     site_header = "КМ/Ч 120 - Адміністрування"
@@ -175,6 +232,7 @@ class CatalogAdminSite(admin.AdminSite):
     def _run_import(self, task_id, file_path, import_type):
         import django
         django.setup()
+        from .alternatives import publish_groups
         from .import_service import import_tires, import_disks
 
         def progress_callback(info):
@@ -195,6 +253,10 @@ class CatalogAdminSite(admin.AdminSite):
             else:
                 result = import_disks(file_path, progress_callback=progress_callback)
 
+            # Detail page alternatives for the version the import just bumped;
+            # the price feeds are republished by the versions_bumped handler
+            publish_groups()
+
             self._write_progress(task_id, {
                 'status': 'completed',
                 'current': result['total_rows'],
@@ -303,14 +365,16 @@ class CatalogAdminSite(admin.AdminSite):
 
     def recalculate_all_prices_view(self, request):
         from .import_service import recalculate_prices_for_supplier
+        from .versions import defer_bumps
 
         total_tires = 0
         total_disks = 0
 
-        for supplier in Supplier.objects.filter(is_active=True):
-            tires, disks = recalculate_prices_for_supplier(supplier)
-            total_tires += tires
-            total_disks += disks
+        with defer_bumps():
+            for supplier in Supplier.objects.filter(is_active=True):
+                tires, disks = recalculate_prices_for_supplier(supplier)
+                total_tires += tires
+                total_disks += disks
 
         messages.success(request, f"Ціни перераховано: {total_tires} шин, {total_disks} дисків")
         return redirect('admin:import_prices')
@@ -338,12 +402,33 @@ class CatalogAdminSite(admin.AdminSite):
         return render(request, 'admin/catalog/error_logs.html', {'logs': logs})
 
     def xml_feeds_view(self, request):
-        base_url = request.build_absolute_uri('/').rstrip('/')
+        from django.conf import settings
+        from .feed_formats import FORMATS
+        from .feeds import feed_variants, publish_feeds
+
+        if request.method == 'POST' and request.POST.get('action') == 'publish':
+            count = publish_feeds()
+            messages.success(request, f"Фіди оновлено: {count}")
+            return redirect('admin:xml_feeds')
+
+        base_url = settings.SITE_URL.rstrip('/')
         suppliers = Supplier.objects.filter(is_active=True).order_by('name')
+        supplier_names = dict(Supplier.objects.values_list('id', 'name'))
+
+        variants = feed_variants()
+        for variant in variants:
+            params = variant['params']
+            variant['format_title'] = FORMATS[params['format']].title
+            variant['supplier_names'] = [supplier_names.get(pk, pk) for pk in params['suppliers']]
 
         return render(request, 'admin/catalog/xml_feeds.html', {
             'base_url': base_url,
             'suppliers': suppliers,
+            'formats': [
+                (name, writer.title, '/feed/price.xml' if name == 'ekatalog' else f'/feed/{name}.xml')
+                for name, writer in FORMATS.items()
+            ],
+            'variants': variants,
         })
 
 
@@ -0,0 +1,121 @@
+"""
+Same-size alternatives for the tire and disk detail pages.
+
+In-stock products are grouped by size_key, cheapest first, and the
+groups are published as a JSON file under CATALOG_STATE_DIR tagged with
+the catalog version (after each import, or by the first worker that
+sees a newer version), as [id, brand id, price] entries:
+
+    {"tires": {"205/55R16": [[12, 3, "2100.00"], ...]}, "disks": {...}}
+
+Each worker loads the file once per catalog version. Picking the
+alternatives for a product is then a lookup in its group plus one
+in_bulk() query for the chosen ids.
+"""
+import json
+import os
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import Disk, Tire
+from .versions import get_version, CATALOG
+
+GROUPS_FILE = "size-groups.json"
+
+# Products shown per section on a detail page
+PER_SECTION = 4
+
+MODELS = {"tires": Tire, "disks": Disk}
+
+_groups = None
+_groups_version = None
+_lock = threading.Lock()
+
+
+def _groups_path():
+    return os.path.join(settings.CATALOG_STATE_DIR, GROUPS_FILE)
+
+
+def build_groups():
+    """{kind: {size_key: [[id, brand_id, price], ...]}}, one query per product type"""
+    groups = {}
+    for kind, model in MODELS.items():
+        by_size = groups[kind] = {}
+        rows = (
+            model.objects.filter(in_stock=True)
+            .order_by("size_key", "price", "id")
+            .values_list("size_key", "id", "brand_id", "price")
+        )
+        for size_key, pk, brand_id, price in rows.iterator(chunk_size=5000):
+            by_size.setdefault(size_key, []).append([pk, brand_id, str(price)])
+    return groups
+
+
+def publish_groups():
+    """Build the groups for the current catalog version and write them atomically"""
+    version = get_version(CATALOG)
+    groups = build_groups()
+    os.makedirs(settings.CATALOG_STATE_DIR, exist_ok=True)
+    path = _groups_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "groups": groups}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return groups
+
+
+def _load(version):
+    try:
+        with open(_groups_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == version:
+            return data["groups"]
+    except (FileNotFoundError, ValueError):
+        pass
+    return publish_groups()
+
+
+def get_groups():
+    """Process-wide size groups of the current catalog version"""
+    global _groups, _groups_version
+    version = get_version(CATALOG)
+    if _groups is None or _groups_version != version:
+        with _lock:
+            if _groups is None or _groups_version != version:
+                _groups = _load(version)
+                _groups_version = version
+    return _groups
+
+
+def alternatives(product):
+    """
+    In-stock products of the same size for a Tire or Disk:
+        "other_brands": one per other brand, closest in price
+        "cheaper" / "pricier": nearest in price, not already listed
+    Runs one query (none when the size has no other products).
+    """
+    kind = "tires" if isinstance(product, Tire) else "disks"
+    group = get_groups()[kind].get(product.size_key, [])
+    others = [(pk, brand_id, Decimal(price)) for pk, brand_id, price in group if pk != product.pk]
+    if not others:
+        return {"other_brands": [], "cheaper": [], "pricier": []}
+
+    by_distance = sorted(others, key=lambda entry: abs(entry[2] - product.price))
+    other_brands = []
+    brands_seen = {product.brand_id}
+    for pk, brand_id, _ in by_distance:
+        if brand_id not in brands_seen and len(other_brands) < PER_SECTION:
+            brands_seen.add(brand_id)
+            other_brands.append(pk)
+
+    rest = [entry for entry in others if entry[0] not in other_brands]
+    cheaper = [pk for pk, _, price in reversed(rest) if price < product.price][:PER_SECTION]
+    pricier = [pk for pk, _, price in rest if price > product.price][:PER_SECTION]
+
+    products = MODELS[kind].objects.in_bulk(other_brands + cheaper + pricier)
+    return {
+        name: [products[pk] for pk in ids if pk in products]
+        for name, ids in (("other_brands", other_brands), ("cheaper", cheaper), ("pricier", pricier))
+    }
@@ -0,0 +1,184 @@
+"""
+Cart storage and contents for the cart, checkout and order views.
+
+A cart only stores ids, quantities and the running item count:
+    {"tires": {"12": 4}, "disks": {"7": 4}, "count": 8}
+
+With CART_STORAGE = "cookie" (the default) it lives in a signed,
+compressed cookie, so reading the cart or its count never touches the
+database. CART_STORAGE = "session" keeps it in the session as before.
+The count is adjusted on every change rather than recomputed.
+
+hydrate_cart() loads the products with one in_bulk() query per product
+type (brand and supplier joined in), so a cart costs the same number of
+queries whatever its size.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+
+from .models import Tire, Disk
+from .page_cache import CART_COUNT_COOKIE
+
+CART_COOKIE = "cart"
+CART_SALT = "catalog.cart"
+
+# Keeps the signed cookie well under the 4 KB browser limit
+MAX_LINES = 100
+
+# cart key -> (model, item type)
+PRODUCT_TYPES = {
+    "tires": (Tire, "tire"),
+    "disks": (Disk, "disk"),
+}
+
+
+def empty_cart():
+    return {"tires": {}, "disks": {}, "count": 0}
+
+
+def _count(cart):
+    return sum(sum(cart.get(key, {}).values()) for key in PRODUCT_TYPES)
+
+
+def cart_item_count(cart):
+    """Total number of pieces in the cart"""
+    if "count" not in cart:
+        # Carts saved before the count was kept
+        cart["count"] = _count(cart)
+    return cart["count"]
+
+
+def _use_cookie():
+    return getattr(settings, "CART_STORAGE", "cookie") == "cookie"
+
+
+def _encode(cart):
+    payload = {"t": cart["tires"], "d": cart["disks"], "n": cart_item_count(cart)}
+    return signing.dumps(payload, salt=CART_SALT, compress=True)
+
+
+def _decode(value):
+    payload = signing.loads(value, salt=CART_SALT)
+    return {"tires": payload["t"], "disks": payload["d"], "count": payload["n"]}
+
+
+def _load(request):
+    if _use_cookie():
+        value = request.COOKIES.get(CART_COOKIE)
+        if value:
+            try:
+                return _decode(value)
+            except (signing.BadSignature, KeyError, TypeError):
+                return empty_cart()
+        # A cart left in the session by the session storage; it moves
+        # into the cookie on the next change
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return empty_cart()
+
+    cart = request.session.get("cart")
+    if not cart:
+        return empty_cart()
+    cart_item_count(cart)
+    return cart
+
+
+def get_cart(request):
+    """The visitor's cart, loaded once per request"""
+    if not hasattr(request, "_cart"):
+        request._cart = _load(request)
+    return request._cart
+
+
+def save_cart(request, cart):
+    """Store the cart; the cookies are written by set_cart_cookies()"""
+    request._cart = cart
+    request._cart_changed = True
+    if not _use_cookie():
+        request.session["cart"] = cart
+        request.session.modified = True
+    elif settings.SESSION_COOKIE_NAME in request.COOKIES and "cart" in request.session:
+        del request.session["cart"]
+
+
+def set_quantity(cart, key, product_id, quantity):
+    """Set a line's quantity (0 removes it) and adjust the count"""
+    lines = cart[key]
+    product_id = str(product_id)
+    previous = lines.get(product_id, 0)
+    if quantity > 0:
+        if previous == 0 and sum(len(cart[k]) for k in PRODUCT_TYPES) >= MAX_LINES:
+            raise ValueError("Забагато позицій у кошику")
+        lines[product_id] = quantity
+    else:
+        lines.pop(product_id, None)
+        quantity = 0
+    cart["count"] = cart_item_count(cart) + quantity - previous
+
+
+def set_cart_cookies(request, response):
+    """
+    Write the cart (cookie storage) and the item count cookie that lets
+    non-empty carts bypass the page cache.
+    """
+    if not getattr(request, "_cart_changed", False):
+        return response
+    cart = get_cart(request)
+    cookie_args = {
+        "max_age": settings.SESSION_COOKIE_AGE,
+        "samesite": "Lax",
+        "secure": settings.SESSION_COOKIE_SECURE,
+    }
+    count = cart_item_count(cart)
+    if _use_cookie():
+        if count:
+            response.set_cookie(CART_COOKIE, _encode(cart), httponly=True, **cookie_args)
+        else:
+            response.delete_cookie(CART_COOKIE, samesite="Lax")
+    response.set_cookie(CART_COUNT_COOKIE, str(count), **cookie_args)
+    return response
+
+
+def _order_line_name(product, item_type):
+    if item_type == "tire":
+        return f"{product.brand_name} {product.model_name} {product.width}/{product.profile} R{product.diameter}"
+    return f"{product.brand_name} {product.model_name} {product.width}x{product.diameter}"
+
+
+def hydrate_cart(cart):
+    """
+    Load cart products and compute totals.
+    Returns {"items": [...], "total": Decimal, "item_count": int}; products
+    that no longer exist are left out.
+    """
+    items = []
+    for key, (model, item_type) in PRODUCT_TYPES.items():
+        quantities = {}
+        for product_id, qty in cart.get(key, {}).items():
+            try:
+                quantities[int(product_id)] = qty
+            except (TypeError, ValueError):
+                continue
+        if not quantities:
+            continue
+
+        products = model.objects.select_related("brand", "supplier").in_bulk(list(quantities))
+        for product_id, qty in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                continue
+            items.append({
+                "product": product,
+                "type": item_type,
+                "name": _order_line_name(product, item_type),
+                "price": product.price,
+                "quantity": qty,
+                "total": product.price * qty,
+            })
+
+    return {
+        "items": items,
+        "total": sum((item["total"] for item in items), Decimal(0)),
+        "item_count": cart_item_count(cart),
+    }
@@ -0,0 +1,90 @@
+"""
+In-stock tire sizes equivalent to a given size.
+
+Two sizes are interchangeable when their overall diameters (rim plus
+both sidewalls) are close; ±3% is the usual limit for speedometer error
+and clearance. Each worker keeps the distinct in-stock sizes as numpy
+arrays, with their product count and lowest price, built with one
+grouped query per catalog version. A lookup is then a single vectorized
+comparison over a few hundred sizes instead of a scan of the products.
+"""
+import threading
+
+import numpy as np
+from django.db.models import Count, Min
+
+from .models import Tire
+from .versions import get_version, CATALOG
+
+DEFAULT_TOLERANCE = 3.0  # percent
+MAX_TOLERANCE = 10.0
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def overall_diameter(width, profile, diameter):
+    """Overall tire diameter in mm; works on scalars and numpy arrays"""
+    return diameter * 25.4 + 2 * width * profile / 100
+
+
+def _build():
+    rows = list(
+        Tire.objects.filter(in_stock=True).order_by()
+        .values_list("width", "profile", "diameter")
+        .annotate(count=Count("id"), min_price=Min("price"))
+    )
+    widths = np.array([row[0] for row in rows], dtype=np.float64)
+    profiles = np.array([row[1] for row in rows], dtype=np.float64)
+    diameters = np.array([row[2] for row in rows], dtype=np.float64)
+    return {
+        "sizes": [row[:3] for row in rows],
+        "counts": [row[3] for row in rows],
+        "min_prices": [row[4] for row in rows],
+        "overall": overall_diameter(widths, profiles, diameters),
+    }
+
+
+def get_index():
+    """Distinct in-stock sizes of the current catalog version"""
+    global _index, _index_version
+    version = get_version(CATALOG)
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                _index = _build()
+                _index_version = version
+    return _index
+
+
+def equivalent_sizes(width, profile, diameter, tolerance=DEFAULT_TOLERANCE):
+    """
+    In-stock sizes whose overall diameter is within `tolerance` percent of
+    the given size, closest first:
+        [{"width": 215, "profile": 50, "diameter": 17, "difference": 0.6,
+          "count": 12, "min_price": Decimal(...)}, ...]
+    The size itself is included (difference 0) when it is in stock.
+    """
+    index = get_index()
+    if not index["sizes"]:
+        return []
+
+    target = overall_diameter(width, profile, diameter)
+    differences = (index["overall"] - target) / target * 100
+    matches = np.flatnonzero(np.abs(differences) <= tolerance)
+    matches = matches[np.argsort(np.abs(differences[matches]), kind="stable")]
+
+    results = []
+    for i in matches.tolist():
+        size_width, size_profile, size_diameter = index["sizes"][i]
+        results.append({
+            "width": size_width,
+            "profile": size_profile,
+            "diameter": size_diameter,
+            "overall_diameter": round(float(index["overall"][i]), 1),
+            "difference": round(float(differences[i]), 2),
+            "count": index["counts"][i],
+            "min_price": index["min_prices"][i],
+        })
+    return results
@@ -0,0 +1,53 @@
+"""
+Products for the home page.
+
+Products marked is_featured are shown when there are any; otherwise a
+random sample of in-stock products is shown instead. Sampling picks
+random ids from a per-process id pool (rebuilt when the catalog version
+changes) and loads just those rows, instead of ORDER BY RANDOM() which
+sorts the whole in-stock table on every hit.
+"""
+import random
+import threading
+from array import array
+
+from .models import Tire, Disk
+from .versions import get_version, CATALOG
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _in_stock_ids(model):
+    """Ids of in-stock products, cached per catalog version"""
+    version = get_version(CATALOG)
+    cached = _pools.get(model)
+    if cached is None or cached[0] != version:
+        with _lock:
+            cached = _pools.get(model)
+            if cached is None or cached[0] != version:
+                # Answered from the in_stock partial index
+                ids = model.objects.filter(in_stock=True).order_by().values_list("id", flat=True)
+                cached = (version, array("q", ids))
+                _pools[model] = cached
+    return cached[1]
+
+
+def _featured(model, count):
+    products = list(model.objects.filter(is_featured=True).select_related("supplier")[:count])
+    if products:
+        return products
+
+    pool = _in_stock_ids(model)
+    # Sample a few extra ids to cover rows deleted since the pool was built
+    ids = random.sample(pool, min(len(pool), count + 4))
+    by_id = model.objects.select_related("supplier").in_bulk(ids)
+    return [by_id[pk] for pk in ids if pk in by_id][:count]
+
+
+def featured_tires(count=8):
+    return _featured(Tire, count)
+
+
+def featured_disks(count=8):
+    return _featured(Disk, count)
@@ -0,0 +1,318 @@
+"""
+Marketplace formats of the price feeds.
+
+A format is a FeedWriter subclass registered with @register. Writers do
+not query anything: catalog/feeds.py reads the catalog once and hands
+every product row to each writer that needs it, so adding a format does
+not add a catalog scan. Rows are value tuples in TIRE_FIELDS or
+DISK_FIELDS order.
+"""
+from django.conf import settings
+
+SEASON_LABELS = {'summer': 'Літня', 'winter': 'Зимова', 'all_season': 'Всесезонна'}
+DISK_TYPE_LABELS = {'alloy': 'Литий', 'steel': 'Сталевий', 'forged': 'Кований'}
+
+# Columns read for the feeds; writers unpack rows in this order
+COMMON_FIELDS = ('id', 'slug', 'article', 'price', 'in_stock', 'supplier_id', 'image', 'brand_id', 'model_name')
+TIRE_FIELDS = COMMON_FIELDS + ('width', 'profile', 'diameter', 'season')
+DISK_FIELDS = COMMON_FIELDS + ('width', 'diameter', 'bolts', 'pcd', 'et', 'disk_type')
+IN_STOCK = COMMON_FIELDS.index('in_stock')
+SUPPLIER = COMMON_FIELDS.index('supplier_id')
+
+SHOP_NAME = 'КМ/Ч 120'
+
+FORMATS = {}
+
+
+def register(writer):
+    """Class decorator adding a FeedWriter to FORMATS under its name"""
+    FORMATS[writer.name] = writer
+    return writer
+
+
+def escape_xml(text):
+    """Escape special XML characters"""
+    if not text:
+        return ""
+    text = str(text)
+    text = text.replace('&', '&amp;')
+    text = text.replace('<', '&lt;')
+    text = text.replace('>', '&gt;')
+    text = text.replace('"', '&quot;')
+    text = text.replace("'", '&apos;')
+    return text
+
+
+class FeedWriter:
+    """
+    One marketplace format. For each feed, header() is written first,
+    then tire() or disk() for every product row, then footer(). Delta
+    feeds also get removed() for offers to take down.
+
+        name      URL slug, served at feed/<name>.xml
+        title     shown in the admin
+        filename  Content-Disposition name, "<name>.xml" by default
+
+    `brands` maps brand ids to escaped names; `escape` is escape_xml with
+    its results cached for the pass.
+    """
+    name = ''
+    title = ''
+    filename = None
+
+    def __init__(self, base_url, brands, escape, now):
+        self.base_url = base_url
+        self.brands = brands
+        self.escape = escape
+        self.now = now
+
+    def header(self):
+        return ''
+
+    def tire(self, row):
+        raise NotImplementedError
+
+    def disk(self, row):
+        raise NotImplementedError
+
+    def removed(self, offer_id):
+        """Delta feeds: the offer is gone or no longer part of the feed"""
+        raise NotImplementedError
+
+    def footer(self):
+        return ''
+
+
+class YMLWriter(FeedWriter):
+    """Yandex Market Language offers"""
+    vendor_code = False
+
+    def header(self):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<yml_catalog date="{self.now:%Y-%m-%d %H:%M}">\n'
+            '<shop>\n'
+            f'<name>{SHOP_NAME}</name>\n'
+            f'<company>{SHOP_NAME}</company>\n'
+            f'<url>{self.base_url}</url>\n'
+            '<currencies>\n<currency id="UAH" rate="1"/>\n</currencies>\n'
+            '<categories>\n'
+            '<category id="1">Шини</category>\n'
+            '<category id="2">Диски</category>\n'
+            '</categories>\n'
+            '<offers>\n'
+        )
+
+    def tire(self, row):
+        pk, slug, article, price, in_stock, _, image, brand_id, model_name, width, profile, diameter, season = row
+        base_url = self.base_url
+        vendor = self.brands.get(brand_id, '')
+        picture = f'<picture>{base_url}/media/{image}</picture>\n' if image else ''
+        vendor_code = f'<vendorCode>{self.escape(article)}</vendorCode>\n' if self.vendor_code else ''
+        return (
+            f'<offer id="tire_{pk}" available="{"true" if in_stock else "false"}">\n'
+            f'<url>{base_url}/tires/{slug}/</url>\n'
+            f'<price>{int(price)}</price>\n'
+            '<currencyId>UAH</currencyId>\n'
+            '<categoryId>1</categoryId>\n'
+            f'{picture}'
+            f'<name>{vendor} {self.escape(model_name)} {width}/{profile} R{diameter}</name>\n'
+            f'<vendor>{vendor}</vendor>\n'
+            f'{vendor_code}'
+            f'<param name="Ширина">{width}</param>\n'
+            f'<param name="Профіль">{profile}</param>\n'
+            f'<param name="Діаметр">{diameter}</param>\n'
+            f'<param name="Сезон">{SEASON_LABELS.get(season, "")}</param>\n'
+            '</offer>\n'
+        )
+
+    def disk(self, row):
+        pk, slug, article, price, in_stock, _, image, brand_id, model_name, width, diameter, bolts, pcd, et, disk_type = row
+        base_url = self.base_url
+        vendor = self.brands.get(brand_id, '')
+        picture = f'<picture>{base_url}/media/{image}</picture>\n' if image else ''
+        vendor_code = f'<vendorCode>{self.escape(article)}</vendorCode>\n' if self.vendor_code else ''
+        return (
+            f'<offer id="disk_{pk}" available="{"true" if in_stock else "false"}">\n'
+            f'<url>{base_url}/disks/{slug}/</url>\n'
+            f'<price>{int(price)}</price>\n'
+            '<currencyId>UAH</currencyId>\n'
+            '<categoryId>2</categoryId>\n'
+            f'{picture}'
+            f'<name>{vendor} {self.escape(model_name)} {width}x{diameter} {bolts}x{pcd}</name>\n'
+            f'<vendor>{vendor}</vendor>\n'
+            f'{vendor_code}'
+            f'<param name="Діаметр">{diameter}</param>\n'
+            f'<param name="Ширина">{width}</param>\n'
+            f'<param name="PCD">{bolts}x{pcd}</param>\n'
+            f'<param name="ET">{et}</param>\n'
+            f'<param name="Тип">{DISK_TYPE_LABELS.get(disk_type, "")}</param>\n'
+            '</offer>\n'
+        )
+
+    def removed(self, offer_id):
+        return f'<offer id="{offer_id}" available="false"/>\n'
+
+    def footer(self):
+        return '</offers>\n</shop>\n</yml_catalog>\n'
+
+
+@register
+class EKatalogWriter(YMLWriter):
+    name = 'ekatalog'
+    title = 'E-Katalog'
+    filename = 'price.xml'
+
+
+@register
+class PromWriter(YMLWriter):
+    name = 'prom'
+    title = 'Prom.ua'
+    vendor_code = True
+
+
+@register
+class HotlineWriter(FeedWriter):
+    """Hotline.ua price list; the shop's Hotline id comes from HOTLINE_FIRM_ID"""
+    name = 'hotline'
+    title = 'Hotline'
+
+    def header(self):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<price>\n'
+            f'<date>{self.now:%Y-%m-%d %H:%M}</date>\n'
+            f'<firmName>{SHOP_NAME}</firmName>\n'
+            f'<firmId>{escape_xml(getattr(settings, "HOTLINE_FIRM_ID", ""))}</firmId>\n'
+            '<categories>\n'
+            '<category>\n<id>1</id>\n<name>Шини</name>\n</category>\n'
+            '<category>\n<id>2</id>\n<name>Диски</name>\n</category>\n'
+            '</categories>\n'
+            '<items>\n'
+        )
+
+    def tire(self, row):
+        pk, slug, article, price, in_stock, _, image, brand_id, model_name, width, profile, diameter, season = row
+        base_url = self.base_url
+        vendor = self.brands.get(brand_id, '')
+        image = f'<image>{base_url}/media/{image}</image>\n' if image else ''
+        return (
+            '<item>\n'
+            f'<id>tire_{pk}</id>\n'
+            '<categoryId>1</categoryId>\n'
+            f'<code>{self.escape(article)}</code>\n'
+            f'<vendor>{vendor}</vendor>\n'
+            f'<name>{self.escape(model_name)} {width}/{profile} R{diameter}</name>\n'
+            f'<url>{base_url}/tires/{slug}/</url>\n'
+            f'{image}'
+            f'<priceRUAH>{int(price)}</priceRUAH>\n'
+            f'<stock>{"В наявності" if in_stock else "Під замовлення"}</stock>\n'
+            f'<param name="Ширина">{width}</param>\n'
+            f'<param name="Профіль">{profile}</param>\n'
+            f'<param name="Діаметр">{diameter}</param>\n'
+            f'<param name="Сезон">{SEASON_LABELS.get(season, "")}</param>\n'
+            '</item>\n'
+        )
+
+    def disk(self, row):
+        pk, slug, article, price, in_stock, _, image, brand_id, model_name, width, diameter, bolts, pcd, et, disk_type = row
+        base_url = self.base_url
+        vendor = self.brands.get(brand_id, '')
+        image = f'<image>{base_url}/media/{image}</image>\n' if image else ''
+        return (
+            '<item>\n'
+            f'<id>disk_{pk}</id>\n'
+            '<categoryId>2</categoryId>\n'
+            f'<code>{self.escape(article)}</code>\n'
+            f'<vendor>{vendor}</vendor>\n'
+            f'<name>{self.escape(model_name)} {width}x{diameter} {bolts}x{pcd}</name>\n'
+            f'<url>{base_url}/disks/{slug}/</url>\n'
+            f'{image}'
+            f'<priceRUAH>{int(price)}</priceRUAH>\n'
+            f'<stock>{"В наявності" if in_stock else "Під замовлення"}</stock>\n'
+            f'<param name="Діаметр">{diameter}</param>\n'
+            f'<param name="Ширина">{width}</param>\n'
+            f'<param name="PCD">{bolts}x{pcd}</param>\n'
+            f'<param name="ET">{et}</param>\n'
+            f'<param name="Тип">{DISK_TYPE_LABELS.get(disk_type, "")}</param>\n'
+            '</item>\n'
+        )
+
+    def removed(self, offer_id):
+        return f'<item>\n<id>{offer_id}</id>\n<stock>Немає в наявності</stock>\n</item>\n'
+
+    def footer(self):
+        return '</items>\n</price>\n'
+
+
+@register
+class GoogleMerchantWriter(FeedWriter):
+    """Google Merchant Center RSS 2.0 product feed"""
+    name = 'google'
+    title = 'Google Merchant'
+
+    TIRE_CATEGORY = 'Vehicles &amp; Parts &gt; Vehicle Parts &amp; Accessories &gt; Motor Vehicle Parts &gt; Motor Vehicle Wheel Systems &gt; Motor Vehicle Tires'
+    DISK_CATEGORY = 'Vehicles &amp; Parts &gt; Vehicle Parts &amp; Accessories &gt; Motor Vehicle Parts &gt; Motor Vehicle Wheel Systems &gt; Motor Vehicle Rims &amp; Wheels'
+
+    def header(self):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
+            '<channel>\n'
+            f'<title>{SHOP_NAME}</title>\n'
+            f'<link>{self.base_url}</link>\n'
+            '<description>Шини та диски</description>\n'
+        )
+
+    def tire(self, row):
+        pk, slug, article, price, in_stock, _, image, brand_id, model_name, width, profile, diameter, season = row
+        base_url = self.base_url
+        vendor = self.brands.get(brand_id, '')
+        title = f'{vendor} {self.escape(model_name)} {width}/{profile} R{diameter}'
+        image = f'<g:image_link>{base_url}/media/{image}</g:image_link>\n' if image else ''
+        return (
+            '<item>\n'
+            f'<g:id>tire_{pk}</g:id>\n'
+            f'<g:title>{title}</g:title>\n'
+            f'<g:description>{title} {SEASON_LABELS.get(season, "")}</g:description>\n'
+            f'<g:link>{base_url}/tires/{slug}/</g:link>\n'
+            f'{image}'
+            f'<g:availability>{"in_stock" if in_stock else "out_of_stock"}</g:availability>\n'
+            f'<g:price>{price:.2f} UAH</g:price>\n'
+            f'<g:brand>{vendor}</g:brand>\n'
+            f'<g:mpn>{self.escape(article)}</g:mpn>\n'
+            '<g:condition>new</g:condition>\n'
+            f'<g:google_product_category>{self.TIRE_CATEGORY}</g:google_product_category>\n'
+            '<g:product_type>Шини</g:product_type>\n'
+            '</item>\n'
+        )
+
+    def disk(self, row):
+        pk, slug, article, price, in_stock, _, image, brand_id, model_name, width, diameter, bolts, pcd, et, disk_type = row
+        base_url = self.base_url
+        vendor = self.brands.get(brand_id, '')
+        title = f'{vendor} {self.escape(model_name)} {width}x{diameter} {bolts}x{pcd}'
+        image = f'<g:image_link>{base_url}/media/{image}</g:image_link>\n' if image else ''
+        return (
+            '<item>\n'
+            f'<g:id>disk_{pk}</g:id>\n'
+            f'<g:title>{title}</g:title>\n'
+            f'<g:description>{title} ET{et} {DISK_TYPE_LABELS.get(disk_type, "")}</g:description>\n'
+            f'<g:link>{base_url}/disks/{slug}/</g:link>\n'
+            f'{image}'
+            f'<g:availability>{"in_stock" if in_stock else "out_of_stock"}</g:availability>\n'
+            f'<g:price>{price:.2f} UAH</g:price>\n'
+            f'<g:brand>{vendor}</g:brand>\n'
+            f'<g:mpn>{self.escape(article)}</g:mpn>\n'
+            '<g:condition>new</g:condition>\n'
+            f'<g:google_product_category>{self.DISK_CATEGORY}</g:google_product_category>\n'
+            '<g:product_type>Диски</g:product_type>\n'
+            '</item>\n'
+        )
+
+    def removed(self, offer_id):
+        # Partial item, as in a supplemental feed
+        return f'<item>\n<g:id>{offer_id}</g:id>\n<g:availability>out_of_stock</g:availability>\n</item>\n'
+
+    def footer(self):
+        return '</channel>\n</rss>\n'
@@ -1,13 +1,85 @@
-"""XML feeds for price aggregators like E-Katalog, Hotline, etc."""
-from django.http import StreamingHttpResponse
+"""
+XML feeds for price aggregators like E-Katalog, Hotline, etc.
+
+Formats live in catalog/feed_formats.py. Crawlers fetch the feeds often
+and the catalog changes rarely, so feeds are not generated per request.
+Every variant (format, base URL, product type, supplier set, in_stock
+flag) is rendered once per catalog version into a gzip-compressed file
+under CATALOG_STATE_DIR/feeds:
+
+    <key>.json                 the variant's parameters
+    <key>-<version>.xml.gz     the feed for that catalog version
+
+A fetch looks up the file of the current version and renders it only
+when it is missing, i.e. after a price change or an import bumped the
+version. Imports re-render all variants fetched recently right away
+(publish_feeds), a batch of them per pass over the catalog, so crawlers
+do not wait for the scan. Files are written to a temporary name and
+renamed, so a reader never sees a partial feed.
+
+Links in the feeds point at settings.SITE_URL and only active suppliers
+count, so the variants are bounded by what the shop offers; past
+FEED_MAX_VARIANTS recorded variants, new ones get a 503 instead of a
+render.
+
+With FEED_ACCEL_REDIRECT set, the file itself is sent by nginx
+(X-Accel-Redirect, see deploy.sh) and the worker is free immediately.
+
+Delta feeds (any feed URL plus ?since=<unix time or ISO 8601>) are
+generated per request from the offer_changed_at index and the
+RemovedOffer log. They carry only what changed, so they are small. The
+X-Feed-Next-Since header gives the since value for the next poll.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, ExitStack
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.utils import timezone
-from .models import Tire, Disk, Supplier
+from django.utils.dateparse import parse_datetime
+
+from .feed_formats import DISK_FIELDS, FORMATS, IN_STOCK, SUPPLIER, TIRE_FIELDS, escape_xml
+from .models import Brand, RemovedOffer, Supplier, Tire, Disk
+from .page_cache import conditional_page, version_etag, version_last_modified
+from .versions import get_version, CATALOG
+
+FEEDS_DIR = "feeds"
+FEED_TYPES = ("all", "tires", "disks")
+
+# Default for settings.FEED_MAX_VARIANTS, the number of recorded variants
+# after which requests for new ones are refused
+MAX_VARIANTS = 200
+# Variants rendered together in one publish_feeds() pass; each holds an open gzip file
+VARIANTS_PER_PASS = 20
+# Variants nobody fetched for this long are no longer re-rendered after imports
+VARIANT_MAX_AGE = 30 * 24 * 60 * 60
+# How far back delta feeds can go; removals are logged for this long
+DELTA_MAX_AGE = 7 * 24 * 60 * 60
+# X-Feed-Next-Since lags behind the generation time by this much, so
+# that saves still in flight during a delta show up in the next one
+DELTA_OVERLAP = 60
 
+CONTENT_TYPE = "application/xml; charset=utf-8"
+READ_CHUNK = 64 * 1024
+# Characters buffered per feed before they are written out
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
 
-def generate_ekatalog_xml(request):
-    """Generate XML feed for E-Katalog - streaming version for large datasets"""
+_lock = threading.Lock()
+
+
+def feed_params(request, feed_format="ekatalog"):
+    """Normalized variant parameters of a feed request"""
+    if feed_format not in FORMATS:
+        raise Http404("Unknown feed format")
 
-    # Get filter parameters
     supplier_ids = request.GET.getlist('supplier')
     if not supplier_ids:
         suppliers_param = request.GET.get('suppliers', '')
@@ -15,116 +87,402 @@ def generate_ekatalog_xml(request):
             supplier_ids = [s.strip() for s in suppliers_param.split(',') if s.strip()]
 
     product_type = request.GET.get('type', 'all')
-    only_in_stock = request.GET.get('in_stock', '1') == '1'
-
-    base_url = request.build_absolute_uri('/').rstrip('/')
-
-    def generate():
-        now = timezone.now().strftime('%Y-%m-%d %H:%M')
-
-        # Header
-        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
-        yield f'<yml_catalog date="{now}">\n'
-        yield '<shop>\n'
-        yield '<name>КМ/Ч 120</name>\n'
-        yield '<company>КМ/Ч 120</company>\n'
-        yield f'<url>{base_url}</url>\n'
-        yield '<currencies>\n<currency id="UAH" rate="1"/>\n</currencies>\n'
-        yield '<categories>\n'
-        yield '<category id="1">Шини</category>\n'
-        yield '<category id="2">Диски</category>\n'
-        yield '</categories>\n'
-        yield '<offers>\n'
-
-        # Tires
-        if product_type in ['all', 'tires']:
-            tires = Tire.objects.select_related('brand').only(
-                'id', 'slug', 'price', 'in_stock', 'image',
-                'brand__name', 'model_name', 'width', 'profile', 'diameter',
-                'season', 'load_index', 'speed_index'
-            )
-
-            if supplier_ids:
-                tires = tires.filter(supplier_id__in=supplier_ids)
-            if only_in_stock:
-                tires = tires.filter(in_stock=True)
-
-            season_map = {'summer': 'Літня', 'winter': 'Зимова', 'all_season': 'Всесезонна'}
-
-            for tire in tires.iterator(chunk_size=1000):
-                available = "true" if tire.in_stock else "false"
-                name = f"{tire.brand.name} {tire.model_name} {tire.width}/{tire.profile} R{tire.diameter}"
-                season = season_map.get(tire.season, '')
-
-                yield f'<offer id="tire_{tire.id}" available="{available}">\n'
-                yield f'<url>{base_url}/tires/{tire.slug}/</url>\n'
-                yield f'<price>{int(tire.price)}</price>\n'
-                yield '<currencyId>UAH</currencyId>\n'
-                yield '<categoryId>1</categoryId>\n'
-                if tire.image:
-                    yield f'<picture>{base_url}/media/{tire.image}</picture>\n'
-                yield f'<name>{escape_xml(name)}</name>\n'
-                yield f'<vendor>{escape_xml(tire.brand.name)}</vendor>\n'
-                yield f'<param name="Ширина">{tire.width}</param>\n'
-                yield f'<param name="Профіль">{tire.profile}</param>\n'
-                yield f'<param name="Діаметр">{tire.diameter}</param>\n'
-                yield f'<param name="Сезон">{season}</param>\n'
-                yield '</offer>\n'
-
-        # Disks
-        if product_type in ['all', 'disks']:
-            disks = Disk.objects.select_related('brand').only(
-                'id', 'slug', 'price', 'in_stock', 'image',
-                'brand__name', 'model_name', 'width', 'diameter',
-                'bolts', 'pcd', 'et', 'dia', 'disk_type'
-            )
-
-            if supplier_ids:
-                disks = disks.filter(supplier_id__in=supplier_ids)
-            if only_in_stock:
-                disks = disks.filter(in_stock=True)
-
-            type_map = {'alloy': 'Литий', 'steel': 'Сталевий', 'forged': 'Кований'}
-
-            for disk in disks.iterator(chunk_size=1000):
-                available = "true" if disk.in_stock else "false"
-                name = f"{disk.brand.name} {disk.model_name} {disk.width}x{disk.diameter} {disk.bolts}x{disk.pcd}"
-                disk_type = type_map.get(disk.disk_type, '')
-
-                yield f'<offer id="disk_{disk.id}" available="{available}">\n'
-                yield f'<url>{base_url}/disks/{disk.slug}/</url>\n'
-                yield f'<price>{int(disk.price)}</price>\n'
-                yield '<currencyId>UAH</currencyId>\n'
-                yield '<categoryId>2</categoryId>\n'
-                if disk.image:
-                    yield f'<picture>{base_url}/media/{disk.image}</picture>\n'
-                yield f'<name>{escape_xml(name)}</name>\n'
-                yield f'<vendor>{escape_xml(disk.brand.name)}</vendor>\n'
-                yield f'<param name="Діаметр">{disk.diameter}</param>\n'
-                yield f'<param name="Ширина">{disk.width}</param>\n'
-                yield f'<param name="PCD">{disk.bolts}x{disk.pcd}</param>\n'
-                yield f'<param name="ET">{disk.et}</param>\n'
-                yield f'<param name="Тип">{disk_type}</param>\n'
-                yield '</offer>\n'
-
-        # Footer
-        yield '</offers>\n'
-        yield '</shop>\n'
-        yield '</yml_catalog>\n'
-
-    response = StreamingHttpResponse(generate(), content_type='application/xml; charset=utf-8')
-    response['Content-Disposition'] = 'inline; filename="price.xml"'
+    if product_type not in FEED_TYPES:
+        raise Http404("Unknown feed type")
+
+    # ASCII digits short enough for an id column
+    suppliers = {int(s) for s in supplier_ids if s.isascii() and s.isdigit() and len(s) < 10}
+    if suppliers:
+        # Every id set is a variant of its own, so only real ones count
+        suppliers = Supplier.objects.filter(pk__in=suppliers, is_active=True).values_list('id', flat=True)
+        if not suppliers:
+            raise Http404("Unknown supplier")
+
+    return {
+        'format': feed_format,
+        'base_url': settings.SITE_URL.rstrip('/'),
+        'type': product_type,
+        'suppliers': sorted(suppliers),
+        'in_stock': request.GET.get('in_stock', '1') == '1',
+    }
+
+
+def variant_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _memoized(func):
+    """func with its results cached for the lifetime of one pass"""
+    cache = {}
+
+    def wrapper(value):
+        try:
+            return cache[value]
+        except KeyError:
+            result = cache[value] = func(value)
+            return result
+    return wrapper
+
+
+class _Feed:
+    """One variant in a write_feeds() pass: its writer, row filter and output buffer"""
+
+    def __init__(self, writer, params, out):
+        self.writer = writer
+        self.types = ("tires", "disks") if params['type'] == 'all' else (params['type'],)
+        self.in_stock = params['in_stock']
+        self.suppliers = set(params['suppliers'])
+        self.out = out
+        self.parts = []
+        self.size = 0
+        self.offers = 0
+
+    def accepts(self, row):
+        return (row[IN_STOCK] or not self.in_stock) and (not self.suppliers or row[SUPPLIER] in self.suppliers)
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.out.write(''.join(self.parts))
+        self.parts.clear()
+        self.size = 0
+
+
+def write_feeds(jobs, since=None):
+    """
+    Write feed variants in one pass over the catalog.
+
+    jobs is a list of (params, out) with out a text file. Each product
+    type is read with one query, using the narrowest filter that still
+    covers every variant, and each row is formatted for the variants
+    whose own filters it passes. Output goes out in ~CHUNK_SIZE writes.
+
+    With `since`, only offers changed after that time are written
+    (found by the offer_changed_at index), followed by removals: products
+    deleted since then and, for in-stock feeds, changed products that
+    went out of stock.
+
+    Returns the number of offers written per job.
+    """
+    now = timezone.now()
+    brands = {pk: escape_xml(name) for pk, name in Brand.objects.values_list('id', 'name')}
+    escape = _memoized(escape_xml)
+
+    feeds = []
+    for params, out in jobs:
+        writer = FORMATS[params['format']](params['base_url'], brands, escape, now)
+        feeds.append(_Feed(writer, params, out))
+        feeds[-1].write(writer.header())
+
+    for kind, model, fields, method in (
+        ('tires', Tire, TIRE_FIELDS, 'tire'),
+        ('disks', Disk, DISK_FIELDS, 'disk'),
+    ):
+        wanted = [feed for feed in feeds if kind in feed.types]
+        if not wanted:
+            continue
+        products = model.objects.all()
+        in_stock = since is None and all(feed.in_stock for feed in wanted)
+        if in_stock:
+            products = products.filter(in_stock=True)
+        suppliers = set()
+        if all(feed.suppliers for feed in wanted):
+            suppliers = set().union(*(feed.suppliers for feed in wanted))
+            products = products.filter(supplier_id__in=suppliers)
+
+        if since is not None:
+            changes = products.filter(offer_changed_at__gt=since).order_by('offer_changed_at')
+            _write_changes(wanted, changes, fields, method, since)
+            continue
+
+        # Rows of the query already pass the filters of a feed that asks for exactly that
+        targets = [
+            (feed, getattr(feed.writer, method), feed.in_stock != in_stock or feed.suppliers != suppliers)
+            for feed in wanted
+        ]
+        for row in products.values_list(*fields).iterator(chunk_size=2000):
+            for feed, render, check in targets:
+                if not check or feed.accepts(row):
+                    feed.write(render(row))
+                    feed.offers += 1
+
+    for feed in feeds:
+        feed.write(feed.writer.footer())
+        feed.flush()
+    return [feed.offers for feed in feeds]
+
+
+def _write_changes(feeds, products, fields, kind, since):
+    """Delta part of write_feeds() for one product type (kind "tire" or "disk")"""
+    changed = set()
+    for row in products.values_list(*fields).iterator(chunk_size=2000):
+        changed.add(row[0])
+        for feed in feeds:
+            if feed.suppliers and row[SUPPLIER] not in feed.suppliers:
+                continue
+            if feed.in_stock and not row[IN_STOCK]:
+                feed.write(feed.writer.removed(f"{kind}_{row[0]}"))
+            else:
+                feed.write(getattr(feed.writer, kind)(row))
+                feed.offers += 1
+
+    removed = (
+        RemovedOffer.objects.filter(kind=kind, removed_at__gt=since)
+        .order_by().values_list('product_id', flat=True).distinct()
+    )
+    for pk in removed:
+        # SQLite may give a deleted product's id to a new one
+        if pk not in changed:
+            for feed in feeds:
+                feed.write(feed.writer.removed(f"{kind}_{pk}"))
+
+
+def _feeds_dir():
+    return os.path.join(settings.CATALOG_STATE_DIR, FEEDS_DIR)
+
+
+def _feed_name(key, version):
+    return f"{key}-{version}.xml.gz"
+
+
+@contextmanager
+def _atomic_file(path, opener=open):
+    """Text file written under a temporary name, renamed to path if the block succeeds"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with opener(tmp_path, "wt", encoding="utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _gzip_open(path, mode, encoding):
+    return gzip.open(path, mode, compresslevel=GZIP_LEVEL, encoding=encoding)
+
+
+def _remove_feed_files(key, keep=None):
+    directory = _feeds_dir()
+    for name in os.listdir(directory):
+        if name.startswith(f"{key}-") and name.endswith(".xml.gz") and name != keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def _remove_variant(key):
+    """Forget a recorded variant: its parameters and all its files"""
+    _remove_feed_files(key)
+    try:
+        os.remove(os.path.join(_feeds_dir(), f"{key}.json"))
+    except FileNotFoundError:
+        pass
+
+
+def _publish(variants, version):
+    """Render [(key, params)] for the version in one pass and drop their older files"""
+    directory = _feeds_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    with ExitStack() as stack:
+        jobs = []
+        for key, params in variants:
+            params_path = os.path.join(directory, f"{key}.json")
+            if not os.path.exists(params_path):
+                with _atomic_file(params_path) as f:
+                    json.dump(params, f)
+            path = os.path.join(directory, _feed_name(key, version))
+            jobs.append((params, stack.enter_context(_atomic_file(path, _gzip_open))))
+        write_feeds(jobs)
+
+    # A crawler still reading an old file keeps its open handle
+    for key, _ in variants:
+        _remove_feed_files(key, keep=_feed_name(key, version))
+
+
+def _variant_limit_reached(key):
+    """True when key is a new variant and FEED_MAX_VARIANTS are already recorded"""
+    directory = _feeds_dir()
+    if os.path.exists(os.path.join(directory, f"{key}.json")):
+        return False
+    try:
+        recorded = sum(name.endswith(".json") for name in os.listdir(directory))
+    except FileNotFoundError:
+        return False
+    return recorded >= getattr(settings, 'FEED_MAX_VARIANTS', MAX_VARIANTS)
+
+
+def feed_file(params):
+    """
+    File name of the variant's feed for the current catalog version,
+    rendered if missing; None for a new variant past FEED_MAX_VARIANTS.
+    """
+    version = get_version(CATALOG)
+    key = variant_key(params)
+    name = _feed_name(key, version)
+    path = os.path.join(_feeds_dir(), name)
+    if not os.path.exists(path):
+        with _lock:
+            if not os.path.exists(path):
+                if _variant_limit_reached(key):
+                    return None
+                _publish([(key, params)], version)
+    try:
+        # Mark the variant as still in use for publish_feeds
+        os.utime(os.path.join(_feeds_dir(), f"{key}.json"))
+    except FileNotFoundError:
+        pass
+    return name
+
+
+def feed_variants():
+    """
+    Recorded variants, most recently fetched first:
+        [{"key": ..., "params": {...}, "fetched_at": datetime, "size": bytes or None}]
+    size is that of the current version's file, None if not rendered yet.
+    Records written before feeds had formats are E-Katalog ones; records
+    of removed formats and unreadable ones are deleted.
+    """
+    directory = _feeds_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    version = get_version(CATALOG)
+    variants = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        key = name[:-len(".json")]
+        path = os.path.join(directory, name)
+        try:
+            fetched = os.path.getmtime(path)
+            with open(path, "r", encoding="utf-8") as f:
+                params = json.load(f)
+        except FileNotFoundError:
+            continue
+        except ValueError:
+            params = None
+        if isinstance(params, dict):
+            params.setdefault('format', 'ekatalog')
+        if not isinstance(params, dict) or params['format'] not in FORMATS:
+            _remove_variant(key)
+            continue
+        try:
+            size = os.path.getsize(os.path.join(directory, _feed_name(key, version)))
+        except FileNotFoundError:
+            size = None
+        variants.append({
+            'key': key,
+            'params': params,
+            'fetched_at': timezone.datetime.fromtimestamp(fetched, tz=timezone.get_current_timezone()),
+            'size': size,
+        })
+    variants.sort(key=lambda variant: variant['fetched_at'], reverse=True)
+    return variants
+
+
+def publish_feeds():
+    """
+    Render every recently fetched variant for the current catalog version,
+    VARIANTS_PER_PASS per pass over the catalog. Called after imports;
+    returns the number of variants.
+    """
+    cutoff = time.time() - VARIANT_MAX_AGE
+    variants = []
+    for variant in feed_variants():
+        if variant['fetched_at'].timestamp() < cutoff:
+            _remove_variant(variant['key'])
+            continue
+        variants.append((variant['key'], variant['params']))
+
+    version = get_version(CATALOG)
+    for start in range(0, len(variants), VARIANTS_PER_PASS):
+        with _lock:
+            _publish(variants[start:start + VARIANTS_PER_PASS], version)
+
+    RemovedOffer.objects.filter(removed_at__lt=timezone.now() - timedelta(seconds=DELTA_MAX_AGE)).delete()
+    return len(variants)
+
+
+def _read_gzip(path):
+    with gzip.open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK):
+            yield chunk
+
+
+def parse_since(value):
+    """since= of a delta feed: unix timestamp or ISO 8601 datetime, None if invalid"""
+    try:
+        if value.isdigit():
+            return datetime.fromtimestamp(int(value), tz=dt_timezone.utc)
+        # An unencoded "+03:00" offset arrives as a space
+        since = parse_datetime(value.replace(' ', '+'))
+    except (ValueError, OverflowError, OSError):
+        # Out-of-range timestamps raise OverflowError or OSError
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _delta_response(request, params):
+    since = parse_since(request.GET['since'])
+    if since is None:
+        return HttpResponseBadRequest("since: expected a unix timestamp or an ISO 8601 datetime")
+    now = timezone.now()
+    if since < now - timedelta(seconds=DELTA_MAX_AGE):
+        return HttpResponseBadRequest("since is older than the change log; fetch the full feed")
+
+    out = StringIO()
+    write_feeds([(params, out)], since=since)
+    response = HttpResponse(out.getvalue(), content_type=CONTENT_TYPE)
+    response['X-Feed-Next-Since'] = str(int((now - timedelta(seconds=DELTA_OVERLAP)).timestamp()))
     return response
 
 
-def escape_xml(text):
-    """Escape special XML characters"""
-    if not text:
-        return ""
-    text = str(text)
-    text = text.replace('&', '&amp;')
-    text = text.replace('<', '&lt;')
-    text = text.replace('>', '&gt;')
-    text = text.replace('"', '&quot;')
-    text = text.replace("'", '&apos;')
-    return text
+def _accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def _feed_etag(request, feed_format="ekatalog"):
+    """Catalog version, plus -gz for the compressed file (deltas are never compressed)"""
+    etag = version_etag((CATALOG,), public=True)(request)
+    if 'since' not in request.GET and _accepts_gzip(request):
+        etag += '-gz'
+    return etag
+
+
+@conditional_page(_feed_etag, version_last_modified((CATALOG,), public=True))
+def feed(request, feed_format="ekatalog"):
+    """Serve the pre-rendered feed, or a delta with ?since=, for the request's format and variant"""
+    params = feed_params(request, feed_format)
+    if 'since' in request.GET:
+        return _delta_response(request, params)
+
+    name = feed_file(params)
+    if name is None:
+        return HttpResponse("Too many feed variants", status=503, content_type="text/plain")
+    accel_prefix = getattr(settings, 'FEED_ACCEL_REDIRECT', '')
+
+    if accel_prefix:
+        # nginx serves <name> via gzip_static and decompresses for clients without gzip
+        response = HttpResponse(content_type=CONTENT_TYPE)
+        response['X-Accel-Redirect'] = accel_prefix + name[:-len('.gz')]
+    elif _accepts_gzip(request):
+        response = FileResponse(open(os.path.join(_feeds_dir(), name), 'rb'), content_type=CONTENT_TYPE)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(_read_gzip(os.path.join(_feeds_dir(), name)), content_type=CONTENT_TYPE)
+
+    writer = FORMATS[feed_format]
+    response['Content-Disposition'] = f'inline; filename="{writer.filename or f"{writer.name}.xml"}"'
+    response['Vary'] = 'Accept-Encoding'
+    return response
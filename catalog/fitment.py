@@ -0,0 +1,378 @@
+"""
+Precomputed vendor -> model -> year -> modification tree for the
+"pick by car" calculator.
+
+The tree is built with one query after each fitment import and published
+as a JSON file under CATALOG_STATE_DIR, tagged with the fitment version:
+
+    {"BMW": {"X5": {"2010": [[12, "3.0d"], [13, "4.8i"]]}}}
+
+Each worker loads it once per fitment version, so the dropdown endpoints
+are dict lookups and never touch SQLite. Compact JSON for the whole tree
+and for single vendors is serialized once and reused.
+
+The import also parses every car's size lists and stores the ready
+calculator_get_fitment response in CarFitment.data_json, including the
+size keys that matching_tires() and matching_disks() look up in stock.
+"""
+import json
+import os
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+
+from .models import (
+    CarFitment, CarModel, CarVendor, Disk, Tire, format_size_number, format_year_range,
+)
+from .sizes import parse_bolt_pattern, parse_center_bore, parse_fitment_sizes, parse_year_range
+from .versions import bump_version, get_version, FITMENT
+
+TREE_FILE = "fitment-tree.json"
+
+# CarFitment size list field -> kind of sizes in it
+SIZE_FIELDS = {
+    "oem_tires": "tire",
+    "replacement_tires": "tire",
+    "tuning_tires": "tire",
+    "oem_wheels": "wheel",
+    "replacement_wheels": "wheel",
+    "tuning_wheels": "wheel",
+}
+
+# Size categories whose tires are offered for a car
+MATCH_CATEGORIES = ("oem", "replacement")
+
+# Cheapest in-stock tires shown per size (wheels: per diameter)
+MATCH_PER_SIZE = 8
+
+_tree = None
+_tree_version = None
+_json_cache = {}
+_lock = threading.Lock()
+
+
+def _tree_path():
+    return os.path.join(settings.CATALOG_STATE_DIR, TREE_FILE)
+
+
+def build_tree():
+    """Nested dict built from one ordered scan of CarFitment and the model names"""
+    tree = {}
+    names = {
+        pk: (vendor, car)
+        for pk, vendor, car in CarModel.objects.values_list("id", "vendor__name", "name")
+    }
+    # Ordered by the integer keys; names are sorted once in Python below.
+    # Open-ended and unknown years go last.
+    rows = (
+        CarFitment.objects.order_by(
+            "car_model_id",
+            F("year_from").asc(nulls_last=True),
+            F("year_to").asc(nulls_last=True),
+            "modification",
+            "id",
+        )
+        .values_list("car_model_id", "year_from", "year_to", "year_text", "modification", "id")
+    )
+    by_model = {}
+    for model_id, year_from, year_to, year_text, modification, pk in rows.iterator(chunk_size=5000):
+        years = by_model.setdefault(model_id, {})
+        year = format_year_range(year_from, year_to) or year_text
+        years.setdefault(year, []).append([pk, modification])
+
+    for model_id in sorted(by_model, key=names.__getitem__):
+        vendor, car = names[model_id]
+        tree.setdefault(vendor, {})[car] = by_model[model_id]
+    return tree
+
+
+def publish_tree():
+    """Build the tree for the current fitment version and write it atomically"""
+    version = get_version(FITMENT)
+    tree = build_tree()
+    os.makedirs(settings.CATALOG_STATE_DIR, exist_ok=True)
+    path = _tree_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "tree": tree}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return tree
+
+
+def _load(version):
+    try:
+        with open(_tree_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == version:
+            return data["tree"]
+    except (FileNotFoundError, ValueError):
+        pass
+    # Missing or stale file (first request after an import by an older build): rebuild it
+    return publish_tree()
+
+
+def get_tree():
+    """Process-wide fitment tree and its version"""
+    global _tree, _tree_version
+    version = get_version(FITMENT)
+    if _tree is None or _tree_version != version:
+        with _lock:
+            if _tree is None or _tree_version != version:
+                _tree = _load(version)
+                _tree_version = version
+                _json_cache.clear()
+    return _tree, _tree_version
+
+
+def vendors():
+    return list(get_tree()[0])
+
+
+def models_for(vendor):
+    return list(get_tree()[0].get(vendor, {}))
+
+
+def years_for(vendor, car):
+    return list(get_tree()[0].get(vendor, {}).get(car, {}))
+
+
+def modifications_for(vendor, car, year):
+    rows = get_tree()[0].get(vendor, {}).get(car, {}).get(year, [])
+    return [{"id": pk, "modification": modification} for pk, modification in rows]
+
+
+def tree_json(vendor=None):
+    """
+    Compact JSON of the whole tree or of one vendor's subtree, and the
+    version it was built from. None if the vendor is unknown.
+    """
+    tree, version = get_tree()
+    if vendor is not None and vendor not in tree:
+        return None, version
+    key = (version, vendor)
+    content = _json_cache.get(key)
+    if content is None:
+        data = tree if vendor is None else tree[vendor]
+        content = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        _json_cache[key] = content
+    return content, version
+
+
+def _parsed_sizes(fitment):
+    """{field: options} for the six size lists of a CarFitment"""
+    return {
+        field: parse_fitment_sizes(getattr(fitment, field), kind)
+        for field, kind in SIZE_FIELDS.items()
+    }
+
+
+def parse_wheel_specs(fitment):
+    """Set bolt_pattern and hub_bore from the pcd/center_bore text"""
+    bolt_pattern = parse_bolt_pattern(fitment.pcd)
+    fitment.bolt_pattern = Disk.make_bolt_pattern(*bolt_pattern) if bolt_pattern else ""
+    fitment.hub_bore = parse_center_bore(fitment.center_bore)
+
+
+def fitment_payload(fitment):
+    """calculator_get_fitment response for a CarFitment"""
+    parsed = _parsed_sizes(fitment)
+
+    def options(field):
+        result = []
+        for sizes in parsed[field]:
+            if len(sizes) == 2:
+                result.append({"front": sizes[0]["label"], "rear": sizes[1]["label"], "staggered": True})
+            else:
+                result.append({"size": sizes[0]["label"], "staggered": False})
+        return result
+
+    # Distinct tire sizes to match against stock, factory sizes first
+    tire_sizes = {}
+    for category in MATCH_CATEGORIES:
+        for sizes in parsed[f"{category}_tires"]:
+            for size in sizes:
+                if "width" in size:
+                    key = Tire.make_size_key(size["width"], size["profile"], size["diameter"])
+                    tire_sizes.setdefault(key, size["label"])
+
+    # Wheel diameters and ETs to match against stock
+    wheel_sizes = []
+    for category in MATCH_CATEGORIES:
+        for sizes in parsed[f"{category}_wheels"]:
+            for size in sizes:
+                if size.get("et") is not None and [size["diameter"], size["et"]] not in wheel_sizes:
+                    wheel_sizes.append([size["diameter"], size["et"]])
+
+    return {
+        "car": f"{fitment.car_model} {fitment.year} {fitment.modification}",
+        "tire_sizes": [{"key": key, "label": label} for key, label in tire_sizes.items()],
+        "wheel_match": {
+            "bolt_pattern": fitment.bolt_pattern,
+            "hub_bore": str(fitment.hub_bore) if fitment.hub_bore is not None else None,
+            "sizes": wheel_sizes,
+        },
+        "pcd": fitment.pcd,
+        "center_bore": fitment.center_bore,
+        "bolt_type": fitment.bolt_type,
+        "tires": {
+            "oem": options("oem_tires"),
+            "replacement": options("replacement_tires"),
+            "tuning": options("tuning_tires"),
+        },
+        "wheels": {
+            "oem": options("oem_wheels"),
+            "replacement": options("replacement_wheels"),
+            "tuning": options("tuning_wheels"),
+        },
+    }
+
+
+# Fields written by prepare_fitment()
+UPDATED_FIELDS = ["bolt_pattern", "hub_bore", "data_json"]
+
+
+def prepare_fitment(batch_size=1000):
+    """Rebuild the wheel specs and the stored JSON of every CarFitment"""
+    fields = [
+        "id", "car_model__name", "car_model__vendor__name", "year_from", "year_to", "modification",
+        "pcd", "center_bore", "bolt_type", *SIZE_FIELDS,
+    ]
+    fitments = CarFitment.objects.select_related("car_model__vendor").order_by("id").only(*fields)
+
+    processed = 0
+    batch = []
+    for fitment in fitments.iterator(chunk_size=batch_size):
+        parse_wheel_specs(fitment)
+        fitment.data_json = json.dumps(fitment_payload(fitment), ensure_ascii=False, separators=(",", ":"))
+        batch.append(fitment)
+        if len(batch) >= batch_size:
+            CarFitment.objects.bulk_update(batch, UPDATED_FIELDS)
+            processed += len(batch)
+            batch = []
+    CarFitment.objects.bulk_update(batch, UPDATED_FIELDS)
+    return processed + len(batch)
+
+
+def car_model_resolver():
+    """
+    Function (vendor, car) -> CarModel id for the import commands. Known
+    models are loaded once; new vendors and models are created on first use.
+    """
+    vendor_ids = dict(CarVendor.objects.values_list("name", "id"))
+    model_ids = {
+        (vendor, car): pk
+        for pk, vendor, car in CarModel.objects.values_list("id", "vendor__name", "name")
+    }
+
+    def resolve(vendor, car):
+        key = (vendor, car)
+        if key not in model_ids:
+            if vendor not in vendor_ids:
+                vendor_ids[vendor] = CarVendor.objects.create(name=vendor).pk
+            model_ids[key] = CarModel.objects.create(vendor_id=vendor_ids[vendor], name=car).pk
+        return model_ids[key]
+
+    return resolve
+
+
+def new_fitment(resolve, vendor, car, year, **fields):
+    """Unsaved CarFitment from the import's vendor, model and year strings"""
+    year_from, year_to = parse_year_range(year)
+    return CarFitment(
+        car_model_id=resolve(vendor[:100], car[:100]),
+        year_from=year_from,
+        year_to=year_to,
+        # Only needed when the range can't stand in for the text
+        year_text="" if year_from is not None else (year or "")[:50],
+        **fields,
+    )
+
+
+def prune_car_models():
+    """Drop models and vendors left without fitments by a re-import"""
+    CarModel.objects.filter(fitments__isnull=True).delete()
+    CarVendor.objects.filter(models__isnull=True).delete()
+
+
+def publish_fitment():
+    """Everything derived from fitment data; run after each fitment import"""
+    prune_car_models()
+    count = prepare_fitment()
+    bump_version(FITMENT)
+    publish_tree()
+    return count
+
+
+def matching_tires(tire_sizes, per_size=MATCH_PER_SIZE):
+    """
+    In-stock tires for a car's sizes in one query (tire_fit_idx), grouped
+    by size in the car's order, cheapest first:
+        [{"size": "205/55 R16", "tires": [{...}, ...]}, ...]
+    """
+    keys = [size["key"] for size in tire_sizes]
+    if not keys:
+        return []
+
+    rows = (
+        Tire.objects.filter(in_stock=True, size_key__in=keys)
+        .annotate(rank=Window(RowNumber(), partition_by=F("size_key"), order_by=[F("price"), F("id")]))
+        .filter(rank__lte=per_size)
+        .order_by("size_key", "price", "id")
+        .values_list("size_key", "slug", "brand_name", "model_name", "load_index", "speed_index", "season", "price")
+    )
+    by_size = {}
+    for size_key, slug, brand_name, model_name, load_index, speed_index, season, price in rows:
+        by_size.setdefault(size_key, []).append({
+            "name": f"{brand_name} {model_name}",
+            "index": f"{load_index}{speed_index}",
+            "season": season,
+            "price": f"{price:.0f}",
+            "url": reverse("catalog:tire_detail", args=[slug]),
+        })
+    return [
+        {"size": size["label"], "tires": by_size[size["key"]]}
+        for size in tire_sizes
+        if size["key"] in by_size
+    ]
+
+
+def matching_disks(wheel_match, et_tolerance=None, per_size=MATCH_PER_SIZE):
+    """
+    In-stock disks that fit a car, in one query (disk_fit_idx):
+    - same bolt pattern
+    - one of the car's wheel diameters, with ET within +-et_tolerance
+      (settings.WHEEL_ET_TOLERANCE) of the car's ET for that diameter
+    - center bore no smaller than the hub (larger bores take a hub ring)
+    Grouped by diameter, cheapest first: [{"size": "R17", "disks": [...]}]
+    """
+    if not wheel_match or not wheel_match["bolt_pattern"] or not wheel_match["sizes"]:
+        return []
+    if et_tolerance is None:
+        et_tolerance = settings.WHEEL_ET_TOLERANCE
+
+    fits = Q()
+    for diameter, et in wheel_match["sizes"]:
+        fits |= Q(diameter=diameter, et__gte=et - et_tolerance, et__lte=et + et_tolerance)
+    disks = Disk.objects.filter(fits, in_stock=True, bolt_pattern=wheel_match["bolt_pattern"])
+    if wheel_match["hub_bore"]:
+        disks = disks.filter(dia__gte=Decimal(wheel_match["hub_bore"]))
+
+    rows = (
+        disks.annotate(rank=Window(RowNumber(), partition_by=F("diameter"), order_by=[F("price"), F("id")]))
+        .filter(rank__lte=per_size)
+        .order_by("diameter", "price", "id")
+        .values_list("diameter", "slug", "brand_name", "model_name", "width", "et", "dia", "price")
+    )
+    groups = {}
+    for diameter, slug, brand_name, model_name, width, et, dia, price in rows:
+        groups.setdefault(diameter, []).append({
+            "name": f"{brand_name} {model_name}",
+            "size": f"{format_size_number(width)}x{diameter} ET{et} DIA{format_size_number(dia)}",
+            "price": f"{price:.0f}",
+            "url": reverse("catalog:disk_detail", args=[slug]),
+        })
+    return [{"size": f"R{diameter}", "disks": items} for diameter, items in groups.items()]
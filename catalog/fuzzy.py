@@ -0,0 +1,196 @@
+"""
+Typo-tolerant, transliteration-aware matching of brand and model words.
+
+Customers type "мішлен", "michelen" or "бриджстоун" where the catalog says
+"Michelin" and "Bridgestone". Every word of every brand and model name is
+reduced to a phonetic Latin key (Cyrillic is transliterated first, then
+spelling variants are folded together), and the keys are indexed by
+character trigrams. A misspelled query word is reduced the same way and
+matched against the index; candidates are ranked by trigram similarity.
+
+Only brand and model words are corrected: product types, seasons, disk
+types and the like ("шини", "зимові", "литі") are left as typed, or they
+would be "corrected" into whatever model name happens to look similar.
+
+The index is built per process and rebuilt when the catalog version
+changes, so lookups are a few dict/set operations.
+"""
+import re
+import threading
+from collections import defaultdict
+
+from .models import Tire, Disk
+from .versions import get_version, CATALOG
+
+# Ukrainian and Russian letters -> Latin
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e",
+    "є": "ye", "ё": "yo", "ж": "zh", "з": "z", "и": "y", "і": "i", "ї": "yi",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e",
+    "ю": "yu", "я": "ya",
+}
+
+# Folding rules applied in order to the transliterated word. They only need
+# to map both spellings of a name onto the same key, not be linguistically
+# correct: "michelin" -> "mishilin", "мішлен" -> "mishlin".
+FOLD_RULES = [
+    (re.compile(r"[’'`ʼ-]"), ""),
+    (re.compile(r"shch|sch"), "sh"),
+    (re.compile(r"dzh|dge|dg"), "j"),
+    (re.compile(r"ch"), "sh"),
+    (re.compile(r"kh"), "h"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck|q"), "k"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"ts"), "z"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"ou|oo"), "u"),
+    (re.compile(r"ee|ea"), "i"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"e"), "i"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+WORD_RE = re.compile(r"[^\W_]+(?:[.'’][^\W_]+)*", re.UNICODE)
+
+# Minimum similarity for a correction to be used
+THRESHOLD = 0.4
+
+# Beginnings of the filter words customers add to a brand or model
+# (product type, season, studs, disk type, vehicle), in Ukrainian, Russian
+# and English; query words starting with one are never corrected
+FILTER_STEMS = (
+    "шин", "диск", "гум", "резин", "tire", "tyre", "wheel",
+    "літ", "летн", "зим", "всесезон", "summer", "winter", "season",
+    "шип", "stud",
+    "лит", "штамп", "кован", "alloy", "steel", "forged",
+    "легков", "позашлях", "внедорож", "вантаж", "грузов", "мікроавтоб", "микроавтоб",
+)
+
+
+def transliterate(text):
+    return "".join(TRANSLIT.get(ch, ch) for ch in text.lower())
+
+
+def phonetic_key(word):
+    key = transliterate(word)
+    for pattern, replacement in FOLD_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    def __init__(self, words):
+        """words: {canonical word: weight}"""
+        # Alias table: phonetic key -> (canonical word, weight)
+        self.words = {}
+        self.grams = defaultdict(set)
+        self.key_grams = {}
+        for word, weight in words.items():
+            key = phonetic_key(word)
+            if len(key) < 2:
+                continue
+            best = self.words.get(key)
+            if best is None or weight > best[1]:
+                self.words[key] = (word, weight)
+            if key not in self.key_grams:
+                grams = trigrams(key)
+                self.key_grams[key] = grams
+                for gram in grams:
+                    self.grams[gram].add(key)
+
+    def candidates(self, word, limit=5):
+        """Catalog words similar to `word`, best first: [(word, similarity)]"""
+        key = phonetic_key(word)
+        if len(key) < 2:
+            return []
+        if key in self.words:
+            return [(self.words[key][0], 1.0)]
+
+        grams = trigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for other in self.grams.get(gram, ()):
+                shared[other] += 1
+
+        scored = []
+        for other, common in shared.items():
+            # Dice coefficient on trigrams
+            similarity = 2 * common / (len(grams) + len(self.key_grams[other]))
+            # A typed prefix of a long model name ("hakka" -> "hakkapeliitta")
+            if len(key) >= 3 and other.startswith(key):
+                similarity = max(similarity, 0.9)
+            if similarity >= THRESHOLD:
+                word_, weight = self.words[other]
+                scored.append((similarity, weight, word_))
+
+        scored.sort(reverse=True)
+        return [(word_, similarity) for similarity, _, word_ in scored[:limit]]
+
+    def correct(self, query):
+        """
+        Replace every brand or model word of the query with its best
+        catalog match. Returns the corrected query, or None if nothing changed.
+        """
+        changed = False
+        words = []
+        for word in query.split():
+            # Sizes, articles and other tokens with digits are left alone,
+            # and so are filter words
+            if (
+                not WORD_RE.fullmatch(word)
+                or any(ch.isdigit() for ch in word)
+                or word.lower().startswith(FILTER_STEMS)
+            ):
+                words.append(word)
+                continue
+            candidates = self.candidates(word)
+            if candidates and candidates[0][0].lower() != word.lower():
+                words.append(candidates[0][0])
+                changed = True
+            else:
+                words.append(word)
+        return " ".join(words) if changed else None
+
+
+def build_words():
+    """Brand and model words from the catalog, weighted by product count"""
+    weights = defaultdict(int)
+    for model in (Tire, Disk):
+        rows = model.objects.order_by().values_list("brand_name", "model_name")
+        for brand_name, model_name in rows.iterator(chunk_size=5000):
+            for word in WORD_RE.findall(f"{brand_name} {model_name}"):
+                if not word.isdigit():
+                    weights[word] += 1
+    return weights
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide fuzzy index, rebuilt when the catalog version changes"""
+    global _index, _index_version
+    version = get_version(CATALOG)
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                _index = FuzzyIndex(build_words())
+                _index_version = version
+    return _index
+
+
+def correct_query(query):
+    """Best catalog spelling of the query, or None if it is already correct"""
+    return get_index().correct(query)
@@ -5,6 +5,7 @@ from pathlib import Path
 from django.utils.text import slugify
 from django.conf import settings
 from .models import Tire, Disk, Brand, Supplier
+from .versions import defer_bumps
 
 
 def parse_decimal(value):
@@ -91,6 +92,7 @@ def get_or_create_supplier(supplier_code):
     return supplier
 
 
+@defer_bumps()
 def recalculate_prices_for_supplier(supplier):
     """Recalculate all prices for a supplier based on markup"""
     updated_tires = 0
@@ -100,19 +102,20 @@ def recalculate_prices_for_supplier(supplier):
     for tire in Tire.objects.filter(supplier=supplier):
         if tire.purchase_price and tire.purchase_price > 0:
             tire.price = supplier.apply_markup(tire.purchase_price)
-            tire.save(update_fields=['price'])
+            tire.save(update_fields=['price', 'updated_at'])
             updated_tires += 1
 
     # Update disks
     for disk in Disk.objects.filter(supplier=supplier):
         if disk.purchase_price and disk.purchase_price > 0:
             disk.price = supplier.apply_markup(disk.purchase_price)
-            disk.save(update_fields=['price'])
+            disk.save(update_fields=['price', 'updated_at'])
             updated_disks += 1
 
     return updated_tires, updated_disks
 
 
+@defer_bumps()
 def import_tires(file_path, progress_callback=None):
     """Import tires from Excel file"""
     df = pd.read_excel(file_path, header=None)
@@ -280,6 +283,7 @@ def import_tires(file_path, progress_callback=None):
     }
 
 
+@defer_bumps()
 def import_disks(file_path, progress_callback=None):
     """Import disks from Excel file"""
     df = pd.read_excel(file_path, header=None)
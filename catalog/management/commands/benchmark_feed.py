@@ -0,0 +1,78 @@
+"""
+Time the price feed writer and report its memory use
+Usage: python manage.py benchmark_feed [--format ekatalog hotline ...] [--type all] [--in-stock 0] [--repeat 3]
+"""
+
+import resource
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from catalog.feed_formats import FORMATS
+from catalog.feeds import FEED_TYPES, write_feeds
+
+
+class NullOutput:
+    """Counts what a feed writes instead of storing it"""
+
+    def __init__(self):
+        self.size = 0
+        self.writes = 0
+
+    def write(self, text):
+        self.size += len(text)
+        self.writes += 1
+
+
+class Command(BaseCommand):
+    help = 'Measure offers/sec, peak RSS and peak Python heap of the feed writer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', nargs='+', choices=sorted(FORMATS), default=sorted(FORMATS),
+                            help='Formats written together in one pass')
+        parser.add_argument('--type', choices=FEED_TYPES, default='all', help='Product type of the feeds')
+        parser.add_argument('--in-stock', type=int, choices=(0, 1), default=0, help='Only in-stock offers')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs; the median is reported')
+
+    def handle(self, *args, **options):
+        variants = [{
+            'format': name,
+            'base_url': 'https://example.com',
+            'type': options['type'],
+            'suppliers': [],
+            'in_stock': bool(options['in_stock']),
+        } for name in options['format']]
+
+        def run(selected):
+            outputs = [NullOutput() for _ in selected]
+            offers = write_feeds(list(zip(selected, outputs)))
+            return sum(offers), outputs
+
+        def timed(selected):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                offers, outputs = run(selected)
+                timings.append(time.perf_counter() - start)
+            return statistics.median(timings), offers, outputs
+
+        seconds, offers, outputs = timed(variants)
+        for variant, output in zip(variants, outputs):
+            self.stdout.write(f'{variant["format"]}: {output.size / 1024 / 1024:.1f} MB in {output.writes} writes')
+        self.stdout.write(
+            f'One pass, {len(variants)} format(s): {seconds:.2f} s median of {options["repeat"]},'
+            f' {offers:,} offers, {offers / seconds:,.0f} offers/sec'
+        )
+        if len(variants) > 1:
+            separate = sum(timed([variant])[0] for variant in variants)
+            self.stdout.write(f'Separate passes: {separate:.2f} s, {offers / separate:,.0f} offers/sec')
+
+        # ru_maxrss is in KB on Linux
+        self.stdout.write(f'Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB')
+
+        tracemalloc.start()
+        run(variants)
+        _, peak_heap = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f'Peak traced Python heap: {peak_heap / 1024 / 1024:.2f} MB')
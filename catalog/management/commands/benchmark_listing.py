@@ -0,0 +1,74 @@
+"""
+Time the rendering of the tire and disk listing templates
+Usage: python manage.py benchmark_listing [--repeat 200]
+"""
+
+import statistics
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from catalog.models import Brand, Disk, Tire
+
+
+class Command(BaseCommand):
+    help = 'Measure per-page render time of the listing templates (queries excluded)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Renders per template; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        # A filtered page in the middle of the listing, so every pagination link is drawn
+        request = RequestFactory().get('/', {'season': 'summer', 'brand': 'michelin', 'page': 3})
+
+        pages = [
+            ('catalog/tire_list.html', 'tires', Tire, {
+                'seasons': Tire.SEASON_CHOICES,
+                'brands': list(Brand.objects.filter(tires__isnull=False).distinct().order_by('name')),
+                'studded_choices': Tire.STUDDED_CHOICES,
+            }, {'season': 'summer', 'brand': 'michelin', 'price_min': '1000'}),
+            ('catalog/disk_list.html', 'disks', Disk, {
+                'types': Disk.TYPE_CHOICES,
+                'brands': list(Brand.objects.filter(disks__isnull=False).distinct().order_by('name')),
+            }, {'type': 'alloy', 'brand': 'kk', 'price_min': '1000'}),
+        ]
+
+        for template, name, model, filter_options, current_filters in pages:
+            page = Paginator(model.objects.select_related('supplier').order_by('id'), 15).get_page(3)
+            page.object_list = list(page.object_list)
+            if not page.object_list:
+                self.stdout.write(f'{template}: not enough {name} to render a page')
+                continue
+            context = {
+                name: page,
+                'filter_options': filter_options,
+                'current_filters': current_filters,
+            }
+
+            def render():
+                render_to_string(template, context, request=request)
+
+            def render_cold():
+                caches['fragments'].clear()
+                render()
+
+            self.report(f'{template} (no cached fragments)', render_cold, repeat)
+            self.report(f'{template} (cached fragments)', render, repeat)
+
+    def report(self, label, func, repeat):
+        func()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(f'{label}: {statistics.median(timings):.2f} ms median of {repeat}')
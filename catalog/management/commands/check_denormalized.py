@@ -0,0 +1,82 @@
+"""
+Verify denormalized brand_name/size_key/bolt_pattern columns on tires and disks
+Usage: python manage.py check_denormalized [--fix]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+from catalog.models import Tire, Disk
+from catalog.versions import bump_version, CATALOG
+
+
+class Command(BaseCommand):
+    help = 'Check that denormalized brand_name, size_key and bolt_pattern columns match their source fields'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite mismatched rows instead of only reporting them'
+        )
+
+    def handle(self, *args, **options):
+        fix = options['fix']
+        total_mismatches = 0
+
+        # Columns computed in Python: (column, function, source fields)
+        checks = [
+            (Tire, [
+                ('size_key', Tire.make_size_key, ('width', 'profile', 'diameter')),
+            ]),
+            (Disk, [
+                ('size_key', Disk.make_size_key, ('width', 'diameter', 'bolts', 'pcd', 'et')),
+                ('bolt_pattern', Disk.make_bolt_pattern, ('bolts', 'pcd')),
+            ]),
+        ]
+
+        for model, columns in checks:
+            label = model._meta.verbose_name_plural
+
+            # brand_name can be compared in SQL
+            brand_mismatches = model.objects.exclude(brand_name=F('brand__name'))
+            brand_count = brand_mismatches.count()
+            if brand_count and fix:
+                # Listing cards are cached by updated_at and show the brand
+                now = timezone.now()
+                for brand_id, name in brand_mismatches.values_list('brand_id', 'brand__name').distinct():
+                    stale = model.objects.filter(brand_id=brand_id).exclude(brand_name=name)
+                    stale.update(brand_name=name, updated_at=now)
+
+            # The other columns are formatted in Python, all in one pass over the rows
+            names = [column for column, _, _ in columns]
+            sources = list(dict.fromkeys(field for _, _, fields in columns for field in fields))
+            mismatches = {column: {} for column in names}
+            rows = model.objects.values(*['id', *names, *sources])
+            for row in rows.iterator(chunk_size=5000):
+                for column, make, fields in columns:
+                    expected = make(*(row[field] for field in fields))
+                    if row[column] != expected:
+                        mismatches[column][row['id']] = expected
+            if fix:
+                for column, expected in mismatches.items():
+                    if expected:
+                        objs = [model(id=pk, **{column: value}) for pk, value in expected.items()]
+                        model.objects.bulk_update(objs, [column], batch_size=1000)
+
+            counts = [brand_count, *(len(mismatches[column]) for column in names)]
+            total_mismatches += sum(counts)
+            if any(counts):
+                style = self.style.WARNING if fix else self.style.ERROR
+                report = ', '.join(f'{count} {column}' for count, column in zip(counts, ['brand_name', *names]))
+                self.stdout.write(style(f'{label}: {report} mismatches' + (' (fixed)' if fix else '')))
+            else:
+                self.stdout.write(f'{label}: OK')
+
+        if total_mismatches and fix:
+            # Cached pages were rendered from the old values
+            bump_version(CATALOG)
+        if total_mismatches and not fix:
+            raise CommandError(f'{total_mismatches} inconsistent rows, run with --fix to repair')
+
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -0,0 +1,62 @@
+"""
+Delete expired and long-idle anonymous sessions
+Usage: python manage.py clear_stale_sessions [--idle-days 30] [--batch-size 1000]
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions and anonymous sessions idle for more than --idle-days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-days',
+            type=int,
+            default=30,
+            help='Delete anonymous sessions not saved for this many days (0 - only expired)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement; small batches keep SQLite write locks short'
+        )
+
+    def delete_in_batches(self, queryset, batch_size):
+        deleted = 0
+        while True:
+            keys = list(queryset.values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+
+        expired = self.delete_in_batches(Session.objects.filter(expire_date__lt=now), batch_size)
+        self.stdout.write(f'Expired: {expired}')
+
+        idle = 0
+        if options['idle_days']:
+            # expire_date is set to save time + SESSION_COOKIE_AGE on every save
+            cutoff = now + timedelta(seconds=settings.SESSION_COOKIE_AGE) - timedelta(days=options['idle_days'])
+            stale_keys = []
+            candidates = Session.objects.filter(expire_date__lt=cutoff).only('session_key', 'session_data')
+            for session in candidates.iterator(chunk_size=batch_size):
+                # Keep logged-in (staff) sessions until they expire
+                if '_auth_user_id' not in session.get_decoded():
+                    stale_keys.append(session.session_key)
+            for start in range(0, len(stale_keys), batch_size):
+                Session.objects.filter(session_key__in=stale_keys[start:start + batch_size]).delete()
+            idle = len(stale_keys)
+        self.stdout.write(f'Idle anonymous: {idle}')
+
+        self.stdout.write(self.style.SUCCESS(f'Done! Deleted {expired + idle} sessions'))
@@ -0,0 +1,87 @@
+"""
+Report the on-disk size of the fitment tables and the latency of the
+calculator's fitment queries
+Usage: python manage.py fitment_stats [--repeat 300]
+"""
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from catalog.fitment import build_tree
+from catalog.models import CarFitment, CarModel
+
+TABLES = ('catalog_carvendor', 'catalog_carmodel', 'catalog_carfitment')
+
+
+class Command(BaseCommand):
+    help = 'Show fitment table/index sizes and calculator query latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=300,
+            help='Runs per query; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        self.report_sizes()
+        if not CarFitment.objects.exists():
+            self.stdout.write('No fitment data to time')
+            return
+
+        repeat = options['repeat']
+        rng = random.Random(1)
+        models = list(CarModel.objects.values_list('vendor_id', 'id'))
+        fitment_ids = list(CarFitment.objects.values_list('id', flat=True))
+
+        def selection():
+            # models of a vendor -> years of a model -> modifications of a year
+            vendor_id, model_id = rng.choice(models)
+            list(CarModel.objects.filter(vendor_id=vendor_id).values_list('id', 'name'))
+            years = list(
+                CarFitment.objects.filter(car_model_id=model_id).order_by('year_from')
+                .values_list('year_from', flat=True).distinct()
+            )
+            list(CarFitment.objects.filter(car_model_id=model_id, year_from=years[0]).values('id', 'modification'))
+
+        def fitment():
+            CarFitment.objects.only('id', 'data_json').get(id=rng.choice(fitment_ids))
+
+        self.report_time('Selection queries', selection, repeat)
+        self.report_time('Fitment by id', fitment, repeat)
+        self.report_time('Dropdown tree build', build_tree, max(1, repeat // 100))
+
+    def report_sizes(self):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Table sizes are only reported for SQLite')
+            return
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    'SELECT s.name, m.type, SUM(s.pgsize) FROM dbstat s'
+                    ' JOIN sqlite_master m ON m.name = s.name'
+                    f' WHERE m.tbl_name IN ({", ".join("%s" for _ in TABLES)})'
+                    ' GROUP BY s.name, m.type ORDER BY 3 DESC',
+                    TABLES,
+                )
+            except Exception:
+                self.stdout.write('SQLite was built without dbstat; table sizes unavailable')
+                return
+            rows = cursor.fetchall()
+
+        total = sum(size for _, _, size in rows)
+        self.stdout.write(f'Fitment tables and indexes: {total // 1024} KB')
+        for name, kind, size in rows:
+            self.stdout.write(f'  {name} ({kind}): {size // 1024} KB')
+
+    def report_time(self, label, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(f'{label}: {statistics.median(timings):.3f} ms median of {repeat}')
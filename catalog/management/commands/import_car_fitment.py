@@ -1,6 +1,7 @@
 import csv
 from django.core.management.base import BaseCommand
 from catalog.models import CarFitment
+from catalog.fitment import car_model_resolver, new_fitment, publish_fitment
 
 
 class Command(BaseCommand):
@@ -44,15 +45,17 @@ class Command(BaseCommand):
         with open(csv_file, "r", encoding=encoding, errors="replace") as f:
             reader = csv.DictReader(f, delimiter=";")
 
+            resolve = car_model_resolver()
             batch = []
             batch_size = 1000
 
             for row in reader:
                 try:
-                    fitment = CarFitment(
-                        vendor=row.get("vendor", "").strip(),
-                        car=row.get("car", "").strip(),
-                        year=row.get("year", "").strip(),
+                    fitment = new_fitment(
+                        resolve,
+                        row.get("vendor", "").strip(),
+                        row.get("car", "").strip(),
+                        row.get("year", "").strip(),
                         modification=row.get("modification", "").strip(),
                         pcd=row.get("pcd", "").strip(),
                         center_bore=row.get("diametr", "").strip(),
@@ -83,6 +86,9 @@ class Command(BaseCommand):
             if batch:
                 CarFitment.objects.bulk_create(batch)
 
+        # Prepared JSON and the dropdown tree
+        publish_fitment()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Successfully imported {imported} records with {errors} errors."
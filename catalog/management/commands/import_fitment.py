@@ -6,6 +6,7 @@ Usage: python manage.py import_fitment
 import re
 from django.core.management.base import BaseCommand
 from catalog.models import CarFitment
+from catalog.fitment import car_model_resolver, new_fitment, publish_fitment
 
 
 class Command(BaseCommand):
@@ -49,13 +50,14 @@ class Command(BaseCommand):
         self.stdout.write('Cleared existing fitment data')
 
         # Import records
+        resolve = car_model_resolver()
         created = 0
         batch = []
         batch_size = 1000
 
         for i, record in enumerate(records):
             try:
-                fitment = self.create_fitment(record)
+                fitment = self.create_fitment(record, resolve)
                 if fitment:
                     batch.append(fitment)
                     created += 1
@@ -72,6 +74,9 @@ class Command(BaseCommand):
         if batch:
             CarFitment.objects.bulk_create(batch)
 
+        # Prepared JSON and the dropdown tree
+        publish_fitment()
+
         self.stdout.write(self.style.SUCCESS(f'Done! Created {created} fitment records'))
 
     def clean_value(self, val):
@@ -160,7 +165,7 @@ class Command(BaseCommand):
 
         return records
 
-    def create_fitment(self, record):
+    def create_fitment(self, record, resolve):
         """Create CarFitment object from record"""
         # Table structure:
         # 0: id, 1: vendor, 2: car, 3: year, 4: modification
@@ -177,10 +182,11 @@ class Command(BaseCommand):
         if not vendor or not car:
             return None
 
-        return CarFitment(
-            vendor=vendor[:100],
-            car=car[:100],
-            year=self.clean_value(record[3])[:50],
+        return new_fitment(
+            resolve,
+            vendor,
+            car,
+            self.clean_value(record[3]),
             modification=self.clean_value(record[4])[:200],
             pcd=self.clean_value(record[5])[:50],
             center_bore=self.clean_value(record[6])[:50],
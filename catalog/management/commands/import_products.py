@@ -8,6 +8,8 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 from catalog.models import Brand, Tire, Disk
+from catalog.alternatives import publish_groups
+from catalog.versions import defer_bumps
 
 
 class Command(BaseCommand):
@@ -27,6 +29,14 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        with defer_bumps():
+            self.import_products(options)
+
+        # Detail page alternatives for the version the import just bumped;
+        # the price feeds are republished by the versions_bumped handler
+        publish_groups()
+
+    def import_products(self, options):
         sql_file = options['file']
         limit = options['limit']
 
@@ -0,0 +1,18 @@
+"""
+Re-parse fitment sizes and rebuild the calculator data without re-importing
+Usage: python manage.py rebuild_fitment
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from catalog.fitment import publish_fitment
+
+
+class Command(BaseCommand):
+    help = 'Rebuild prepared fitment JSON and the car selection tree'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = publish_fitment()
+
+        self.stdout.write(self.style.SUCCESS(f'Done! Rebuilt {count} fitment records'))
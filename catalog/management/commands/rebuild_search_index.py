@@ -0,0 +1,21 @@
+"""
+Rebuild the FTS5 product search index
+Usage: python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from tires and disks'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError('FTS index not available (SQLite only, run migrate first)')
+
+        with transaction.atomic():
+            search.rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,56 @@
+"""
+Deliver queued emails (orders, callback requests)
+Usage: python manage.py send_outbox [--loop] [--interval 10] [--batch-size 50]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from catalog.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Send pending emails from the outbox, reusing one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Emails sent over one SMTP connection'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the outbox (for a systemd service)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Seconds between polls with --loop'
+        )
+
+    def drain(self, batch_size):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_pending(batch_size=batch_size)
+            total_sent += sent
+            total_failed += failed
+            # A short batch means nothing else is due; failures wait for their retry time
+            if sent + failed < batch_size:
+                return total_sent, total_failed
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if not options['loop']:
+            sent, failed = self.drain(batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Done! Sent: {sent}, failed: {failed}'))
+            return
+
+        while True:
+            sent, failed = self.drain(batch_size)
+            if sent or failed:
+                self.stdout.write(f'Sent: {sent}, failed: {failed}')
+            time.sleep(options['interval'])
@@ -72,7 +72,7 @@ class Command(BaseCommand):
             if key in image_map:
                 image_path = image_map[key]
                 tire.image = image_path
-                tire.save(update_fields=['image'])
+                tire.save(update_fields=['image', 'updated_at'])
                 updated += 1
             else:
                 not_found += 1
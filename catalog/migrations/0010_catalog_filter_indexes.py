@@ -0,0 +1,73 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_change_studded_to_choices'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['diameter', 'width', 'et'], name='disk_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['pcd', 'bolts', 'dia'], name='disk_pcd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['disk_type', 'diameter'], name='disk_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['price'], name='disk_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(condition=models.Q(('in_stock', True)), fields=['price'], name='disk_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['brand', 'model_name'], name='disk_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['brand', 'model_name'], name='disk_brand_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['width', 'profile', 'diameter'], name='tire_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['diameter', 'width'], name='tire_diameter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['season', 'diameter'], name='tire_season_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['load_index', 'speed_index'], name='tire_load_speed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['price'], name='tire_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(condition=models.Q(('in_stock', True)), fields=['price'], name='tire_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['brand', 'model_name'], name='tire_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['brand', 'model_name'], name='tire_brand_model_idx'),
+        ),
+    ]
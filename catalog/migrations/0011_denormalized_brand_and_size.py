@@ -0,0 +1,112 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:34
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def _number(value):
+    value = Decimal(str(value))
+    if value == value.to_integral_value():
+        return str(value.quantize(Decimal(1)))
+    return str(value.normalize())
+
+
+def populate_denormalized(apps, schema_editor):
+    Brand = apps.get_model('catalog', 'Brand')
+    Tire = apps.get_model('catalog', 'Tire')
+    Disk = apps.get_model('catalog', 'Disk')
+
+    brand_name = Subquery(Brand.objects.filter(pk=OuterRef('brand_id')).values('name')[:1])
+    Tire.objects.update(brand_name=brand_name)
+    Disk.objects.update(brand_name=brand_name)
+
+    batch = []
+    for tire in Tire.objects.only('id', 'width', 'profile', 'diameter').iterator(chunk_size=2000):
+        tire.size_key = f"{tire.width}/{tire.profile}R{tire.diameter}"
+        batch.append(tire)
+        if len(batch) >= 2000:
+            Tire.objects.bulk_update(batch, ['size_key'])
+            batch = []
+    Tire.objects.bulk_update(batch, ['size_key'])
+
+    batch = []
+    for disk in Disk.objects.only('id', 'width', 'diameter', 'bolts', 'pcd', 'et').iterator(chunk_size=2000):
+        disk.size_key = f"{_number(disk.width)}x{disk.diameter} {disk.bolts}x{_number(disk.pcd)} ET{disk.et}"
+        batch.append(disk)
+        if len(batch) >= 2000:
+            Disk.objects.bulk_update(batch, ['size_key'])
+            batch = []
+    Disk.objects.bulk_update(batch, ['size_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_catalog_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='disk',
+            options={'ordering': ['brand_name', 'model_name'], 'verbose_name': 'Disk', 'verbose_name_plural': 'Disks'},
+        ),
+        migrations.AlterModelOptions(
+            name='tire',
+            options={'ordering': ['brand_name', 'model_name'], 'verbose_name': 'Tire', 'verbose_name_plural': 'Tires'},
+        ),
+        migrations.RemoveIndex(
+            model_name='disk',
+            name='disk_featured_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='disk',
+            name='disk_brand_model_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tire',
+            name='tire_featured_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tire',
+            name='tire_brand_model_idx',
+        ),
+        migrations.AddField(
+            model_name='disk',
+            name='brand_name',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='disk',
+            name='size_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='tire',
+            name='brand_name',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='tire',
+            name='size_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(populate_denormalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['brand_name', 'model_name'], name='disk_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['brand_name', 'model_name'], name='disk_brand_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['brand_name', 'model_name'], name='tire_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['brand_name', 'model_name'], name='tire_brand_model_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:02
+
+from django.db import migrations
+
+TIRE_SIZE = "'R' || {t}.diameter || ' ' || {t}.width || ' ' || {t}.profile || ' ' || {t}.size_key"
+DISK_SIZE = "'R' || {t}.diameter || ' ' || {t}.size_key"
+
+FORWARD_SQL = [
+    # '.' is a token character so that 6.5x16 and 5x114.3 stay whole
+    """CREATE VIRTUAL TABLE catalog_product_fts USING fts5(
+        brand, model, article, size, color,
+        tokenize = "unicode61 remove_diacritics 2 tokenchars '.'",
+        prefix = '2 3'
+    )""",
+
+    f"""CREATE TRIGGER catalog_tire_fts_ai AFTER INSERT ON catalog_tire BEGIN
+        INSERT INTO catalog_product_fts(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2, new.brand_name, new.model_name, new.article, {TIRE_SIZE.format(t='new')}, '');
+    END""",
+    f"""CREATE TRIGGER catalog_tire_fts_au
+        AFTER UPDATE OF brand_name, model_name, article, size_key ON catalog_tire BEGIN
+        DELETE FROM catalog_product_fts WHERE rowid = old.id * 2;
+        INSERT INTO catalog_product_fts(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2, new.brand_name, new.model_name, new.article, {TIRE_SIZE.format(t='new')}, '');
+    END""",
+    """CREATE TRIGGER catalog_tire_fts_ad AFTER DELETE ON catalog_tire BEGIN
+        DELETE FROM catalog_product_fts WHERE rowid = old.id * 2;
+    END""",
+
+    f"""CREATE TRIGGER catalog_disk_fts_ai AFTER INSERT ON catalog_disk BEGIN
+        INSERT INTO catalog_product_fts(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2 + 1, new.brand_name, new.model_name, new.article, {DISK_SIZE.format(t='new')}, new.color);
+    END""",
+    f"""CREATE TRIGGER catalog_disk_fts_au
+        AFTER UPDATE OF brand_name, model_name, article, size_key, color ON catalog_disk BEGIN
+        DELETE FROM catalog_product_fts WHERE rowid = old.id * 2 + 1;
+        INSERT INTO catalog_product_fts(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2 + 1, new.brand_name, new.model_name, new.article, {DISK_SIZE.format(t='new')}, new.color);
+    END""",
+    """CREATE TRIGGER catalog_disk_fts_ad AFTER DELETE ON catalog_disk BEGIN
+        DELETE FROM catalog_product_fts WHERE rowid = old.id * 2 + 1;
+    END""",
+
+    f"""INSERT INTO catalog_product_fts(rowid, brand, model, article, size, color)
+        SELECT t.id * 2, t.brand_name, t.model_name, t.article, {TIRE_SIZE.format(t='t')}, ''
+        FROM catalog_tire t""",
+    f"""INSERT INTO catalog_product_fts(rowid, brand, model, article, size, color)
+        SELECT d.id * 2 + 1, d.brand_name, d.model_name, d.article, {DISK_SIZE.format(t='d')}, d.color
+        FROM catalog_disk d""",
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS catalog_tire_fts_ai",
+    "DROP TRIGGER IF EXISTS catalog_tire_fts_au",
+    "DROP TRIGGER IF EXISTS catalog_tire_fts_ad",
+    "DROP TRIGGER IF EXISTS catalog_disk_fts_ai",
+    "DROP TRIGGER IF EXISTS catalog_disk_fts_au",
+    "DROP TRIGGER IF EXISTS catalog_disk_fts_ad",
+    "DROP TABLE IF EXISTS catalog_product_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends use the icontains fallback
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FORWARD_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in REVERSE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_denormalized_brand_and_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_product_fts_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Тема')),
+                ('body', models.TextField(verbose_name='Текст')),
+                ('from_email', models.CharField(blank=True, max_length=255, verbose_name='Від кого')),
+                ('recipients', models.TextField(help_text='Адреси через кому', verbose_name='Кому')),
+                ('status', models.CharField(choices=[('pending', 'В черзі'), ('sent', 'Надіслано'), ('failed', 'Помилка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Спроб')),
+                ('last_error', models.TextField(blank=True, verbose_name='Остання помилка')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Надіслати після')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Надіслано')),
+            ],
+            options={
+                'verbose_name': 'Лист у черзі',
+                'verbose_name_plural': 'Черга листів',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['send_after'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_outbox_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carfitment',
+            name='data_json',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.CreateModel(
+            name='FitmentSize',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tire', 'Шина'), ('wheel', 'Диск')], max_length=5)),
+                ('category', models.CharField(choices=[('oem', 'Заводський'), ('replacement', 'Заміна'), ('tuning', 'Тюнінг')], max_length=11)),
+                ('option', models.PositiveSmallIntegerField()),
+                ('position', models.CharField(choices=[('both', 'Обидві осі'), ('front', 'Перед'), ('rear', 'Зад')], default='both', max_length=5)),
+                ('label', models.CharField(max_length=100)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('profile', models.PositiveIntegerField(blank=True, null=True)),
+                ('diameter', models.PositiveIntegerField(blank=True, null=True)),
+                ('rim_width', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True)),
+                ('et', models.IntegerField(blank=True, null=True)),
+                ('size_key', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('fitment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sizes', to='catalog.carfitment')),
+            ],
+            options={
+                'verbose_name': 'Fitment Size',
+                'verbose_name_plural': 'Fitment Sizes',
+                'ordering': ['fitment', 'kind', 'category', 'option', 'position'],
+                'indexes': [models.Index(condition=models.Q(('kind', 'wheel')), fields=['diameter', 'rim_width', 'et'], name='fitment_wheel_size_idx')],
+            },
+        ),
+    ]
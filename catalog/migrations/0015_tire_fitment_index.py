@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_fitment_sizes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(condition=models.Q(('in_stock', True)), fields=['size_key', 'price'], name='tire_fit_idx'),
+        ),
+    ]
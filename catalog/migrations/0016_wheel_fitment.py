@@ -0,0 +1,69 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:50
+
+import importlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def _number(value):
+    value = Decimal(str(value))
+    if value == value.to_integral_value():
+        return str(value.quantize(Decimal(1)))
+    return str(value.normalize())
+
+
+def restore_disk_fts_triggers(apps, schema_editor):
+    # Adding a NOT NULL column makes SQLite rebuild catalog_disk, which drops
+    # the search index triggers created in 0012
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    fts = importlib.import_module('catalog.migrations.0012_product_fts_index')
+    for sql in fts.REVERSE_SQL + fts.FORWARD_SQL:
+        if 'TRIGGER catalog_disk_fts' in sql or 'TRIGGER IF EXISTS catalog_disk_fts' in sql:
+            schema_editor.execute(sql)
+
+
+def populate_bolt_pattern(apps, schema_editor):
+    Disk = apps.get_model('catalog', 'Disk')
+    batch = []
+    for disk in Disk.objects.only('id', 'bolts', 'pcd').iterator(chunk_size=2000):
+        disk.bolt_pattern = f"{disk.bolts}x{_number(disk.pcd)}"
+        batch.append(disk)
+        if len(batch) >= 2000:
+            Disk.objects.bulk_update(batch, ['bolt_pattern'])
+            batch = []
+    Disk.objects.bulk_update(batch, ['bolt_pattern'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_tire_fitment_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carfitment',
+            name='bolt_pattern',
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='carfitment',
+            name='hub_bore',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=5, null=True),
+        ),
+        # Reversed last, in case removing the column rebuilds the table again
+        migrations.RunPython(migrations.RunPython.noop, restore_disk_fts_triggers),
+        migrations.AddField(
+            model_name='disk',
+            name='bolt_pattern',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(restore_disk_fts_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(condition=models.Q(('in_stock', True)), fields=['bolt_pattern', 'diameter', 'et'], name='disk_fit_idx'),
+        ),
+        migrations.RunPython(populate_bolt_pattern, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:10
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+# Copy of catalog.sizes.YEAR_RANGE_RE as of this migration
+YEAR_RANGE_RE = re.compile(r"(?<!\d)((?:19|20)\d\d)(?!\d)(?:\s*([-–—])\s*(?:((?:19|20)\d\d)(?!\d))?)?")
+
+
+def _year_range(text):
+    match = YEAR_RANGE_RE.search(text or '')
+    if not match:
+        return None, None
+    year_from = int(match.group(1))
+    if match.group(3):
+        return year_from, max(year_from, int(match.group(3)))
+    return year_from, None if match.group(2) else year_from
+
+
+def _year_label(year_from, year_to):
+    if year_from is None:
+        return ''
+    if year_to == year_from:
+        return str(year_from)
+    return f"{year_from}-{year_to or ''}"
+
+
+def normalize_fitment(apps, schema_editor):
+    CarFitment = apps.get_model('catalog', 'CarFitment')
+    CarVendor = apps.get_model('catalog', 'CarVendor')
+    CarModel = apps.get_model('catalog', 'CarModel')
+
+    pairs = sorted(CarFitment.objects.order_by().values_list('vendor', 'car').distinct())
+    CarVendor.objects.bulk_create([CarVendor(name=name) for name in sorted({v for v, _ in pairs})], batch_size=1000)
+    vendor_ids = dict(CarVendor.objects.values_list('name', 'id'))
+    CarModel.objects.bulk_create([CarModel(vendor_id=vendor_ids[v], name=car) for v, car in pairs], batch_size=1000)
+
+    # One UPDATE per model and per distinct year string, both on the old indexes
+    for pk, vendor, car in CarModel.objects.values_list('id', 'vendor__name', 'name'):
+        CarFitment.objects.filter(vendor=vendor, car=car).update(car_model_id=pk)
+    # Years that don't parse keep their text in year_text, the rest are labels again
+    for year in CarFitment.objects.order_by().values_list('year', flat=True).distinct():
+        year_from, year_to = _year_range(year)
+        year_text = year if year_from is None else ''
+        CarFitment.objects.filter(year=year).update(year_from=year_from, year_to=year_to, year_text=year_text)
+
+
+def denormalize_fitment(apps, schema_editor):
+    CarFitment = apps.get_model('catalog', 'CarFitment')
+    CarModel = apps.get_model('catalog', 'CarModel')
+
+    for pk, vendor, car in CarModel.objects.values_list('id', 'vendor__name', 'name'):
+        CarFitment.objects.filter(car_model_id=pk).update(vendor=vendor, car=car)
+    CarFitment.objects.update(year=F('year_text'))
+    # Parsed years have no text; they go back as their labels
+    missing = CarFitment.objects.filter(year_text='')
+    for year_from, year_to in missing.order_by().values_list('year_from', 'year_to').distinct():
+        missing.filter(year_from=year_from, year_to=year_to).update(year=_year_label(year_from, year_to))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0016_wheel_fitment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarVendor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CarModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='models', to='catalog.carvendor')),
+            ],
+            options={
+                'ordering': ['vendor__name', 'name'],
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'name'), name='car_model_unique')],
+            },
+        ),
+        migrations.AddField(
+            model_name='carfitment',
+            name='car_model',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='fitments', to='catalog.carmodel'),
+        ),
+        migrations.AddField(
+            model_name='carfitment',
+            name='year_from',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='carfitment',
+            name='year_to',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='carfitment',
+            name='year_text',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        # Defaults for the string columns, which reversing adds back empty
+        # before denormalize_fitment() fills them
+        migrations.AlterField(
+            model_name='carfitment',
+            name='vendor',
+            field=models.CharField(db_index=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='carfitment',
+            name='car',
+            field=models.CharField(db_index=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='carfitment',
+            name='year',
+            field=models.CharField(db_index=True, default='', max_length=50),
+        ),
+        migrations.RunPython(normalize_fitment, denormalize_fitment),
+        migrations.AlterModelOptions(
+            name='carfitment',
+            options={'ordering': ['car_model', 'year_from', 'year_to', 'modification'], 'verbose_name': 'Car Fitment', 'verbose_name_plural': 'Car Fitments'},
+        ),
+        migrations.RemoveIndex(
+            model_name='carfitment',
+            name='catalog_car_vendor_c087d3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='carfitment',
+            name='catalog_car_vendor_e3b00e_idx',
+        ),
+        migrations.RemoveField(
+            model_name='carfitment',
+            name='car',
+        ),
+        migrations.RemoveField(
+            model_name='carfitment',
+            name='vendor',
+        ),
+        migrations.RemoveField(
+            model_name='carfitment',
+            name='year',
+        ),
+        migrations.AlterField(
+            model_name='carfitment',
+            name='car_model',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='fitments', to='catalog.carmodel'),
+        ),
+        migrations.AddIndex(
+            model_name='carfitment',
+            index=models.Index(fields=['car_model', 'year_from'], name='fitment_model_year_idx'),
+        ),
+    ]
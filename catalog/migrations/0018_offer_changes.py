@@ -0,0 +1,72 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:27
+
+import importlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # Adding the columns makes SQLite rebuild catalog_tire and catalog_disk,
+    # which drops the search index triggers created in 0012
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    fts = importlib.import_module('catalog.migrations.0012_product_fts_index')
+    for sql in fts.REVERSE_SQL + fts.FORWARD_SQL:
+        if 'TRIGGER' in sql:
+            schema_editor.execute(sql)
+
+
+def copy_updated_at(apps, schema_editor):
+    # Best known time of the last offer change for existing products
+    for name in ('Tire', 'Disk'):
+        model = apps.get_model('catalog', name)
+        model.objects.update(offer_changed_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0017_normalize_car_fitment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RemovedOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tire', 'Шина'), ('disk', 'Диск')], max_length=4)),
+                ('product_id', models.PositiveIntegerField()),
+                ('removed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['removed_at'],
+            },
+        ),
+        # Reversed last, in case removing the columns rebuilds the tables again
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AddField(
+            model_name='disk',
+            name='offer_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tire',
+            name='offer_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='disk',
+            index=models.Index(fields=['offer_changed_at'], name='disk_offer_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tire',
+            index=models.Index(fields=['offer_changed_at'], name='tire_offer_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='removedoffer',
+            index=models.Index(fields=['removed_at'], name='removed_offer_idx'),
+        ),
+    ]
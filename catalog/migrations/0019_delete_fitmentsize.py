@@ -0,0 +1,16 @@
+# Generated by Django 5.1.15 on 2026-10-19 06:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0018_offer_changes'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='FitmentSize',
+        ),
+    ]
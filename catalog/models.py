@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from decimal import Decimal
 
 
@@ -34,6 +35,29 @@ class Supplier(models.Model):
         status = "Під замовлення" if self.is_preorder else "В наявності"
         return f"{self.name} ({status}, +{self.markup_percent}%)"
 
+    # Fields shown on product pages and listing cards
+    DISPLAY_FIELDS = ("delivery_days", "is_preorder")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_display = instance._display_state()
+        return instance
+
+    def _display_state(self):
+        return {name: self.__dict__.get(name) for name in self.DISPLAY_FIELDS}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Product pages and cards are validated and cached by updated_at;
+        # markup or is_active edits don't change what they show
+        current = self._display_state()
+        if current != getattr(self, "_loaded_display", None):
+            now = timezone.now()
+            self.tires.update(updated_at=now)
+            self.disks.update(updated_at=now)
+        self._loaded_display = current
+
     def apply_markup(self, price):
         """Застосувати націнку до ціни"""
         if self.markup_percent:
@@ -58,8 +82,76 @@ class Brand(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep the denormalized brand_name on products in sync after a rename
+        now = timezone.now()
+        self.tires.exclude(brand_name=self.name).update(brand_name=self.name, updated_at=now)
+        self.disks.exclude(brand_name=self.name).update(brand_name=self.name, updated_at=now)
+
+
+def format_size_number(value):
+    """Format a size number without a trailing '.0' (7.0 -> '7', 6.5 -> '6.5')"""
+    value = Decimal(str(value))
+    if value == value.to_integral_value():
+        return str(value.quantize(Decimal(1)))
+    return str(value.normalize())
+
+
+def format_year_range(year_from, year_to):
+    """Year label for the calculator (2010, 2005-2010, 2015-)"""
+    if year_from is None:
+        return ""
+    if year_to == year_from:
+        return str(year_from)
+    return f"{year_from}-{year_to or ''}"
+
+
+# Product fields published in the price feeds' offers
+OFFER_FIELDS = ("price", "in_stock", "image")
+
+
+def _offer_state(instance):
+    """
+    Values of the loaded OFFER_FIELDS as they are stored: decimals rounded
+    to the field's decimal_places (apply_markup returns unrounded prices),
+    files by name.
+    """
+    state = {}
+    for name in OFFER_FIELDS:
+        if name in instance.__dict__:
+            value = instance.__dict__[name]
+            field = instance._meta.get_field(name)
+            if isinstance(field, models.DecimalField) and value is not None:
+                value = field.to_python(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+            state[name] = getattr(value, "name", value) or ""
+    return state
+
+
+class OfferChangeMixin:
+    """
+    Keeps offer_changed_at for delta price feeds: it moves only when a
+    save changes the price, availability or image. updated_at can't be
+    used, because imports save every product they match.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_offer = _offer_state(instance)
+        return instance
 
-class Tire(models.Model):
+    def track_offer_change(self, save_kwargs):
+        current = _offer_state(self)
+        if self._state.adding or current != getattr(self, "_loaded_offer", None):
+            self.offer_changed_at = timezone.now()
+            update_fields = save_kwargs.get("update_fields")
+            if update_fields is not None:
+                save_kwargs["update_fields"] = {*update_fields, "offer_changed_at"}
+        self._loaded_offer = current
+
+
+class Tire(OfferChangeMixin, models.Model):
     """
     Tire model - main product of the shop.
     Example: Bridgestone Turanza 6 265/60 R18 110V
@@ -110,6 +202,12 @@ class Tire(models.Model):
     profile = models.PositiveIntegerField()
     diameter = models.PositiveIntegerField()
 
+    # Denormalized copies for ordering/display without joining Brand.
+    # Maintained by save() and Brand.save(); see check_denormalized command.
+    brand_name = models.CharField(max_length=100, blank=True, editable=False)
+    size_key = models.CharField(max_length=20, blank=True, editable=False,
+                                db_index=True)  # 205/55R16
+
     # Performance specs
     load_index = models.PositiveIntegerField()
     speed_index = models.CharField(max_length=2)
@@ -156,17 +254,58 @@ class Tire(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Last change of price, availability or image (see OfferChangeMixin)
+    offer_changed_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
-        ordering = ["brand__name", "model_name"]
+        ordering = ["brand_name", "model_name"]
         verbose_name = "Tire"
         verbose_name_plural = "Tires"
+        indexes = [
+            # Size filters (tire_list, index quick search); also covers the
+            # width/profile/diameter dropdown option lists.
+            models.Index(fields=["width", "profile", "diameter"], name="tire_size_idx"),
+            models.Index(fields=["diameter", "width"], name="tire_diameter_idx"),
+            models.Index(fields=["season", "diameter"], name="tire_season_idx"),
+            models.Index(fields=["load_index", "speed_index"], name="tire_load_speed_idx"),
+            models.Index(fields=["price"], name="tire_price_idx"),
+            # Boolean filters are emitted as a bare column test, which SQLite
+            # can only answer from a partial index with the same condition.
+            models.Index(fields=["price"], condition=models.Q(in_stock=True),
+                         name="tire_in_stock_idx"),
+            models.Index(fields=["brand_name", "model_name"], condition=models.Q(is_featured=True),
+                         name="tire_featured_idx"),
+            # In-stock tires of a car's sizes, cheapest first (fitment matching)
+            models.Index(fields=["size_key", "price"], condition=models.Q(in_stock=True),
+                         name="tire_fit_idx"),
+            # Default ordering
+            models.Index(fields=["brand_name", "model_name"], name="tire_brand_model_idx"),
+            # Delta price feeds
+            models.Index(fields=["offer_changed_at"], name="tire_offer_changed_idx"),
+        ]
 
     def __str__(self):
-        return f"{self.brand.name} {self.model_name} {self.width}/{self.profile} R{self.diameter}"
+        return f"{self.brand_name or self.brand.name} {self.model_name} {self.width}/{self.profile} R{self.diameter}"
+
+    def save(self, *args, **kwargs):
+        self.refresh_denormalized()
+        self.track_offer_change(kwargs)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def make_size_key(width, profile, diameter):
+        return f"{width}/{profile}R{diameter}"
 
+    def refresh_denormalized(self):
+        """Recompute brand_name and size_key from the source fields"""
+        # Only touch the brand when it is already loaded (or unknown), so
+        # that import updates don't cost an extra query per row.
+        if self.brand_id and (not self.brand_name or Tire.brand.is_cached(self)):
+            self.brand_name = self.brand.name
+        self.size_key = self.make_size_key(self.width, self.profile, self.diameter)
 
-class Disk(models.Model):
+
+class Disk(OfferChangeMixin, models.Model):
     """
     Disk (wheel) model - second main product.
     Example: K&K Drakon 6.5x16 5x114.3 ET45 DIA67.1
@@ -211,6 +350,13 @@ class Disk(models.Model):
     dia = models.DecimalField(max_digits=5, decimal_places=1)
     et = models.IntegerField()  # 45 (can be negative)
 
+    # Denormalized copies for ordering/display without joining Brand.
+    # Maintained by save() and Brand.save(); see check_denormalized command.
+    brand_name = models.CharField(max_length=100, blank=True, editable=False)
+    size_key = models.CharField(max_length=40, blank=True, editable=False,
+                                db_index=True)  # 6.5x16 5x114.3 ET45
+    bolt_pattern = models.CharField(max_length=12, blank=True, editable=False)  # 5x114.3
+
     # Type
     disk_type = models.CharField(
         max_length=20, choices=TYPE_CHOICES, default=TYPE_ALLOY
@@ -232,14 +378,111 @@ class Disk(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Last change of price, availability or image (see OfferChangeMixin)
+    offer_changed_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
-        ordering = ["brand__name", "model_name"]
+        ordering = ["brand_name", "model_name"]
         verbose_name = "Disk"
         verbose_name_plural = "Disks"
+        indexes = [
+            # Size filters (disk_list, index quick search); also covers the
+            # diameter/width/ET dropdown option lists.
+            models.Index(fields=["diameter", "width", "et"], name="disk_size_idx"),
+            # Bolt pattern filters; also covers the PCD/DIA option lists.
+            models.Index(fields=["pcd", "bolts", "dia"], name="disk_pcd_idx"),
+            models.Index(fields=["disk_type", "diameter"], name="disk_type_idx"),
+            models.Index(fields=["price"], name="disk_price_idx"),
+            # Boolean filters are emitted as a bare column test, which SQLite
+            # can only answer from a partial index with the same condition.
+            models.Index(fields=["price"], condition=models.Q(in_stock=True),
+                         name="disk_in_stock_idx"),
+            models.Index(fields=["brand_name", "model_name"], condition=models.Q(is_featured=True),
+                         name="disk_featured_idx"),
+            # In-stock wheels for a car: bolt pattern, then diameter and ET ranges
+            models.Index(fields=["bolt_pattern", "diameter", "et"], condition=models.Q(in_stock=True),
+                         name="disk_fit_idx"),
+            # Default ordering
+            models.Index(fields=["brand_name", "model_name"], name="disk_brand_model_idx"),
+            # Delta price feeds
+            models.Index(fields=["offer_changed_at"], name="disk_offer_changed_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.brand_name or self.brand.name} {self.model_name} {self.width}x{self.diameter} {self.bolts}x{self.pcd}"
+
+    def save(self, *args, **kwargs):
+        self.refresh_denormalized()
+        self.track_offer_change(kwargs)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def make_size_key(width, diameter, bolts, pcd, et):
+        return f"{format_size_number(width)}x{diameter} {bolts}x{format_size_number(pcd)} ET{et}"
+
+    @staticmethod
+    def make_bolt_pattern(bolts, pcd):
+        """Same key for disks and car fitment: 5x114.3, 4x100"""
+        return f"{bolts}x{format_size_number(pcd)}"
+
+    def refresh_denormalized(self):
+        """Recompute brand_name, size_key and bolt_pattern from the source fields"""
+        if self.brand_id and (not self.brand_name or Disk.brand.is_cached(self)):
+            self.brand_name = self.brand.name
+        self.size_key = self.make_size_key(self.width, self.diameter, self.bolts, self.pcd, self.et)
+        self.bolt_pattern = self.make_bolt_pattern(self.bolts, self.pcd)
+
+
+class RemovedOffer(models.Model):
+    """Deleted tire or disk, kept for a while so delta price feeds can report it"""
+
+    KIND_TIRE = "tire"
+    KIND_DISK = "disk"
+    KIND_CHOICES = [
+        (KIND_TIRE, "Шина"),
+        (KIND_DISK, "Диск"),
+    ]
+
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    product_id = models.PositiveIntegerField()
+    removed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["removed_at"]
+        indexes = [
+            models.Index(fields=["removed_at"], name="removed_offer_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}_{self.product_id}"
+
+
+class CarVendor(models.Model):
+    """Car manufacturer (BMW, Audi, etc.) for the fitment calculator"""
+
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class CarModel(models.Model):
+    """Car model of a vendor (X5, A4, etc.)"""
+
+    vendor = models.ForeignKey(CarVendor, on_delete=models.CASCADE, related_name="models")
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ["vendor__name", "name"]
+        constraints = [
+            models.UniqueConstraint(fields=["vendor", "name"], name="car_model_unique"),
+        ]
 
     def __str__(self):
-        return f"{self.brand.name} {self.model_name} {self.width}x{self.diameter} {self.bolts}x{self.pcd}"
+        return f"{self.vendor.name} {self.name}"
 
 
 class CarFitment(models.Model):
@@ -249,9 +492,11 @@ class CarFitment(models.Model):
     """
 
     # Car identification
-    vendor = models.CharField(max_length=100, db_index=True)  # Manufacturer (BMW, Audi, etc.)
-    car = models.CharField(max_length=100, db_index=True)  # Model (X5, A4, etc.)
-    year = models.CharField(max_length=50, db_index=True)  # Year or year range
+    # Indexed by fitment_model_year_idx
+    car_model = models.ForeignKey(CarModel, on_delete=models.CASCADE, related_name="fitments", db_index=False)
+    year_from = models.PositiveSmallIntegerField(null=True, blank=True)  # None if the year was not given
+    year_to = models.PositiveSmallIntegerField(null=True, blank=True)  # None if still produced
+    year_text = models.CharField(max_length=50, blank=True)  # As imported, only when it doesn't parse
     modification = models.CharField(max_length=200)  # Engine/trim variant
 
     # Wheel specs
@@ -259,6 +504,10 @@ class CarFitment(models.Model):
     center_bore = models.CharField(max_length=50, blank=True)  # Center bore diameter
     bolt_type = models.CharField(max_length=100, blank=True)  # Bolt/nut type
 
+    # pcd and center_bore parsed at import (see catalog.fitment)
+    bolt_pattern = models.CharField(max_length=12, blank=True, db_index=True)  # 5x120, as Disk.bolt_pattern
+    hub_bore = models.DecimalField(max_digits=5, decimal_places=1, null=True, blank=True)  # 72.6
+
     # Tire sizes (separated by | for multiple options, # for front/rear)
     oem_tires = models.TextField(blank=True)  # Factory tire sizes
     replacement_tires = models.TextField(blank=True)  # Replacement options
@@ -269,14 +518,69 @@ class CarFitment(models.Model):
     replacement_wheels = models.TextField(blank=True)  # Replacement options
     tuning_wheels = models.TextField(blank=True)  # Tuning/upgrade options
 
+    # calculator_get_fitment response, built at import from the parsed sizes
+    data_json = models.TextField(blank=True, editable=False)
+
     class Meta:
-        ordering = ["vendor", "car", "year"]
+        ordering = ["car_model", "year_from", "year_to", "modification"]
         verbose_name = "Car Fitment"
         verbose_name_plural = "Car Fitments"
         indexes = [
-            models.Index(fields=["vendor", "car"]),
-            models.Index(fields=["vendor", "car", "year"]),
+            models.Index(fields=["car_model", "year_from"], name="fitment_model_year_idx"),
         ]
 
     def __str__(self):
-        return f"{self.vendor} {self.car} {self.year} {self.modification}"
+        return f"{self.car_model} {self.year} {self.modification}"
+
+    @property
+    def year(self):
+        return format_year_range(self.year_from, self.year_to) or self.year_text
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued by the site (orders, callback requests) and delivered
+    by the send_outbox command, so requests never wait for SMTP.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "В черзі"),
+        (STATUS_SENT, "Надіслано"),
+        (STATUS_FAILED, "Помилка"),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(max_length=255, blank=True, verbose_name="Від кого")
+    recipients = models.TextField(verbose_name="Кому", help_text="Адреси через кому")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING,
+                              verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Спроб")
+    last_error = models.TextField(blank=True, verbose_name="Остання помилка")
+    send_after = models.DateTimeField(default=timezone.now, verbose_name="Надіслати після")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Надіслано")
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Лист у черзі"
+        verbose_name_plural = "Черга листів"
+        indexes = [
+            # The sender only ever looks at due pending mail
+            models.Index(
+                fields=["send_after"],
+                name="outbox_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients}"
+
+    @property
+    def recipient_list(self):
+        return [address.strip() for address in self.recipients.split(",") if address.strip()]
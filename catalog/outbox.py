@@ -0,0 +1,122 @@
+"""
+Outgoing email queue.
+
+Views only add rows to OutboxEmail (one INSERT per request); the
+send_outbox command delivers them over a single SMTP connection per
+batch and retries failures with a growing delay. When the server can't
+be reached, the messages are postponed without using up their attempts.
+Run one sender at a time (the tireshop-mail service set up by deploy.sh
+is one).
+"""
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+SHOP_EMAIL = "info@120.com.ua"
+
+# Give up after this many failed attempts
+MAX_ATTEMPTS = 6
+
+# Delay before retry N: 1, 2, 4, 8, 16 minutes
+RETRY_BASE = timedelta(minutes=1)
+
+# Errors of the connection rather than of a message; they postpone the
+# rest of the batch by CONNECTION_RETRY without counting as attempts
+CONNECTION_ERRORS = (ConnectionError, TimeoutError, smtplib.SMTPServerDisconnected)
+CONNECTION_RETRY = timedelta(minutes=1)
+
+
+def make_email(subject, message, recipient_list, from_email=None):
+    """Unsaved outbox entry; save with queue_mail()"""
+    return OutboxEmail(
+        subject=subject[:255],
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or "",
+        recipients=",".join(recipient_list),
+    )
+
+
+def queue_mail(*emails):
+    """Queue emails built by make_email() with a single INSERT"""
+    return OutboxEmail.objects.bulk_create(emails)
+
+
+def _retry_delay(attempts):
+    return RETRY_BASE * (2 ** (attempts - 1))
+
+
+def deliver_pending(batch_size=50, connection=None):
+    """
+    Send one batch of due emails over one connection.
+    Returns (sent, failed) counts; both 0 when nothing is due.
+    """
+    now = timezone.now()
+    batch = list(
+        OutboxEmail.objects.filter(status=OutboxEmail.STATUS_PENDING, send_after__lte=now)
+        .order_by("send_after", "id")[:batch_size]
+    )
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    sent = failed = 0
+    try:
+        connection.open()
+    except Exception as e:
+        # Server unreachable: the whole batch is retried later
+        _postpone(batch, e, now)
+        return 0, len(batch)
+
+    try:
+        for i, email in enumerate(batch):
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email or None,
+                to=email.recipient_list,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except CONNECTION_ERRORS as e:
+                _postpone(batch[i:], e, now)
+                failed += len(batch) - i
+                break
+            except Exception as e:
+                _mark_failed(email, e, now)
+                failed += 1
+            else:
+                email.status = OutboxEmail.STATUS_SENT
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.last_error = ""
+                email.save(update_fields=["status", "attempts", "sent_at", "last_error"])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _error_text(error):
+    return f"{type(error).__name__}: {error}"[:1000]
+
+
+def _postpone(emails, error, now):
+    OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+        send_after=now + CONNECTION_RETRY, last_error=_error_text(error)
+    )
+
+
+def _mark_failed(email, error, now):
+    email.attempts += 1
+    email.last_error = _error_text(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboxEmail.STATUS_FAILED
+    else:
+        email.send_after = now + _retry_delay(email.attempts)
+    email.save(update_fields=["status", "attempts", "last_error", "send_after"])
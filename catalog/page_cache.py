@@ -0,0 +1,202 @@
+"""
+Full-page cache for anonymous catalog pages.
+
+Rendered pages are stored in the default cache (file-based, shared by all
+gunicorn workers) under a key made of the path, the normalized query string
+and the current data version(s). Imports and admin edits bump the catalog
+version, so stale pages are never served and never need to be purged; old
+entries simply expire.
+
+The cache is bypassed for non-GET requests, logged-in users and visitors
+with something in the cart.
+
+The same version stamps (plus the product's updated_at on detail pages) are
+used as ETags, and the time of the last bump as Last-Modified, so bots and
+returning browsers get a 304 without the view running at all.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .versions import get_version, version_time, CATALOG
+
+# Cookie holding the number of items in the cart (set by the cart views)
+CART_COUNT_COOKIE = "cart_count"
+
+# Query parameters that never change the page
+IGNORED_PARAMS = {"fbclid", "gclid", "yclid"}
+
+
+def normalize_query(query_dict):
+    """Sorted, de-duplicated query string without empty and tracking params"""
+    items = []
+    for key in sorted(query_dict.keys()):
+        if key in IGNORED_PARAMS or key.startswith("utm_"):
+            continue
+        for value in sorted(set(query_dict.getlist(key))):
+            if value != "":
+                items.append((key, value))
+    return urlencode(items)
+
+
+def page_cache_key(request, versions):
+    stamp = "-".join(get_version(name) for name in versions)
+    raw = f"{request.path}?{normalize_query(request.GET)}"
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"page:{stamp}:{digest}"
+
+
+def is_cacheable_request(request):
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if request.COOKIES.get(CART_COUNT_COOKIE, "0") not in ("", "0"):
+        return False
+    # Only visitors with a session can be logged in; don't load it otherwise
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        if request.user.is_authenticated:
+            return False
+        # A cart saved in the session before the count cookie existed
+        cart = request.session.get("cart") if CART_COUNT_COOKIE not in request.COOKIES else None
+        if cart and (cart.get("tires") or cart.get("disks")):
+            return False
+    return True
+
+
+def cache_catalog_page(view=None, versions=(CATALOG,)):
+    """
+    Cache the rendered page for anonymous visitors.
+
+        @cache_catalog_page
+        def tire_list(request): ...
+
+        @cache_catalog_page(versions=(FITMENT,))
+        def calculator_by_car(request): ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, "PAGE_CACHE_ENABLED", True) or not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            # Pages read the CSRF token from the cookie, so make sure the
+            # visitor gets one even when the page comes from the cache
+            get_token(request)
+
+            key = page_cache_key(request, versions)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response["X-Page-Cache"] = "hit"
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+            ):
+                if hasattr(response, "render") and callable(response.render):
+                    response.render()
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    settings.PAGE_CACHE_TIMEOUT,
+                )
+                response["X-Page-Cache"] = "miss"
+            return response
+        return wrapper
+
+    if view is not None:
+        return decorator(view)
+    return decorator
+
+
+def version_etag(versions=(CATALOG,), public=False):
+    """
+    ETag function for pages that only change with the data version.
+    Pages (public=False) are validated for the same visitors the page
+    cache serves; public JSON endpoints are validated for everyone.
+    """
+    def etag_func(request, *args, **kwargs):
+        if not public and not is_cacheable_request(request):
+            return None
+        return "-".join(get_version(name) for name in versions)
+    return etag_func
+
+
+def version_last_modified(versions=(CATALOG,), public=False):
+    """Last-Modified function to go with version_etag(): the latest bump of the versions"""
+    def last_modified_func(request, *args, **kwargs):
+        if not public and not is_cacheable_request(request):
+            return None
+        times = [t for t in (version_time(name) for name in versions) if t is not None]
+        return max(times, default=None)
+    return last_modified_func
+
+
+def version_validators(versions=(CATALOG,), public=False):
+    """(etag_func, last_modified_func) for a page that only changes with the versions"""
+    return version_etag(versions, public), version_last_modified(versions, public)
+
+
+def _product_updated_at(request, model, slug):
+    """updated_at of the product, looked up once per request"""
+    cache_attr = "_catalog_updated_at"
+    if not hasattr(request, cache_attr):
+        updated_at = (
+            model.objects.filter(slug=slug).values_list("updated_at", flat=True).first()
+        )
+        setattr(request, cache_attr, updated_at)
+    return getattr(request, cache_attr)
+
+
+def product_validators(model):
+    """
+    (etag_func, last_modified_func) for a product detail page. The page
+    also shows same-size alternatives with their prices and stock, so the
+    product's own updated_at is combined with the catalog version.
+    """
+    def etag_func(request, slug):
+        if not is_cacheable_request(request):
+            return None
+        updated_at = _product_updated_at(request, model, slug)
+        if updated_at is None:
+            return None
+        return f"{model._meta.model_name}-{int(updated_at.timestamp() * 1000000):x}-{get_version(CATALOG)}"
+
+    def last_modified_func(request, slug):
+        if not is_cacheable_request(request):
+            return None
+        updated_at = _product_updated_at(request, model, slug)
+        if updated_at is None:
+            return None
+        return max(t for t in (updated_at, version_time(CATALOG)) if t is not None)
+
+    return etag_func, last_modified_func
+
+
+def conditional_page(etag_func=None, last_modified_func=None):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before the view runs.
+    Responses carry Cache-Control: no-cache so browsers always revalidate
+    instead of guessing a freshness lifetime from Last-Modified.
+    """
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header("ETag") or response.has_header("Last-Modified"):
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
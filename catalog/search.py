@@ -0,0 +1,204 @@
+"""
+Full-text product search backed by an SQLite FTS5 index.
+
+catalog_product_fts holds one row per tire and disk (rowid = id * 2 for
+tires, id * 2 + 1 for disks) and is kept in sync by triggers on the
+product tables, so imports, admin edits and bulk updates never have to
+touch it explicitly. SQLite drops those triggers whenever a migration
+rebuilds a product table, so they are checked after every migrate. On
+other databases, or before the migration has run, search falls back to
+icontains lookups.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Tire, Disk
+from .sizes import parse_size_query
+
+FTS_TABLE = "catalog_product_fts"
+
+# Column weights for bm25(): brand, model, article, size, color
+RANK_WEIGHTS = "10.0, 5.0, 3.0, 2.0, 1.0"
+
+TOKEN_RE = re.compile(r"[\w.]+", re.UNICODE)
+
+TIRE_SIZE_SQL = "'R' || {t}.diameter || ' ' || {t}.width || ' ' || {t}.profile || ' ' || {t}.size_key"
+DISK_SIZE_SQL = "'R' || {t}.diameter || ' ' || {t}.size_key"
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""INSERT INTO {FTS_TABLE}(rowid, brand, model, article, size, color)
+        SELECT t.id * 2, t.brand_name, t.model_name, t.article, {TIRE_SIZE_SQL.format(t='t')}, ''
+        FROM catalog_tire t""",
+    f"""INSERT INTO {FTS_TABLE}(rowid, brand, model, article, size, color)
+        SELECT d.id * 2 + 1, d.brand_name, d.model_name, d.article, {DISK_SIZE_SQL.format(t='d')}, d.color
+        FROM catalog_disk d""",
+]
+
+# Same triggers as migration 0012, by name
+TRIGGER_SQL = {
+    "catalog_tire_fts_ai": f"""CREATE TRIGGER catalog_tire_fts_ai AFTER INSERT ON catalog_tire BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2, new.brand_name, new.model_name, new.article, {TIRE_SIZE_SQL.format(t='new')}, '');
+    END""",
+    "catalog_tire_fts_au": f"""CREATE TRIGGER catalog_tire_fts_au
+        AFTER UPDATE OF brand_name, model_name, article, size_key ON catalog_tire BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2;
+        INSERT INTO {FTS_TABLE}(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2, new.brand_name, new.model_name, new.article, {TIRE_SIZE_SQL.format(t='new')}, '');
+    END""",
+    "catalog_tire_fts_ad": f"""CREATE TRIGGER catalog_tire_fts_ad AFTER DELETE ON catalog_tire BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2;
+    END""",
+    "catalog_disk_fts_ai": f"""CREATE TRIGGER catalog_disk_fts_ai AFTER INSERT ON catalog_disk BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2 + 1, new.brand_name, new.model_name, new.article, {DISK_SIZE_SQL.format(t='new')}, new.color);
+    END""",
+    "catalog_disk_fts_au": f"""CREATE TRIGGER catalog_disk_fts_au
+        AFTER UPDATE OF brand_name, model_name, article, size_key, color ON catalog_disk BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + 1;
+        INSERT INTO {FTS_TABLE}(rowid, brand, model, article, size, color)
+        VALUES (new.id * 2 + 1, new.brand_name, new.model_name, new.article, {DISK_SIZE_SQL.format(t='new')}, new.color);
+    END""",
+    "catalog_disk_fts_ad": f"""CREATE TRIGGER catalog_disk_fts_ad AFTER DELETE ON catalog_disk BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + 1;
+    END""",
+}
+
+_fts_available = None
+
+
+def fts_available():
+    """True when the FTS index exists in the current database"""
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != "sqlite":
+            _fts_available = False
+        else:
+            _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every word becomes a quoted prefix term, all terms must match:
+    'мішл 205' -> '"мішл"* "205"*'
+    """
+    tokens = TOKEN_RE.findall(query)
+    return " ".join(f'"{token}"*' for token in tokens if token.strip("."))
+
+
+def _ranked_ids(match, parity, limit):
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND (rowid & 1) = %s "
+        f"ORDER BY bm25({FTS_TABLE}, {RANK_WEIGHTS}) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, parity, limit])
+        return [row[0] // 2 for row in cursor.fetchall()]
+
+
+def _in_order(queryset, ids):
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def _text_q(match, parity):
+    """Restrict a product queryset to FTS matches (unranked)"""
+    return Q(id__in=RawSQL(
+        f"SELECT rowid / 2 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND (rowid & 1) = %s",
+        [match, parity],
+    ))
+
+
+def _search(queryset, query, parity, fallback_fields, limit, filters):
+    if filters:
+        # Structured size filters hit the size indexes; leftover words
+        # narrow the result further but can't rank it.
+        queryset = queryset.filter(**filters)
+        if query:
+            if fts_available():
+                match = build_match_query(query)
+                if match:
+                    queryset = queryset.filter(_text_q(match, parity))
+            else:
+                q = Q()
+                for field in fallback_fields:
+                    q |= Q(**{f"{field}__icontains": query})
+                queryset = queryset.filter(q)
+        return list(queryset[:limit])
+
+    if not fts_available():
+        q = Q()
+        for field in fallback_fields:
+            q |= Q(**{f"{field}__icontains": query})
+        return list(queryset.filter(q)[:limit])
+
+    match = build_match_query(query)
+    if not match:
+        return []
+    return _in_order(queryset, _ranked_ids(match, parity, limit))
+
+
+def search_tires(query, limit=20, queryset=None, filters=None):
+    """Tires matching the text query (and size filters), best matches first"""
+    queryset = Tire.objects.all() if queryset is None else queryset
+    fields = ("brand_name", "model_name", "article")
+    return _search(queryset, query, 0, fields, limit, filters)
+
+
+def search_disks(query, limit=20, queryset=None, filters=None):
+    """Disks matching the text query (and size filters), best matches first"""
+    queryset = Disk.objects.all() if queryset is None else queryset
+    fields = ("brand_name", "model_name", "article", "color")
+    return _search(queryset, query, 1, fields, limit, filters)
+
+
+def search_catalog(query, limit=20):
+    """
+    Search both product types.
+    Sizes in the query ("205/55 R16", "5x114.3 ET45") become exact column
+    filters; a query that can only describe one product type skips the other.
+    """
+    parsed = parse_size_query(query)
+    text = parsed["text"]
+    tires = []
+    disks = []
+
+    if parsed["tire"] is not None and (parsed["tire"] or text):
+        tires = search_tires(text, limit=limit, filters=parsed["tire"])
+    if parsed["disk"] is not None and (parsed["disk"] or text):
+        disks = search_disks(text, limit=limit, filters=parsed["disk"])
+    return tires, disks
+
+
+def rebuild_index():
+    """Repopulate the FTS index from the product tables"""
+    with connection.cursor() as cursor:
+        for sql in REBUILD_SQL:
+            cursor.execute(sql)
+
+
+def restore_triggers(using="default"):
+    """
+    Create the index triggers that are missing and, if any were, rebuild
+    the index, which missed the changes made without them. Returns the
+    names of the re-created triggers.
+    """
+    db = connections[using]
+    if db.vendor != "sqlite" or FTS_TABLE not in db.introspection.table_names():
+        return []
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGER_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGER_SQL[name])
+        if missing:
+            for sql in REBUILD_SQL:
+                cursor.execute(sql)
+    return missing
@@ -0,0 +1,44 @@
+"""
+Signal handlers that bump the catalog version on any product data change,
+log deleted products for the delta price feeds, republish the feeds
+after bulk changes and keep the search index triggers after migrations
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import search
+from .feeds import publish_feeds
+from .models import Brand, RemovedOffer, Supplier, Tire, Disk
+from .versions import bump_version, versions_bumped, CATALOG
+
+
+@receiver(post_save, sender=Tire)
+@receiver(post_save, sender=Disk)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Tire)
+@receiver(post_delete, sender=Disk)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Supplier)
+def catalog_changed(sender, **kwargs):
+    bump_version(CATALOG)
+
+
+@receiver(post_delete, sender=Tire)
+@receiver(post_delete, sender=Disk)
+def offer_removed(sender, instance, **kwargs):
+    kind = RemovedOffer.KIND_TIRE if sender is Tire else RemovedOffer.KIND_DISK
+    RemovedOffer.objects.create(kind=kind, product_id=instance.pk)
+
+
+@receiver(versions_bumped)
+def catalog_bumped(sender, names, **kwargs):
+    # Imports and price recalculations: render the feeds crawlers fetch now,
+    # not on their first request. Single saves leave it to feed_file().
+    if CATALOG in names:
+        publish_feeds()
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    # Connected to post_migrate in CatalogConfig.ready()
+    search.restore_triggers(using)
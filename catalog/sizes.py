@@ -0,0 +1,223 @@
+"""
+Tire and wheel size parsing.
+
+Customers type sizes the way they are printed on the sidewall or the rim:
+"205/55 R16", "205 55 16", "R17 5x114.3", "6.5x16 ET45". parse_size_query()
+pulls those out of free text as structured filters for Tire/Disk, leaving
+the remaining words for text search.
+
+parse_fitment_sizes() reads the size lists of the car fitment data:
+"205/55 R16|225/45 R17#245/40 R17" (options separated by |, front#rear),
+parse_bolt_pattern() and parse_center_bore() its "5*120" and "72.6" specs,
+parse_year_range() its "2010" / "2005-2010" / "2015-" years.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+# "x" may be typed as Latin x, Cyrillic х, "*" or the multiplication sign
+X = r"\s*[xXхХ*×]\s*"
+R = r"[RrРр]"
+NUM = r"\d{1,3}(?:[.,]\d{1,2})?"
+
+# 205/55 R16, 205/55R16, 205/55-16, 205/55 ZR16, 205/55
+TIRE_SLASH_RE = re.compile(
+    rf"(?<![\d.])(\d{{3}})\s*/\s*(\d{{2}})(?:\s*(?:Z?{R}|-)?\s*(\d{{2}})C?)?(?![\d.])"
+)
+# 205 55 16 (three bare numbers in plausible ranges)
+TIRE_SPACED_RE = re.compile(
+    r"(?<![\d.])(1[2-9]\d|[23]\d\d)\s+([2-9][05])\s+(?:Z?[RrРр]\s?)?(1[2-9]|2[0-4])(?![\d.])"
+)
+# 5x114.3, 4*100, 5х112
+PCD_RE = re.compile(rf"(?<![\d.])([3-8]){X}(9[89]|1\d\d|20\d)([.,]\d)?(?![\d.])")
+# 6.5x16, 6,5Jx16, 7x17
+RIM_RE = re.compile(rf"(?<![\d.])(\d{{1,2}}(?:[.,]\d)?)\s*[jJ]?{X}(1[2-9]|2[0-4])(?![\d.])")
+# R16, R 17, ZR18, R15C
+DIAMETER_RE = re.compile(rf"(?<![\w.])Z?{R}\s?(1[2-9]|2[0-4])C?(?![\d.])")
+# ET45, ET 35, ET-10
+ET_RE = re.compile(r"(?<![\w.])ET\s?(-?\d{1,3})(?![\d.])", re.IGNORECASE)
+# 72.6, 66,1 mm
+BORE_RE = re.compile(r"(?<![\d.])(\d{2,3}(?:[.,]\d{1,2})?)(?![\d])")
+# 2010, 2005-2010, 2015 - н.в.
+YEAR_RANGE_RE = re.compile(r"(?<!\d)((?:19|20)\d\d)(?!\d)(?:\s*([-–—])\s*(?:((?:19|20)\d\d)(?!\d))?)?")
+# DIA67.1, d 57.1
+DIA_RE = re.compile(r"(?<![\w.])(?:DIA|D)\s?(\d{2,3}(?:[.,]\d)?)(?![\d.])", re.IGNORECASE)
+
+TIRE_ONLY = {"profile"}
+DISK_ONLY = {"rim_width", "bolts", "pcd", "et", "dia"}
+
+
+def _decimal(value):
+    try:
+        return Decimal(value.replace(",", "."))
+    except InvalidOperation:
+        return None
+
+
+def parse_size_query(text):
+    """
+    Extract size specs from free text.
+
+    Returns a dict:
+        "tire": Tire filter kwargs, or None if the query can't be a tire
+        "disk": Disk filter kwargs, or None if the query can't be a disk
+        "text": the query with the size fragments removed
+
+    Both filter dicts are empty when the query contains no size at all.
+    """
+    specs = {}
+
+    def take(regex, handler):
+        nonlocal text
+        match = regex.search(text)
+        if match and handler(match):
+            text = text[:match.start()] + " " + text[match.end():]
+
+    def tire_slash(m):
+        specs["width"] = int(m.group(1))
+        specs["profile"] = int(m.group(2))
+        if m.group(3):
+            specs["diameter"] = int(m.group(3))
+        return True
+
+    def tire_spaced(m):
+        specs["width"] = int(m.group(1))
+        specs["profile"] = int(m.group(2))
+        specs["diameter"] = int(m.group(3))
+        return True
+
+    def pcd(m):
+        specs["bolts"] = int(m.group(1))
+        specs["pcd"] = _decimal(m.group(2) + (m.group(3) or ""))
+        return True
+
+    def rim(m):
+        width = _decimal(m.group(1))
+        if width is None or not 3 <= width <= 13:
+            return False
+        specs["rim_width"] = width
+        specs["diameter"] = int(m.group(2))
+        return True
+
+    def diameter(m):
+        specs.setdefault("diameter", int(m.group(1)))
+        return True
+
+    def et(m):
+        specs["et"] = int(m.group(1))
+        return True
+
+    def dia(m):
+        specs["dia"] = _decimal(m.group(1))
+        return True
+
+    # Order matters: PCD before rim size (both are "AxB"), tire sizes first
+    take(TIRE_SLASH_RE, tire_slash)
+    if "width" not in specs:
+        take(TIRE_SPACED_RE, tire_spaced)
+    take(PCD_RE, pcd)
+    take(RIM_RE, rim)
+    take(DIAMETER_RE, diameter)
+    take(ET_RE, et)
+    take(DIA_RE, dia)
+
+    keys = set(specs)
+    tire = None
+    if not keys & DISK_ONLY:
+        tire = {k: specs[k] for k in ("width", "profile", "diameter") if k in specs}
+    disk = None
+    if not keys & TIRE_ONLY:
+        disk = {k: specs[k] for k in ("diameter", "bolts", "pcd", "et", "dia") if k in specs}
+        if "rim_width" in specs:
+            disk["width"] = specs["rim_width"]
+
+    return {
+        "tire": tire,
+        "disk": disk,
+        "text": " ".join(text.split()),
+    }
+
+
+def parse_tire_size(label):
+    """'205/55 R16' -> {"width": 205, "profile": 55, "diameter": 16}, or None"""
+    match = TIRE_SLASH_RE.search(label)
+    if not match or not match.group(3):
+        return None
+    return {
+        "width": int(match.group(1)),
+        "profile": int(match.group(2)),
+        "diameter": int(match.group(3)),
+    }
+
+
+def parse_wheel_size(label):
+    """'7.5Jx17 ET40' -> {"rim_width": Decimal("7.5"), "diameter": 17, "et": 40}, or None"""
+    match = RIM_RE.search(label)
+    if not match:
+        return None
+    rim_width = _decimal(match.group(1))
+    if rim_width is None or not 3 <= rim_width <= 13:
+        return None
+    et = ET_RE.search(label)
+    return {
+        "rim_width": rim_width,
+        "diameter": int(match.group(2)),
+        "et": int(et.group(1)) if et else None,
+    }
+
+
+def parse_fitment_sizes(text, kind):
+    """
+    Split a fitment size list into options.
+
+    Returns a list of options; an option is a list of one size (fits both
+    axles) or two (front, rear). A size is {"label": ..., "position":
+    "both"/"front"/"rear", **parsed fields}; parsed fields are missing when
+    the label couldn't be parsed.
+    """
+    parse = parse_tire_size if kind == "tire" else parse_wheel_size
+    options = []
+    for item in (text or "").split("|"):
+        item = item.strip()
+        if not item:
+            continue
+        if "#" in item:
+            front, rear = (part.strip() for part in item.split("#", 1))
+            labels = [(front, "front"), (rear or front, "rear")]
+        else:
+            labels = [(item, "both")]
+        options.append([
+            {"label": label, "position": position, **(parse(label) or {})}
+            for label, position in labels
+        ])
+    return options
+
+
+def parse_bolt_pattern(text):
+    """'5*114.3' -> (5, Decimal("114.3")), or None"""
+    match = PCD_RE.search(text or "")
+    if not match:
+        return None
+    return int(match.group(1)), _decimal(match.group(2) + (match.group(3) or ""))
+
+
+def parse_center_bore(text):
+    """'72.6' -> Decimal("72.6"), or None"""
+    match = BORE_RE.search(text or "")
+    if not match:
+        return None
+    bore = _decimal(match.group(1))
+    return bore if bore is not None and 40 <= bore <= 200 else None
+
+
+def parse_year_range(text):
+    """
+    '2010' -> (2010, 2010), '2005-2010' -> (2005, 2010),
+    '2015-' -> (2015, None), unparseable -> (None, None)
+    """
+    match = YEAR_RANGE_RE.search(text or "")
+    if not match:
+        return None, None
+    year_from = int(match.group(1))
+    if match.group(3):
+        return year_from, max(year_from, int(match.group(3)))
+    return year_from, None if match.group(2) else year_from
@@ -0,0 +1,133 @@
+"""
+Typeahead suggestions served from an in-memory prefix index.
+
+The index is a sorted list of (key, kind, label, weight) tuples; a prefix
+lookup is two bisects plus a top-N pass over the matching range, so
+per-keystroke requests never touch SQLite. Short prefixes match a large
+share of the catalog, so their answers are ranked once when the index is
+built. Each worker rebuilds its copy lazily when the catalog version
+changes.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from itertools import groupby
+
+from django.db.models import Count
+
+from .models import Tire, Disk, format_size_number
+from .versions import get_version, CATALOG
+
+KIND_BRAND = "brand"
+KIND_MODEL = "model"
+KIND_SIZE = "size"
+
+# Suggestions returned per kind
+LIMITS = {KIND_BRAND: 3, KIND_MODEL: 5, KIND_SIZE: 5}
+
+# Prefixes up to this length are answered from lists ranked at build time
+TOP_PREFIX_LEN = 3
+
+_KEY_RE = re.compile(r"[^\w.]+", re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase and drop spaces/punctuation: 'Michelin 205/55 R16' -> 'michelin20555r16'"""
+    return _KEY_RE.sub("", str(text).lower())
+
+
+def build_entries():
+    """Collect weighted brand, model and size suggestions from the catalog"""
+    weights = {}
+
+    def add(kind, label, weight, keys):
+        for key in keys:
+            if key:
+                entry = (key, kind, label)
+                weights[entry] = weights.get(entry, 0) + weight
+
+    for model in (Tire, Disk):
+        rows = model.objects.order_by().values("brand_name").annotate(n=Count("id"))
+        for row in rows:
+            add(KIND_BRAND, row["brand_name"], row["n"], [normalize(row["brand_name"])])
+
+        rows = model.objects.order_by().values("brand_name", "model_name").annotate(n=Count("id"))
+        for row in rows:
+            label = f"{row['brand_name']} {row['model_name']}"
+            # Match on "brand model" as well as on the model name alone
+            add(KIND_MODEL, label, row["n"], [normalize(label), normalize(row["model_name"])])
+
+    rows = Tire.objects.order_by().values("width", "profile", "diameter").annotate(n=Count("id"))
+    for row in rows:
+        label = f"{row['width']}/{row['profile']} R{row['diameter']}"
+        add(KIND_SIZE, label, row["n"], [normalize(label)])
+
+    rows = Disk.objects.order_by().values("bolts", "pcd").annotate(n=Count("id"))
+    for row in rows:
+        label = f"{row['bolts']}x{format_size_number(row['pcd'])}"
+        add(KIND_SIZE, label, row["n"], [normalize(label)])
+
+    return sorted((key, kind, label, weight) for (key, kind, label), weight in weights.items())
+
+
+def rank(candidates):
+    """Heaviest distinct labels of each kind, up to LIMITS"""
+    results = []
+    for kind, limit in LIMITS.items():
+        seen = set()
+        best = heapq.nlargest(
+            limit * 2,
+            (entry for entry in candidates if entry[1] == kind),
+            key=lambda entry: entry[3],
+        )
+        for _, _, label, _ in best:
+            if label not in seen and len(seen) < limit:
+                seen.add(label)
+                results.append({"kind": kind, "label": label})
+    return results
+
+
+class PrefixIndex:
+    def __init__(self, entries):
+        self.entries = entries
+        self.keys = [entry[0] for entry in entries]
+        self.top = {}
+        for length in range(1, TOP_PREFIX_LEN + 1):
+            # Entries stay sorted, so each prefix is one contiguous group
+            longer = (entry for entry in entries if len(entry[0]) >= length)
+            for prefix, group in groupby(longer, key=lambda entry: entry[0][:length]):
+                self.top[prefix] = rank(list(group))
+
+    def lookup(self, prefix):
+        key = normalize(prefix)
+        if not key:
+            return []
+        if len(key) <= TOP_PREFIX_LEN:
+            return self.top.get(key, [])
+
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + "\uffff", lo=start)
+        return rank(self.entries[start:end])
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide prefix index, rebuilt when the catalog version changes"""
+    global _index, _index_version
+    version = get_version(CATALOG)
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                _index = PrefixIndex(build_entries())
+                _index_version = version
+    return _index, version
+
+
+def suggest(prefix):
+    index, version = get_index()
+    return index.lookup(prefix), version
@@ -0,0 +1,25 @@
+from urllib.parse import urlencode
+
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def filter_query(filters):
+    """
+    Query string prefix for pagination links, built once per page:
+        {% filter_query current_filters as query %} ... href="?{{ query }}page=2"
+    Empty filters are left out; values are URL-encoded.
+    """
+    query = urlencode({key: value for key, value in filters.items() if value})
+    return f"{query}&" if query else ""
+
+
+@register.simple_tag
+def page_links(page):
+    """
+    Page numbers around the current page, the first and the last, with
+    Paginator.ELLIPSIS for the gaps: 1 … 3 4 5 6 7 … 134
+    """
+    return list(page.paginator.get_elided_page_range(page.number, on_each_side=2, on_ends=1))
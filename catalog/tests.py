@@ -1,3 +1,1267 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import re
+import shutil
+import smtplib
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.cache import cache, caches
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import equivalents, feeds
+from .feeds import feed_variants, publish_feeds, write_feeds
+from .fitment import car_model_resolver, new_fitment, publish_fitment, publish_tree, years_for
+from .import_service import recalculate_prices_for_supplier
+from .models import Brand, CarFitment, CarModel, CarVendor, Disk, OutboxEmail, Supplier, Tire
+from .outbox import deliver_pending, MAX_ATTEMPTS
+from .versions import bump_version, CATALOG, FITMENT
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "fragments": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "fragments"},
+    },
+)
+class CatalogTestCase(TestCase):
+    """Keeps version stamps, cache entries and generated files out of the real state dir."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.state_dir = tempfile.mkdtemp(prefix="catalog-test-")
+        cls.state_settings = override_settings(CATALOG_STATE_DIR=cls.state_dir)
+        cls.state_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.state_settings.disable()
+        shutil.rmtree(cls.state_dir, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        caches["fragments"].clear()
+        # The database is rolled back after each test, the stamps are not:
+        # new ones keep in-memory indexes and files of other tests out
+        bump_version(CATALOG)
+        bump_version(FITMENT)
+
+
+def make_catalog():
+    """Small catalog with enough variety for every filter to match something."""
+    supplier = Supplier.objects.create(name="Склад", code="kiev_Склад")
+    michelin = Brand.objects.create(name="Michelin", slug="michelin")
+    kk = Brand.objects.create(name="K&K", slug="kk")
+    for i, (width, profile, diameter) in enumerate([(205, 55, 16), (225, 45, 17), (195, 65, 15)]):
+        Tire.objects.create(
+            brand=michelin, supplier=supplier, model_name=f"Primacy {i}",
+            slug=f"michelin-primacy-{i}", article=f"T{i}",
+            width=width, profile=profile, diameter=diameter,
+            load_index=91, speed_index="V", season=Tire.SEASON_SUMMER,
+            price=Decimal("2500.00"), is_featured=i == 0,
+        )
+    for i, (width, diameter) in enumerate([(Decimal("6.5"), 16), (Decimal("7.0"), 17)]):
+        Disk.objects.create(
+            brand=kk, supplier=supplier, model_name=f"Drakon {i}",
+            slug=f"kk-drakon-{i}", article=f"D{i}",
+            width=width, diameter=diameter, bolts=5, pcd=Decimal("114.3"),
+            dia=Decimal("67.1"), et=45, price=Decimal("3000.00"),
+        )
+    return supplier
+
+
+def clone_tire(base, **changes):
+    """Saved copy of a tire with some fields changed (article and slug must be)."""
+    fields = {f.name: getattr(base, f.name) for f in Tire._meta.concrete_fields if not f.primary_key}
+    return Tire.objects.create(**{**fields, **changes})
+
+
+def make_fitment(vendor, car, year, **fields):
+    """CarFitment from the vendor, model and year strings of the import files."""
+    fitment = new_fitment(car_model_resolver(), vendor, car, year, **fields)
+    fitment.save()
+    return fitment
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class QueryPlanTests(CatalogTestCase):
+    """
+    Every catalog query issued by the listing pages, the home page and the
+    feeds must be answered from an index. A plain "SCAN catalog_tire" (without
+    USING ... INDEX) means SQLite walks the whole product table.
+    """
+
+    PRODUCT_TABLES = ("catalog_tire", "catalog_disk")
+    # "SCAN catalog_tire", or "SCAN TABLE catalog_tire" before SQLite 3.36
+    PLAN_STEP_RE = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\w+)( USING)?")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = make_catalog()
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = [row[-1] for row in cursor.fetchall()]
+        steps = [(step, self.PLAN_STEP_RE.match(step)) for step in plan]
+        if not any(match for _, match in steps):
+            self.fail(f"No SCAN/SEARCH step recognized in the query plan: {plan}")
+        return [
+            step for step, match in steps
+            if match and match.group(1) == "SCAN" and not match.group(3) and match.group(2) in self.PRODUCT_TABLES
+        ]
+
+    def assertIndexedRequest(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or not any(t in sql for t in self.PRODUCT_TABLES):
+                continue
+            with self.subTest(url=url, sql=sql):
+                self.assertEqual(self.full_scans(sql), [])
+
+    def test_tire_list_filters(self):
+        url = reverse("catalog:tire_list")
+        for query in [
+            "",
+            "diameter=16",
+            "diameter=16&width=205",
+            "diameter=16&width=205&profile=55",
+            "width=205&profile=55",
+            "season=winter",
+            "season=winter&diameter=16",
+            "brand=michelin",
+            "load_index=91&speed_index=V",
+            "price_min=1000&price_max=3000",
+            "diameter=16&page=2",
+        ]:
+            self.assertIndexedRequest(f"{url}?{query}")
+
+    def test_disk_list_filters(self):
+        url = reverse("catalog:disk_list")
+        for query in [
+            "",
+            "diameter=16",
+            "diameter=16&width=6.5",
+            "diameter=16&width=6.5&et=45",
+            "pcd=114.3",
+            "pcd=114.3&diameter=16",
+            "type=alloy",
+            "brand=kk",
+            "price_min=1000&price_max=5000",
+        ]:
+            self.assertIndexedRequest(f"{url}?{query}")
+
+    def test_index(self):
+        self.assertIndexedRequest(reverse("catalog:index"))
+
+    def test_index_random_fallback(self):
+        Tire.objects.update(is_featured=False)
+        self.assertIndexedRequest(reverse("catalog:index"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("catalog:index"))
+        self.assertEqual(len(response.context["featured_tires"]), 3)
+        self.assertEqual(len(response.context["featured_disks"]), 2)
+        self.assertFalse([q for q in ctx.captured_queries if "RAND" in q["sql"]])
+
+    def assertIndexedFeeds(self, variants):
+        # Rendered directly: requests may be served from already published files
+        with CaptureQueriesContext(connection) as ctx:
+            write_feeds([(params, StringIO()) for params in variants])
+        product_queries = [
+            q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in self.PRODUCT_TABLES)
+        ]
+        self.assertTrue(product_queries)
+        for sql in product_queries:
+            with self.subTest(variants=variants, sql=sql):
+                self.assertEqual(self.full_scans(sql), [])
+
+    def test_feeds(self):
+        base = {"format": "ekatalog", "base_url": "https://shop.test", "type": "all", "suppliers": [], "in_stock": True}
+        variants = [
+            base,
+            {**base, "type": "tires"},
+            {**base, "type": "disks"},
+            {**base, "suppliers": [self.supplier.id]},
+            {**base, "suppliers": [self.supplier.id], "in_stock": False},
+        ]
+        for params in variants:
+            self.assertIndexedFeeds([params])
+
+    def test_delta_feed(self):
+        url = reverse("catalog:price_feed")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"since": timezone.now().isoformat()})
+        self.assertEqual(response.status_code, 200)
+        product_queries = [q["sql"] for q in ctx.captured_queries if "FROM \"catalog_tire\"" in q["sql"] or "FROM \"catalog_disk\"" in q["sql"]]
+        self.assertEqual(len(product_queries), 2)
+        for sql in product_queries:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(row[-1] for row in cursor.fetchall())
+            self.assertIn("offer_changed_idx", plan)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class ListingTemplateTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+        base = Tire.objects.get(article="T0")
+        for i in range(40):
+            clone_tire(base, article=f"extra-{i}", slug=f"extra-{i}", is_featured=False)
+
+    def test_pagination_links(self):
+        response = self.client.get(reverse("catalog:tire_list"), {"brand": "michelin", "price_min": "1000", "page": 2})
+        self.assertContains(response, 'href="?brand=michelin&amp;price_min=1000&amp;page=3"')
+        self.assertContains(response, 'href="?brand=michelin&amp;price_min=1000&amp;page=1"', count=3)
+        self.assertNotContains(response, "diameter=&amp;")
+
+    def test_cards_cached_by_updated_at(self):
+        url = reverse("catalog:tire_list")
+        self.client.get(url)
+        tire = Tire.objects.get(article="T0")
+        self.assertContains(self.client.get(url), "2500 ₴")
+
+        tire.price = Decimal("2199.00")
+        tire.save()
+        self.assertContains(self.client.get(url), "2199 ₴")
+
+        # A supplier edit touches updated_at, so cards show the new delivery time
+        Tire.objects.update(in_stock=False, updated_at=timezone.now())
+        supplier = Supplier.objects.get()
+        supplier.delivery_days = "5-7 днів"
+        supplier.save()
+        self.assertContains(self.client.get(url), "Під замовлення 5-7 днів")
+
+
+class SearchTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+
+    def fts_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_%'")
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_triggers_survive_migrations(self):
+        # SQLite drops triggers when a migration rebuilds the product tables
+        self.assertEqual(self.fts_triggers(), {
+            f"catalog_{table}_fts_{event}" for table in ("tire", "disk") for event in ("ai", "au", "ad")
+        })
+
+    def test_triggers_restored_after_migrate(self):
+        from .search import search_tires
+
+        all_triggers = self.fts_triggers()
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER catalog_tire_fts_au")
+        Tire.objects.filter(article="T0").update(model_name="Pilot Sport")
+        self.assertEqual(search_tires("pilot"), [])
+
+        call_command("migrate", verbosity=0)
+        self.assertEqual(self.fts_triggers(), all_triggers)
+        # Changes made while the trigger was missing are indexed too
+        self.assertEqual([t.article for t in search_tires("pilot")], ["T0"])
+
+    def test_prefix_and_size_terms(self):
+        from .search import search_tires, search_disks
+
+        self.assertEqual(len(search_tires("mich prim")), 3)
+        self.assertEqual([t.article for t in search_tires("michelin 205")], ["T0"])
+        self.assertEqual([d.article for d in search_disks("5x114.3 r17")], ["D1"])
+        self.assertEqual(search_tires("bridgestone"), [])
+
+    def test_index_follows_edits(self):
+        from .search import search_tires
+
+        tire = Tire.objects.get(article="T1")
+        tire.model_name = "Pilot Sport"
+        tire.save()
+        self.assertEqual([t.article for t in search_tires("pilot")], ["T1"])
+        self.assertNotIn(tire, search_tires("primacy"))
+
+        tire.delete()
+        self.assertEqual(search_tires("pilot"), [])
+
+
+class SizeQueryTests(CatalogTestCase):
+    def test_parse(self):
+        from .sizes import parse_size_query
+
+        cases = {
+            "205/55 R16": ({"width": 205, "profile": 55, "diameter": 16}, None, ""),
+            "205 55 16": ({"width": 205, "profile": 55, "diameter": 16}, None, ""),
+            "R17 5x114.3": (None, {"diameter": 17, "bolts": 5, "pcd": Decimal("114.3")}, ""),
+            "6.5x16 ET45": (None, {"width": Decimal("6.5"), "diameter": 16, "et": 45}, ""),
+            "R15 зимові": ({"diameter": 15}, {"diameter": 15}, "зимові"),
+            "michelin 225/45ZR17 pilot": ({"width": 225, "profile": 45, "diameter": 17}, None,
+                                          "michelin pilot"),
+            "Nokian hakka": ({}, {}, "Nokian hakka"),
+        }
+        for query, (tire, disk, text) in cases.items():
+            with self.subTest(query=query):
+                parsed = parse_size_query(query)
+                self.assertEqual(parsed["tire"], tire)
+                self.assertEqual(parsed["disk"], disk)
+                self.assertEqual(parsed["text"], text)
+
+    def test_search_by_size(self):
+        from .search import search_catalog
+
+        make_catalog()
+        tires, disks = search_catalog("michelin 205/55 R16")
+        self.assertEqual([t.article for t in tires], ["T0"])
+        self.assertEqual(disks, [])
+
+        tires, disks = search_catalog("R17 5x114.3")
+        self.assertEqual(tires, [])
+        self.assertEqual([d.article for d in disks], ["D1"])
+
+
+class SuggestTests(CatalogTestCase):
+    def test_prefix_lookup(self):
+        make_catalog()
+        response = self.client.get(reverse("catalog:search_suggest"), {"q": "mich"})
+        labels = [(s["kind"], s["label"]) for s in response.json()["suggestions"]]
+        self.assertIn(("brand", "Michelin"), labels)
+        self.assertIn(("model", "Michelin Primacy 0"), labels)
+        self.assertIn("public", response["Cache-Control"])
+
+        # Same catalog version: answered before the index is consulted
+        with mock.patch("catalog.suggest.suggest") as suggest, self.assertNumQueries(0):
+            response = self.client.get(
+                reverse("catalog:search_suggest"), {"q": "mich"}, HTTP_IF_NONE_MATCH=response["ETag"],
+            )
+        self.assertEqual(response.status_code, 304)
+        suggest.assert_not_called()
+
+        response = self.client.get(reverse("catalog:search_suggest"), {"q": "205/55"})
+        self.assertEqual(response.json()["suggestions"], [{"kind": "size", "label": "205/55 R16"}])
+
+        response = self.client.get(reverse("catalog:search_suggest"), {"q": "m"})
+        self.assertEqual(response.json()["suggestions"], [])
+
+    def test_ranked_over_whole_prefix(self):
+        from .suggest import PrefixIndex
+
+        # Thousands of light entries sort before the heaviest one
+        entries = [(f"maa{i:05d}", "model", f"Maa {i}", 1) for i in range(5000)]
+        entries.append(("mzz", "model", "Mzz", 100))
+        entries.append(("mzzxl", "model", "Mzz XL", 50))
+        index = PrefixIndex(sorted(entries))
+        self.assertEqual(index.lookup("m")[0], {"kind": "model", "label": "Mzz"})
+        self.assertEqual(index.lookup("mzzx"), [{"kind": "model", "label": "Mzz XL"}])
+        self.assertEqual(len(index.lookup("maa0")), 5)
+        self.assertEqual(index.lookup("x"), [])
+
+    def test_rebuilt_after_catalog_change(self):
+        from .suggest import suggest
+
+        make_catalog()
+        self.assertEqual(suggest("nokian")[0], [])
+        tire = Tire.objects.get(article="T2")
+        tire.brand = Brand.objects.create(name="Nokian", slug="nokian")
+        tire.save()
+        self.assertIn({"kind": "brand", "label": "Nokian"}, suggest("nokian")[0])
+
+
+class FuzzySearchTests(CatalogTestCase):
+    def test_misspelled_and_cyrillic_brand(self):
+        make_catalog()
+        for query in ["мішлен", "michelen", "мишлен праймасі"]:
+            with self.subTest(query=query):
+                response = self.client.get(reverse("catalog:search"), {"q": query})
+                self.assertEqual(len(response.context["tires"]), 3)
+                self.assertTrue(response.context["corrected_query"].startswith("Michelin"))
+
+    def test_sizes_are_not_corrected(self):
+        from .fuzzy import FuzzyIndex
+
+        index = FuzzyIndex({"Michelin": 3, "Primacy": 3})
+        self.assertEqual(index.correct("мішлен 205/55 R16"), "Michelin 205/55 R16")
+        self.assertIsNone(index.correct("Michelin"))
+
+    def test_filter_words_are_not_corrected(self):
+        from .fuzzy import FuzzyIndex
+
+        # Model words that look like the filter words once transliterated
+        index = FuzzyIndex({"Michelin": 3, "Zimmer": 1, "Liton": 1, "Shinko": 1, "Disko": 1})
+        self.assertEqual(index.correct("мішлен зимові шини"), "Michelin зимові шини")
+        self.assertIsNone(index.correct("літні шини"))
+        self.assertIsNone(index.correct("диски литі"))
+        self.assertEqual(index.correct("shinco"), "Shinko")
+
+
+class PageCacheTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+
+    def test_hit_and_invalidation(self):
+        url = reverse("catalog:tire_list") + "?diameter=16&utm_source=x"
+        self.assertEqual(self.client.get(url)["X-Page-Cache"], "miss")
+
+        # Same page: query order, empty and tracking params don't matter
+        response = self.client.get(reverse("catalog:tire_list") + "?width=&diameter=16")
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertIn("csrftoken", response.cookies)
+
+        tire = Tire.objects.get(article="T0")
+        tire.price = Decimal("1999.00")
+        tire.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertContains(response, "1999")
+
+    def test_bypass_with_cart(self):
+        tire = Tire.objects.get(article="T0")
+        response = self.client.post(
+            reverse("catalog:cart_add"), {"type": "tire", "id": tire.id},
+            content_type="application/json",
+        )
+        self.assertEqual(response.cookies["cart_count"].value, "1")
+        response = self.client.get(reverse("catalog:index"))
+        self.assertNotIn("X-Page-Cache", response)
+
+    def test_bypass_with_session_cart(self):
+        # A cart saved in the session before the count cookie existed
+        store = SessionStore()
+        store["cart"] = {"tires": {str(Tire.objects.get(article="T0").id): 1}, "disks": {}}
+        store.save()
+        self.client.get(reverse("catalog:index"))
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = store.session_key
+        response = self.client.get(reverse("catalog:index"))
+        self.assertNotIn("X-Page-Cache", response)
+
+    def test_post_not_cached(self):
+        response = self.client.post(reverse("catalog:about"))
+        self.assertNotIn("X-Page-Cache", response)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+
+    def test_detail_not_modified(self):
+        url = reverse("catalog:tire_detail", args=["michelin-primacy-0"])
+        response = self.client.get(url)
+        etag = response["ETag"]
+        last_modified = response["Last-Modified"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        # The view body (and the page cache) are skipped entirely
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        # A supplier edit changes what the page shows
+        supplier = Supplier.objects.get()
+        supplier.delivery_days = "5-7 днів"
+        supplier.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_supplier_edit_touches_products_when_shown(self):
+        tire = Tire.objects.get(article="T0")
+        supplier = Supplier.objects.get()
+        supplier.markup_percent = Decimal("10")
+        supplier.is_active = False
+        supplier.save()
+        self.assertEqual(Tire.objects.get(article="T0").updated_at, tire.updated_at)
+
+        supplier.is_preorder = True
+        supplier.save()
+        self.assertGreater(Tire.objects.get(article="T0").updated_at, tire.updated_at)
+
+    def test_listing_and_json_follow_versions(self):
+        url = reverse("catalog:tire_list") + "?diameter=16"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Tire.objects.get(article="T1").save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        url = reverse("catalog:calculator_models") + "?vendor=BMW"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bump_version(FITMENT)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        # HTTP dates have one-second resolution, so date the stamps back first
+        for name in (CATALOG, FITMENT):
+            path = os.path.join(settings.CATALOG_STATE_DIR, f"{name}.version")
+            os.utime(path, (os.path.getmtime(path) - 60,) * 2)
+
+        for url in (reverse("catalog:tire_list") + "?diameter=16",
+                    reverse("catalog:calculator"),
+                    reverse("catalog:calculator_models") + "?vendor=BMW"):
+            last_modified = self.client.get(url)["Last-Modified"]
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304)
+
+        url = reverse("catalog:tire_list") + "?diameter=16"
+        last_modified = self.client.get(url)["Last-Modified"]
+        Tire.objects.get(article="T1").save()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+
+class CartTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+
+    def add(self, product_type, product):
+        self.client.post(
+            reverse("catalog:cart_add"), {"type": product_type, "id": product.id, "quantity": 2},
+            content_type="application/json",
+        )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_constant_queries(self):
+        self.add("tire", Tire.objects.get(article="T0"))
+        single = {url: self.count_queries(url)[0]
+                  for url in (reverse("catalog:cart"), reverse("catalog:checkout"))}
+
+        for tire in Tire.objects.exclude(article="T0"):
+            self.add("tire", tire)
+        for disk in Disk.objects.all():
+            self.add("disk", disk)
+
+        for url, queries in single.items():
+            # One more in_bulk() for the disks, nothing per item
+            count, response = self.count_queries(url)
+            self.assertEqual(count, queries + 1)
+            self.assertEqual(len(response.context["items"]), 5)
+            self.assertEqual(response.context["item_count"], 10)
+
+        response = self.client.post(
+            reverse("catalog:checkout_submit"), {"name": "Тест", "phone": "0971234567"},
+            content_type="application/json",
+        )
+        self.assertTrue(response.json()["success"])
+        self.assertIn("Артикул: D1", OutboxEmail.objects.get().body)
+
+    def test_cookie_cart(self):
+        tire = Tire.objects.get(article="T0")
+        self.add("tire", tire)
+        self.add("tire", tire)
+        self.assertFalse(Session.objects.exists())
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("catalog:cart_count"))
+        self.assertEqual(response.json()["count"], 4)
+
+        response = self.client.post(
+            reverse("catalog:cart_remove"), {"type": "tire", "id": tire.id},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["cart_count"], 0)
+        self.assertEqual(response.cookies["cart_count"].value, "0")
+
+        # A tampered cookie is an empty cart
+        self.client.cookies["cart"] = "eyJ0Ijp7IjEiOjk5fX0:forged"
+        self.assertEqual(self.client.get(reverse("catalog:cart_count")).json()["count"], 0)
+
+    @override_settings(CART_STORAGE="session")
+    def test_session_cart(self):
+        self.add("disk", Disk.objects.get(article="D0"))
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertNotIn("cart", self.client.cookies)
+        self.assertEqual(self.client.get(reverse("catalog:cart_count")).json()["count"], 2)
+
+    def test_clear_stale_sessions(self):
+        store = SessionStore()
+        store["cart"] = {"tires": {"1": 1}, "disks": {}}
+        store.set_expiry(60)
+        store.save()
+        Session.objects.create(session_key="expired", session_data="", expire_date=timezone.now())
+
+        call_command("clear_stale_sessions", idle_days=1, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), [])
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise smtplib.SMTPDataError(554, "Rejected")
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError("SMTP down")
+
+
+class OutboxTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+
+    def submit_order(self):
+        tire = Tire.objects.get(article="T0")
+        self.client.post(
+            reverse("catalog:cart_add"), {"type": "tire", "id": tire.id},
+            content_type="application/json",
+        )
+        return self.client.post(
+            reverse("catalog:checkout_submit"),
+            {"name": "Тест", "phone": "0971234567", "email": "client@example.com"},
+            content_type="application/json",
+        )
+
+    def test_views_only_queue(self):
+        response = self.client.post(
+            reverse("catalog:callback_request"), {"name": "Тест", "phone": "0971234567"},
+            content_type="application/json",
+        )
+        self.assertTrue(response.json()["success"])
+        self.assertEqual(mail.outbox, [])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.submit_order()
+        inserts = [q for q in ctx.captured_queries if "catalog_outboxemail" in q["sql"]]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+        call_command("send_outbox", batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            ["client@example.com", "info@120.com.ua", "info@120.com.ua"],
+        )
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.STATUS_SENT).exists())
+
+    def test_retries(self):
+        self.submit_order()
+        self.assertEqual(deliver_pending(connection=FailingBackend()), (0, 2))
+
+        email = OutboxEmail.objects.first()
+        self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("Rejected", email.last_error)
+        # Not due until the retry delay has passed
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        OutboxEmail.objects.update(send_after=timezone.now(), attempts=MAX_ATTEMPTS - 1)
+        deliver_pending(connection=FailingBackend())
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("status", flat=True)), {OutboxEmail.STATUS_FAILED}
+        )
+
+    def test_outage_does_not_use_attempts(self):
+        self.submit_order()
+        for _ in range(MAX_ATTEMPTS + 1):
+            OutboxEmail.objects.update(send_after=timezone.now())
+            self.assertEqual(deliver_pending(connection=UnreachableBackend()), (0, 2))
+
+        email = OutboxEmail.objects.first()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.STATUS_PENDING, 0))
+        self.assertIn("SMTP down", email.last_error)
+        self.assertGreater(email.send_after, timezone.now())
+
+
+class EquivalentSizeTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+        base = Tire.objects.get(article="T0")
+        for article, changes in [
+            ("cheap", {"price": Decimal("1900.00")}),
+            ("sold-out", {"price": Decimal("900.00"), "in_stock": False}),
+            ("too-big", {"width": 255, "profile": 35, "diameter": 19}),
+        ]:
+            clone_tire(base, article=article, slug=article, **changes)
+
+    def test_equivalents_within_tolerance(self):
+        url = reverse("catalog:calculator_equivalents")
+        data = self.client.get(url, {"size": "205/55R16"}).json()
+        self.assertEqual(data["size"], {"label": "205/55 R16", "overall_diameter": 631.9})
+        self.assertEqual([s["label"] for s in data["sizes"]], ["205/55 R16", "225/45 R17", "195/65 R15"])
+        self.assertEqual((data["sizes"][0]["count"], data["sizes"][0]["min_price"]), (2, "1900"))
+        self.assertEqual(data["sizes"][1]["difference"], 0.38)
+        self.assertIn("width=225&profile=45&diameter=17", data["sizes"][1]["url"])
+
+        # The size index is built once per catalog version
+        with self.assertNumQueries(0):
+            data = self.client.get(url, {"size": "205 55 16", "tolerance": "0.4"}).json()
+        self.assertEqual([s["label"] for s in data["sizes"]], ["205/55 R16", "225/45 R17"])
+
+        self.assertEqual(self.client.get(url, {"size": "R16"}).status_code, 400)
+
+        for tolerance in ("nan", "inf", "-inf"):
+            data = self.client.get(url, {"size": "205/55R16", "tolerance": tolerance}).json()
+            self.assertEqual(data["tolerance"], equivalents.DEFAULT_TOLERANCE)
+
+
+@override_settings(PAGE_CACHE_ENABLED=False)
+class AlternativesTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+        nokian = Brand.objects.create(name="Nokian", slug="nokian")
+        base = Tire.objects.get(article="T0")
+        for article, changes in [
+            ("nokian-2300", {"brand": nokian, "price": Decimal("2300.00")}),
+            ("nokian-2700", {"brand": nokian, "price": Decimal("2700.00")}),
+            ("nokian-sold-out", {"brand": nokian, "price": Decimal("1000.00"), "in_stock": False}),
+            ("michelin-2000", {"price": Decimal("2000.00")}),
+            ("michelin-3000", {"price": Decimal("3000.00")}),
+        ]:
+            clone_tire(base, article=article, slug=article, is_featured=False, **changes)
+
+    def test_detail_sections(self):
+        url = reverse("catalog:tire_detail", args=["michelin-primacy-0"])
+        self.client.get(url)
+
+        # Product with brand and supplier, its updated_at, and the alternatives
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        sections = {title: [p.slug for p in products] for title, products in response.context["sections"]}
+        self.assertEqual(sections, {
+            "Цей розмір інших брендів": ["nokian-2300"],
+            "Дешевше": ["michelin-2000"],
+            "Дорожче": ["nokian-2700", "michelin-3000"],
+        })
+        self.assertContains(response, reverse("catalog:tire_detail", args=["michelin-3000"]))
+
+    def test_etag_follows_alternatives(self):
+        url = reverse("catalog:tire_detail", args=["michelin-primacy-0"])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        alternative = Tire.objects.get(slug="nokian-2300")
+        alternative.price = Decimal("2200.00")
+        alternative.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "2200")
+
+    def test_groups_follow_catalog(self):
+        url = reverse("catalog:tire_detail", args=["michelin-primacy-0"])
+        self.client.get(url)
+        Tire.objects.filter(slug="michelin-3000").update(in_stock=False)
+        bump_version()
+        response = self.client.get(url)
+        self.assertEqual([p.slug for p in response.context["sections"][2][1]], ["nokian-2700"])
+
+        # A size nobody else has costs no extra query
+        with self.assertNumQueries(2):
+            self.client.get(reverse("catalog:tire_detail", args=["michelin-primacy-1"]))
+
+
+class PriceFeedTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = make_catalog()
+
+    def fetch(self, query="", **headers):
+        response = self.client.get(f"{reverse('catalog:price_feed')}?{query}", **headers)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_served_from_file(self):
+        feed = self.fetch("type=tires").decode()
+        self.assertEqual(feed.count("<offer "), 3)
+        self.assertNotIn("disk_", feed)
+
+        # Same variant and catalog version: no database access
+        with self.assertNumQueries(0):
+            self.assertEqual(self.fetch("type=tires").decode(), feed)
+
+        compressed = self.fetch("type=tires", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(gzip.decompress(compressed).decode(), feed)
+
+    def test_etag_per_encoding(self):
+        url = f"{reverse('catalog:price_feed')}?type=tires"
+        identity = self.client.get(url)["ETag"]
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        self.assertNotEqual(identity, compressed)
+        # A cached identity body does not validate the gzip one
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=identity)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=compressed)
+        self.assertEqual(response.status_code, 304)
+
+    def test_offer_markup(self):
+        feed = self.fetch("type=disks").decode()
+        self.assertIn(
+            '<offer id="disk_%d" available="true">\n' % Disk.objects.get(article="D0").id, feed
+        )
+        self.assertIn("<name>K&amp;K Drakon 0 6.5x16 5x114.3</name>\n<vendor>K&amp;K</vendor>\n", feed)
+        self.assertTrue(feed.endswith("</offer>\n</offers>\n</shop>\n</yml_catalog>\n"))
+
+    def test_rendered_again_after_change(self):
+        self.fetch(f"supplier={self.supplier.id}")
+        tire = Tire.objects.get(article="T0")
+        tire.price = Decimal("1999.00")
+        tire.save()
+        self.assertIn(b"<price>1999</price>", self.fetch(f"supplier={self.supplier.id}"))
+
+    def test_publish_after_import(self):
+        self.fetch("type=disks&in_stock=0")
+        Disk.objects.filter(article="D0").update(price=Decimal("3100.00"))
+        bump_version()
+        self.assertGreaterEqual(publish_feeds(), 1)
+        with self.assertNumQueries(0):
+            self.assertIn(b"<price>3100</price>", self.fetch("type=disks&in_stock=0"))
+
+    def test_publish_cleans_and_batches(self):
+        directory = os.path.join(settings.CATALOG_STATE_DIR, "feeds")
+        os.makedirs(directory, exist_ok=True)
+        # A long unused record from before feeds had formats, and a broken one
+        legacy = os.path.join(directory, "0123456789abcdef.json")
+        with open(legacy, "w") as f:
+            json.dump({"base_url": "https://shop.test", "type": "all", "suppliers": [], "in_stock": True}, f)
+        open(os.path.join(directory, "0123456789abcdef-1.xml.gz"), "wb").close()
+        os.utime(legacy, (0, 0))
+        with open(os.path.join(directory, "fedcba9876543210.json"), "w") as f:
+            f.write("{")
+        for query in ("type=tires", "type=disks", "in_stock=0"):
+            self.fetch(query)
+
+        with mock.patch.object(feeds, "VARIANTS_PER_PASS", 2), \
+                mock.patch.object(feeds, "_publish", wraps=feeds._publish) as publish:
+            count = publish_feeds()
+        self.assertEqual(count, len(feed_variants()))
+        self.assertGreater(publish.call_count, 1)
+        self.assertTrue(all(len(call.args[0]) <= 2 for call in publish.call_args_list))
+        leftovers = [name for name in os.listdir(directory) if name.startswith(("0123456789abcdef", "fedcba9876543210"))]
+        self.assertEqual(leftovers, [])
+
+    def test_formats_in_one_pass(self):
+        other = Supplier.objects.create(name="Інший", code="other")
+        base = {"base_url": "https://shop.test", "suppliers": [], "in_stock": True}
+        jobs = [
+            ({**base, "format": "ekatalog", "type": "tires"}, StringIO()),
+            ({**base, "format": "hotline", "type": "disks"}, StringIO()),
+            ({**base, "format": "google", "type": "all", "in_stock": False, "suppliers": [self.supplier.id]}, StringIO()),
+            ({**base, "format": "prom", "type": "all", "suppliers": [other.id]}, StringIO()),
+        ]
+        Tire.objects.filter(article="T2").update(in_stock=False)
+
+        # Brands, tires and disks, whatever the number of formats
+        with self.assertNumQueries(3):
+            offers = write_feeds(jobs)
+        self.assertEqual(offers, [2, 2, 5, 0])
+
+        hotline = jobs[1][1].getvalue()
+        self.assertIn("<code>D0</code>", hotline)
+        self.assertTrue(hotline.endswith("</items>\n</price>\n"))
+        google = jobs[2][1].getvalue()
+        self.assertIn("<g:availability>out_of_stock</g:availability>", google)
+        self.assertIn("<g:price>2500.00 UAH</g:price>", google)
+        self.assertNotIn("<offer ", jobs[3][1].getvalue())
+
+    def test_marketplace_urls(self):
+        self.assertIn(b"<g:id>tire_", self.fetch_format("google"))
+        self.assertIn(b"<vendorCode>T0</vendorCode>", self.fetch_format("prom"))
+        response = self.client.get(reverse("catalog:marketplace_feed", args=["hotline"]))
+        self.assertEqual(response["Content-Disposition"], 'inline; filename="hotline.xml"')
+        self.assertEqual(self.client.get(reverse("catalog:marketplace_feed", args=["amazon"])).status_code, 404)
+
+    def test_admin_publish(self):
+        self.fetch_format("hotline")
+        user = User.objects.create_superuser("admin", "admin@example.com", "secret")
+        self.client.force_login(user)
+        url = reverse("admin:xml_feeds")
+        response = self.client.get(url)
+        # Most recently fetched first
+        self.assertEqual(response.context["variants"][0]["format_title"], "Hotline")
+        response = self.client.post(url, {"action": "publish"})
+        self.assertRedirects(response, url)
+
+    def test_recalculation_publishes(self):
+        self.fetch_format("hotline")
+        Tire.objects.update(purchase_price=Decimal("1000.00"))
+        self.supplier.markup_percent = Decimal("15")
+        self.supplier.save()
+        self.assertIsNone(feed_variants()[0]["size"])
+        recalculate_prices_for_supplier(self.supplier)
+        # Rendered for the new version before anyone asks for it
+        self.assertIsNotNone(feed_variants()[0]["size"])
+
+    def fetch_format(self, name):
+        response = self.client.get(reverse("catalog:marketplace_feed", args=[name]))
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_delta(self):
+        since = timezone.now()
+        tire = Tire.objects.get(article="T0")
+        tire.price = Decimal("2222.00")
+        tire.save()
+        # Not an offer change
+        Tire.objects.get(article="T1").save()
+        sold_out = Tire.objects.get(article="T2")
+        sold_out.in_stock = False
+        sold_out.save(update_fields=["in_stock", "updated_at"])
+        removed = Disk.objects.get(article="D0")
+        removed_id = removed.id
+        removed.delete()
+
+        # Brands, changed and removed tires, changed and removed disks
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("catalog:price_feed"), {"since": since.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        feed = response.content.decode()
+        self.assertEqual(feed.count("<offer "), 3)
+        self.assertIn(f'<offer id="tire_{tire.id}" available="true">\n', feed)
+        self.assertIn("<price>2222</price>", feed)
+        self.assertIn(f'<offer id="tire_{sold_out.id}" available="false"/>', feed)
+        self.assertIn(f'<offer id="disk_{removed_id}" available="false"/>', feed)
+        self.assertLessEqual(int(response["X-Feed-Next-Since"]), timezone.now().timestamp())
+
+        # Without in_stock=1 the sold-out tire is a regular offer
+        feed = self.client.get(
+            reverse("catalog:marketplace_feed", args=["hotline"]),
+            {"since": since.isoformat(), "in_stock": "0"},
+        ).content.decode()
+        self.assertIn(f"<id>tire_{sold_out.id}</id>\n<categoryId>1</categoryId>", feed)
+        self.assertIn(f"<id>disk_{removed_id}</id>\n<stock>Немає в наявності</stock>", feed)
+
+        # Unix timestamps work too
+        response = self.client.get(reverse("catalog:price_feed"), {"since": str(int(since.timestamp()) - 1)})
+        self.assertContains(response, "<price>2222</price>")
+
+    def test_delta_since(self):
+        url = reverse("catalog:price_feed")
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since": "99999999999999999"}).status_code, 400)
+        too_old = timezone.now() - timezone.timedelta(days=8)
+        self.assertEqual(self.client.get(url, {"since": too_old.isoformat()}).status_code, 400)
+
+    def test_offer_changed_at(self):
+        tire = Tire.objects.get(article="T0")
+        changed_at = tire.offer_changed_at
+        tire.model_name = "Primacy 4"
+        tire.save()
+        tire.refresh_from_db()
+        self.assertEqual(tire.offer_changed_at, changed_at)
+
+        tire.image = "tires/t0.jpg"
+        tire.save(update_fields=["image"])
+        tire.refresh_from_db()
+        self.assertGreater(tire.offer_changed_at, changed_at)
+
+    def test_offer_unchanged_by_markup_rounding(self):
+        # 15% on 1234.57 is 1419.7555, stored as 1419.76
+        supplier = Supplier.objects.get(code="kiev_Склад")
+        supplier.markup_percent = Decimal("15")
+        supplier.save()
+        Tire.objects.filter(supplier=supplier).update(purchase_price=Decimal("1234.57"))
+        recalculate_prices_for_supplier(supplier)
+        tire = Tire.objects.get(article="T0")
+        self.assertEqual(tire.price, Decimal("1419.76"))
+
+        recalculate_prices_for_supplier(supplier)
+        self.assertEqual(Tire.objects.get(article="T0").offer_changed_at, tire.offer_changed_at)
+
+    @override_settings(FEED_ACCEL_REDIRECT="/_feeds/")
+    def test_accel_redirect(self):
+        response = self.client.get(reverse("catalog:ekatalog_feed"))
+        self.assertRegex(response["X-Accel-Redirect"], r"^/_feeds/[0-9a-f]{16}-\w+\.xml$")
+        self.assertEqual(response.content, b"")
+
+    def test_unknown_type(self):
+        response = self.client.get(f"{reverse('catalog:price_feed')}?type=cars")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SITE_URL="https://shop.test")
+    def test_variant_params(self):
+        url = reverse("catalog:price_feed")
+        inactive = Supplier.objects.create(name="Старий", code="old", is_active=False)
+        # The Host header and unknown or inactive suppliers don't make new variants
+        feed = self.fetch(f"supplier={self.supplier.id}&supplier={inactive.id}&supplier=999999", HTTP_HOST="evil.test")
+        self.assertIn(b"<url>https://shop.test/tires/michelin-primacy-0/</url>", feed)
+        recorded = [variant["params"]["suppliers"] for variant in feed_variants()]
+        self.assertIn([self.supplier.id], recorded)
+        self.assertFalse([ids for ids in recorded if inactive.id in ids or 999999 in ids])
+        self.assertEqual(self.client.get(url, {"supplier": inactive.id}).status_code, 404)
+
+        with self.settings(FEED_MAX_VARIANTS=len(feed_variants()) + 1):
+            self.fetch("type=disks&in_stock=0&supplier=%d" % self.supplier.id)
+            response = self.client.get(url, {"type": "tires", "in_stock": "0", "supplier": self.supplier.id})
+            self.assertEqual(response.status_code, 503)
+            # Known variants are still served
+            self.fetch(f"supplier={self.supplier.id}")
+
+
+class FitmentTreeTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for car, year, modification in [
+            ("X5", "2010", "4.8i"), ("X5", "2010", "3.0d"), ("X5", "2015", "3.0d"), ("3", "2012", "320i"),
+        ]:
+            make_fitment("BMW", car, year, modification=modification)
+        make_fitment("Audi", "A4", "2010", modification="2.0 TDI")
+
+    def setUp(self):
+        super().setUp()
+        bump_version(FITMENT)
+        publish_tree()
+
+    def test_dropdowns_without_queries(self):
+        with self.assertNumQueries(0):
+            models = self.client.get(reverse("catalog:calculator_models"), {"vendor": "BMW"}).json()
+            years = self.client.get(reverse("catalog:calculator_years"), {"vendor": "BMW", "car": "X5"}).json()
+            mods = self.client.get(
+                reverse("catalog:calculator_modifications"), {"vendor": "BMW", "car": "X5", "year": "2010"}
+            ).json()
+        self.assertEqual(models["models"], ["3", "X5"])
+        self.assertEqual(years["years"], ["2010", "2015"])
+        self.assertEqual([m["modification"] for m in mods["modifications"]], ["3.0d", "4.8i"])
+
+    def test_tree_endpoint(self):
+        url = reverse("catalog:calculator_tree")
+        response = self.client.get(url, {"vendor": "Audi"})
+        self.assertEqual(response.json(), {"A4": {"2010": [[CarFitment.objects.get(car_model__vendor__name="Audi").id, "2.0 TDI"]]}})
+        self.assertEqual(list(self.client.get(url).json()), ["Audi", "BMW"])
+        self.assertEqual(self.client.get(url, {"vendor": "Lada"}).status_code, 404)
+
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, {"vendor": "Audi"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A new import publishes a new tree under a new version
+        make_fitment("Audi", "A6", "2011", modification="3.0 TDI")
+        bump_version(FITMENT)
+        publish_tree()
+        response = self.client.get(url, {"vendor": "Audi"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(list(response.json()), ["A4", "A6"])
+
+    def test_normalized_storage(self):
+        self.assertEqual(CarVendor.objects.count(), 2)
+        self.assertEqual(
+            list(CarModel.objects.values_list("vendor__name", "name")), [("Audi", "A4"), ("BMW", "3"), ("BMW", "X5")]
+        )
+        for year, year_range, label in [
+            ("2005-2010", (2005, 2010), "2005-2010"),
+            ("2015 - н.в.", (2015, None), "2015-"),
+            ("", (None, None), ""),
+            # Kept as imported when it doesn't parse
+            ("до рестайлінгу", (None, None), "до рестайлінгу"),
+        ]:
+            fitment = make_fitment("BMW", "X5", year, modification="M50d")
+            self.assertEqual((fitment.year_from, fitment.year_to), year_range)
+            self.assertEqual(fitment.year, label)
+            # The text is only stored when the range can't replace it
+            self.assertEqual(fitment.year_text, year if year_range[0] is None else "")
+        self.assertEqual(CarModel.objects.count(), 3)
+
+        # Models and vendors without fitments are dropped on publish
+        CarFitment.objects.filter(car_model__vendor__name="Audi").delete()
+        publish_fitment()
+        self.assertFalse(CarVendor.objects.filter(name="Audi").exists())
+        self.assertEqual(
+            years_for("BMW", "X5"), ["2005-2010", "2010", "2015", "2015-", "", "до рестайлінгу"]
+        )
+
+
+class PreparedFitmentTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.fitment = make_fitment(
+            "BMW", "3", "2012", modification="320i", pcd="5*120",
+            oem_tires="205/55 R16|225/45 R17#255/40 R17",
+            oem_wheels="7x16 ET31|8Jx17 ET34#8.5Jx17 ET37",
+            tuning_tires="bad size",
+        )
+
+    def test_import_prepares_sizes_and_json(self):
+        self.assertEqual(publish_fitment(), 1)
+
+        # Stock lookup keys, factory sizes first; unparsed labels are only shown
+        prepared = json.loads(CarFitment.objects.get(pk=self.fitment.pk).data_json)
+        self.assertEqual(
+            [size["key"] for size in prepared["tire_sizes"]], ["205/55R16", "225/45R17", "255/40R17"]
+        )
+        self.assertEqual(prepared["wheel_match"]["sizes"], [[16, 31], [17, 34], [17, 37]])
+        self.assertEqual(prepared["tires"]["tuning"], [{"size": "bad size", "staggered": False}])
+
+        url = reverse("catalog:calculator_fitment")
+        # The prepared JSON plus one stock lookup each for tires and wheels
+        with self.assertNumQueries(3):
+            data = self.client.get(url, {"id": self.fitment.id}).json()
+        self.assertEqual(data["tires"]["oem"], [
+            {"size": "205/55 R16", "staggered": False},
+            {"front": "225/45 R17", "rear": "255/40 R17", "staggered": True},
+        ])
+        self.assertEqual(data["wheels"]["oem"][1]["rear"], "8.5Jx17 ET37")
+
+    def test_fallback_without_prepared_json(self):
+        # The prepared-JSON lookup, the full row with its model and vendor, stock for tires and wheels
+        with self.assertNumQueries(4):
+            data = self.client.get(reverse("catalog:calculator_fitment"), {"id": self.fitment.id}).json()
+        self.assertEqual(data["car"], "BMW 3 2012 320i")
+        self.assertEqual(len(data["wheels"]["oem"]), 2)
+
+    def test_matching_in_stock_tires(self):
+        make_catalog()
+        publish_fitment()
+        cheaper = Tire.objects.get(article="T1")
+        cheaper.pk = None
+        cheaper.slug, cheaper.article, cheaper.price = "michelin-cheap", "T9", Decimal("1500.00")
+        cheaper.save()
+        Tire.objects.filter(article="T2").update(width=255, profile=40, size_key="255/40R17", in_stock=False)
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse("catalog:calculator_fitment"), {"id": self.fitment.id}).json()
+        self.assertNotIn("tire_sizes", data)
+        self.assertEqual(
+            [(group["size"], [t["price"] for t in group["tires"]]) for group in data["products"]],
+            [("205/55 R16", ["2500"]), ("225/45 R17", ["1500", "2500"])],
+        )
+        self.assertEqual(data["products"][0]["tires"][0]["url"], "/tires/michelin-primacy-0/")
+
+        sql = next(q["sql"] for q in ctx.captured_queries if "catalog_tire" in q["sql"])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("tire_fit_idx", plan)
+
+
+class WheelFitmentTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+        cls.fitment = make_fitment(
+            "Hyundai", "Tucson", "2016", modification="2.0", pcd="5*114,3",
+            center_bore="67.1", oem_wheels="6.5x16 ET45|7x17 ET40",
+        )
+        base = Disk.objects.get(article="D0")
+        for article, changes in [
+            ("narrow-bore", {"dia": Decimal("60.1")}),
+            ("et-too-far", {"et": 52}),
+            ("other-pcd", {"pcd": Decimal("112")}),
+            ("cheap", {"price": Decimal("2000.00"), "et": 48}),
+        ]:
+            disk = Disk.objects.get(pk=base.pk)
+            disk.pk = None
+            disk.article = disk.slug = article
+            for field, value in changes.items():
+                setattr(disk, field, value)
+            disk.save()
+
+    def fitting(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse("catalog:calculator_fitment"), {"id": self.fitment.id}).json()
+        self.sql = ctx.captured_queries[-1]["sql"]
+        return [(group["size"], [d["url"].split("/")[-2] for d in group["disks"]]) for group in data["wheel_products"]]
+
+    def test_bolt_pattern_key(self):
+        self.assertEqual(Disk.objects.get(article="other-pcd").bolt_pattern, "5x112")
+        publish_fitment()
+        self.fitment.refresh_from_db()
+        self.assertEqual((self.fitment.bolt_pattern, self.fitment.hub_bore), ("5x114.3", Decimal("67.1")))
+
+    def test_matching_disks(self):
+        publish_fitment()
+        self.assertEqual(self.fitting(), [("R16", ["cheap", "kk-drakon-0"]), ("R17", ["kk-drakon-1"])])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {self.sql}")
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("disk_fit_idx", plan)
+
+        with self.settings(WHEEL_ET_TOLERANCE=2):
+            self.assertEqual(self.fitting(), [("R16", ["kk-drakon-0"])])
+
+
+class SupplierAdminTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = make_catalog()
+        Tire.objects.filter(article="T0").update(in_stock=False)
+        cls.empty = Supplier.objects.create(name="Порожній", code="empty")
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "secret")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def changelist(self, **params):
+        response = self.client.get(reverse("admin:catalog_supplier_changelist"), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_counts(self):
+        suppliers = self.changelist().context["cl"].result_list
+        counts = {s.name: (s.tire_count, s.tire_in_stock, s.disk_count, s.disk_in_stock) for s in suppliers}
+        self.assertEqual(counts, {"Склад": (3, 2, 2, 2), "Порожній": (0, 0, 0, 0)})
+
+    def test_query_count_independent_of_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.changelist()
+        brand = Brand.objects.get(slug="michelin")
+        for i in range(5):
+            supplier = Supplier.objects.create(name=f"Постачальник {i}", code=f"s{i}")
+            Tire.objects.create(
+                brand=brand, supplier=supplier, model_name="Extra", slug=f"extra-{i}", article=f"X{i}",
+                width=205, profile=55, diameter=16, load_index=91, speed_index="V",
+                season=Tire.SEASON_SUMMER, price=Decimal("2000.00"),
+            )
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            self.changelist()
+
+    def test_sort_by_count(self):
+        # The changelist prepends the action checkbox to list_display
+        index = self.changelist().context["cl"].list_display.index("tire_count")
+        names = [s.name for s in self.changelist(o=f"-{index}").context["cl"].result_list]
+        self.assertEqual(names, ["Склад", "Порожній"])
+        names = [s.name for s in self.changelist(o=str(index)).context["cl"].result_list]
+        self.assertEqual(names, ["Порожній", "Склад"])
+
+
+class DenormalizedCheckTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_catalog()
+
+    def test_bolt_pattern(self):
+        Disk.objects.filter(article="D0").update(bolt_pattern="4x100")
+        with self.assertRaisesMessage(CommandError, "1 inconsistent rows"):
+            call_command("check_denormalized", stdout=StringIO())
+
+        out = StringIO()
+        call_command("check_denormalized", fix=True, stdout=out)
+        self.assertIn("0 brand_name, 0 size_key, 1 bolt_pattern mismatches (fixed)", out.getvalue())
+        self.assertEqual(Disk.objects.get(article="D0").bolt_pattern, "5x114.3")
+        call_command("check_denormalized", stdout=StringIO())
+
+    def test_brand_name_fix_refreshes_cards(self):
+        url = reverse("catalog:tire_list")
+        Tire.objects.filter(article="T0").update(brand_name="Mishelin")
+        self.assertContains(self.client.get(url), "Mishelin")
+        call_command("check_denormalized", fix=True, stdout=StringIO())
+        self.assertNotContains(self.client.get(url), "Mishelin")
@@ -6,10 +6,12 @@ app_name = "catalog"
 
 urlpatterns = [
     # XML feeds for price aggregators
-    path("storage/e-katalog/price.xml", feeds.generate_ekatalog_xml, name="ekatalog_feed"),
-    path("feed/price.xml", feeds.generate_ekatalog_xml, name="price_feed"),
+    path("storage/e-katalog/price.xml", feeds.feed, name="ekatalog_feed"),
+    path("feed/price.xml", feeds.feed, name="price_feed"),
+    path("feed/<slug:feed_format>.xml", feeds.feed, name="marketplace_feed"),
     path("", views.index, name="index"),
     path("search/", views.search, name="search"),
+    path("search/suggest/", views.search_suggest, name="search_suggest"),
     path("tires/", views.tire_list, name="tire_list"),
     re_path(r"^tires/(?P<slug>[\w.-]+)/$", views.tire_detail, name="tire_detail"),
     path("disks/", views.disk_list, name="disk_list"),
@@ -29,7 +31,9 @@ urlpatterns = [
     path("one-click-order/", views.one_click_order, name="one_click_order"),
     # Calculators
     path("calculator/", views.tire_calculator, name="calculator"),
+    path("calculator/equivalents/", views.calculator_equivalents, name="calculator_equivalents"),
     path("calculator/by-car/", views.calculator_by_car, name="calculator_by_car"),
+    path("calculator/tree/", views.calculator_tree, name="calculator_tree"),
     path("calculator/models/", views.calculator_get_models, name="calculator_models"),
     path("calculator/years/", views.calculator_get_years, name="calculator_years"),
     path("calculator/modifications/", views.calculator_get_modifications, name="calculator_modifications"),
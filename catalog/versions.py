@@ -0,0 +1,89 @@
+"""
+Cross-process version stamps for catalog data.
+
+Each gunicorn worker keeps its own in-memory indexes (autocomplete, fitment
+tree, ...). They need a cheap way to learn that the data changed in another
+process, so every data set has a version stamp stored in a small file under
+CATALOG_STATE_DIR. Readers compare stamps; writers bump them.
+
+    CATALOG = "catalog"   # tires, disks, brands, suppliers
+    FITMENT = "fitment"   # car fitment data
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.dispatch import Signal
+
+CATALOG = "catalog"
+FITMENT = "fitment"
+
+# Sent with names= after a defer_bumps() block, i.e. after a bulk change
+versions_bumped = Signal()
+
+_local = threading.local()
+
+
+def _version_file(name):
+    return os.path.join(settings.CATALOG_STATE_DIR, f"{name}.version")
+
+
+def get_version(name=CATALOG):
+    """Current version stamp, "0" if the data set was never bumped"""
+    try:
+        with open(_version_file(name), "r") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def version_time(name=CATALOG):
+    """When the data set was last bumped (the stamp file's mtime), None if never"""
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(_version_file(name)), tz=timezone.utc)
+    except FileNotFoundError:
+        return None
+
+
+def bump_version(name=CATALOG):
+    """Mark the data set as changed. Deferred inside defer_bumps()."""
+    deferred = getattr(_local, "deferred", None)
+    if deferred is not None:
+        deferred.add(name)
+        return
+
+    version = format(time.time_ns(), "x")
+    os.makedirs(settings.CATALOG_STATE_DIR, exist_ok=True)
+    path = _version_file(name)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+@contextmanager
+def defer_bumps():
+    """
+    Collapse all bumps inside the block into one per data set on exit.
+    Used by imports, which save thousands of rows. versions_bumped is sent
+    when the block completes.
+    """
+    if getattr(_local, "deferred", None) is not None:
+        # Nested: the outermost block bumps
+        yield
+        return
+
+    _local.deferred = set()
+    try:
+        yield
+    finally:
+        names = _local.deferred
+        _local.deferred = None
+        for name in names:
+            bump_version(name)
+    if names:
+        versions_bumped.send(sender=None, names=names)
@@ -1,43 +1,58 @@
 import json
 from django.core.paginator import Paginator
-from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils.cache import patch_cache_control
 from django.views.decorators.http import require_POST
 from .models import Tire, Disk, CarFitment
-
-
+from . import equivalents, fitment as fitment_data
+from .cart import (
+    get_cart, save_cart, set_quantity, set_cart_cookies, empty_cart, cart_item_count, hydrate_cart,
+)
+from .outbox import make_email, queue_mail, SHOP_EMAIL
+from .page_cache import (
+    cache_catalog_page, conditional_page, version_validators, product_validators,
+)
+from .versions import CATALOG, FITMENT
+
+
+@cache_catalog_page
 def about(request):
     """About us page."""
     return render(request, "catalog/about.html")
 
 
+@cache_catalog_page
 def delivery(request):
     """Delivery and payment page."""
     return render(request, "catalog/delivery.html")
 
 
+@cache_catalog_page
 def pre_order(request):
     """Pre-order page."""
     return render(request, "catalog/pre_order.html")
 
 
+@cache_catalog_page
 def contacts(request):
     """Contacts page."""
     return render(request, "catalog/contacts.html")
 
 
+@conditional_page(*version_validators())
+@cache_catalog_page
 def index(request):
     """
     Home page view.
     Shows featured tires and filter options for quick search.
     """
     from .models import Brand
+    from . import featured
 
-    featured_tires = Tire.objects.filter(is_featured=True)[:8]
-    if not featured_tires.exists():
-        featured_tires = Tire.objects.filter(in_stock=True).order_by('?')[:8]
-    featured_disks = Disk.objects.filter(is_featured=True)[:8]
+    # Featured products, or a random in-stock sample when none are marked
+    featured_tires = featured.featured_tires(8)
+    featured_disks = featured.featured_disks(8)
 
     # Filter options for tires (use set() for unique values)
     all_tires = Tire.objects.all()
@@ -68,9 +83,11 @@ def index(request):
     return render(request, "catalog/index.html", context)
 
 
+@conditional_page(*version_validators())
+@cache_catalog_page
 def tire_list(request):
     """List of all tires with pagination and filters."""
-    tires_qs = Tire.objects.select_related("brand").all()
+    tires_qs = Tire.objects.select_related("supplier").all()
 
     # Get filter values from request
     diameter = request.GET.get("diameter")
@@ -146,9 +163,11 @@ def tire_list(request):
     return render(request, "catalog/tire_list.html", context)
 
 
+@conditional_page(*version_validators())
+@cache_catalog_page
 def disk_list(request):
     """List of all disks with pagination and filters."""
-    disks_qs = Disk.objects.select_related("brand").all()
+    disks_qs = Disk.objects.select_related("supplier").all()
 
     # Get filter values from request
     diameter = request.GET.get("diameter")
@@ -219,42 +238,57 @@ def disk_list(request):
     return render(request, "catalog/disk_list.html", context)
 
 
+def _alternative_sections(product):
+    """(title, products) blocks shown under a product"""
+    from .alternatives import alternatives
+
+    found = alternatives(product)
+    return [
+        ("Цей розмір інших брендів", found["other_brands"]),
+        ("Дешевше", found["cheaper"]),
+        ("Дорожче", found["pricier"]),
+    ]
+
+
+@conditional_page(*product_validators(Tire))
+@cache_catalog_page
 def tire_detail(request, slug):
     """Detail page for a single tire."""
-    tire = get_object_or_404(Tire, slug=slug)
-    return render(request, "catalog/tire_detail.html", {"tire": tire})
+    tire = get_object_or_404(Tire.objects.select_related("brand", "supplier"), slug=slug)
+    return render(request, "catalog/tire_detail.html", {"tire": tire, "sections": _alternative_sections(tire)})
 
 
+@conditional_page(*product_validators(Disk))
+@cache_catalog_page
 def disk_detail(request, slug):
     """Detail page for a single disk."""
-    disk = get_object_or_404(Disk, slug=slug)
-    return render(request, "catalog/disk_detail.html", {"disk": disk})
+    disk = get_object_or_404(Disk.objects.select_related("brand", "supplier"), slug=slug)
+    return render(request, "catalog/disk_detail.html", {"disk": disk, "sections": _alternative_sections(disk)})
 
 
 def search(request):
     """Search tires and disks."""
+    from .search import search_catalog
+    from .fuzzy import correct_query
+
     query = request.GET.get("q", "").strip()
+    corrected_query = None
     tires = []
     disks = []
 
     if query:
-        # Search tires by brand name, model name, or article
-        tires = Tire.objects.filter(
-            Q(brand__name__icontains=query) |
-            Q(model_name__icontains=query) |
-            Q(article__icontains=query)
-        )[:20]
-
-        # Search disks by brand name, model name, article, or color
-        disks = Disk.objects.filter(
-            Q(brand__name__icontains=query) |
-            Q(model_name__icontains=query) |
-            Q(article__icontains=query) |
-            Q(color__icontains=query)
-        )[:20]
+        # Sizes become indexed column filters, the rest goes to full-text search
+        tires, disks = search_catalog(query, limit=20)
+
+        # Nothing found: retry with misspelled/Cyrillic brand and model words corrected
+        if not tires and not disks:
+            corrected_query = correct_query(query)
+            if corrected_query:
+                tires, disks = search_catalog(corrected_query, limit=20)
 
     context = {
         "query": query,
+        "corrected_query": corrected_query,
         "tires": tires,
         "disks": disks,
         "total_count": len(tires) + len(disks),
@@ -262,58 +296,25 @@ def search(request):
     return render(request, "catalog/search.html", context)
 
 
-# ─── Cart Functions ─────────────────────────────────────
-def get_cart(request):
-    """Get cart from session."""
-    return request.session.get("cart", {"tires": {}, "disks": {}})
+@conditional_page(*version_validators((CATALOG,), public=True))
+def search_suggest(request):
+    """AJAX: Typeahead suggestions (brands, models, sizes) for a prefix."""
+    from .suggest import suggest
 
+    query = request.GET.get("q", "").strip()[:50]
+    suggestions = []
+    if len(query) >= 2:
+        suggestions, _ = suggest(query)
 
-def save_cart(request, cart):
-    """Save cart to session."""
-    request.session["cart"] = cart
-    request.session.modified = True
+    response = JsonResponse({"q": query, "suggestions": suggestions})
+    patch_cache_control(response, public=True, max_age=300)
+    return response
 
 
+# ─── Cart Functions ─────────────────────────────────────
 def cart_view(request):
     """Display cart contents."""
-    cart = get_cart(request)
-
-    # Get tire objects
-    tire_items = []
-    for tire_id, qty in cart.get("tires", {}).items():
-        try:
-            tire = Tire.objects.get(id=tire_id)
-            tire_items.append({
-                "product": tire,
-                "quantity": qty,
-                "total": tire.price * qty,
-                "type": "tire",
-            })
-        except Tire.DoesNotExist:
-            pass
-
-    # Get disk objects
-    disk_items = []
-    for disk_id, qty in cart.get("disks", {}).items():
-        try:
-            disk = Disk.objects.get(id=disk_id)
-            disk_items.append({
-                "product": disk,
-                "quantity": qty,
-                "total": disk.price * qty,
-                "type": "disk",
-            })
-        except Disk.DoesNotExist:
-            pass
-
-    items = tire_items + disk_items
-    total = sum(item["total"] for item in items)
-
-    context = {
-        "items": items,
-        "total": total,
-        "item_count": sum(cart.get("tires", {}).values()) + sum(cart.get("disks", {}).values()),
-    }
+    context = hydrate_cart(get_cart(request))
     return render(request, "catalog/cart.html", context)
 
 
@@ -339,20 +340,17 @@ def cart_add(request):
         else:
             return JsonResponse({"success": False, "error": "Невірний тип товару"})
 
-        if product_id in cart[cart_key]:
-            cart[cart_key][product_id] += quantity
-        else:
-            cart[cart_key][product_id] = quantity
-
+        set_quantity(cart, cart_key, product_id, cart[cart_key].get(product_id, 0) + quantity)
         save_cart(request, cart)
 
-        total_items = sum(cart.get("tires", {}).values()) + sum(cart.get("disks", {}).values())
+        total_items = cart_item_count(cart)
 
-        return JsonResponse({
+        response = JsonResponse({
             "success": True,
             "message": "Товар додано до кошика",
             "cart_count": total_items,
         })
+        return set_cart_cookies(request, response)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
 
@@ -369,19 +367,16 @@ def cart_update(request):
         cart = get_cart(request)
         cart_key = "tires" if product_type == "tire" else "disks"
 
-        if quantity > 0:
-            cart[cart_key][product_id] = quantity
-        else:
-            cart[cart_key].pop(product_id, None)
-
+        set_quantity(cart, cart_key, product_id, quantity)
         save_cart(request, cart)
 
-        total_items = sum(cart.get("tires", {}).values()) + sum(cart.get("disks", {}).values())
+        total_items = cart_item_count(cart)
 
-        return JsonResponse({
+        response = JsonResponse({
             "success": True,
             "cart_count": total_items,
         })
+        return set_cart_cookies(request, response)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
 
@@ -397,32 +392,28 @@ def cart_remove(request):
         cart = get_cart(request)
         cart_key = "tires" if product_type == "tire" else "disks"
 
-        cart[cart_key].pop(product_id, None)
+        set_quantity(cart, cart_key, product_id, 0)
         save_cart(request, cart)
 
-        total_items = sum(cart.get("tires", {}).values()) + sum(cart.get("disks", {}).values())
+        total_items = cart_item_count(cart)
 
-        return JsonResponse({
+        response = JsonResponse({
             "success": True,
             "cart_count": total_items,
         })
+        return set_cart_cookies(request, response)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
 
 
 def cart_count(request):
-    """Get cart item count (for AJAX updates)."""
-    cart = get_cart(request)
-    total_items = sum(cart.get("tires", {}).values()) + sum(cart.get("disks", {}).values())
-    return JsonResponse({"count": total_items})
+    """Get cart item count (for AJAX updates). No database access with cookie storage."""
+    return JsonResponse({"count": cart_item_count(get_cart(request))})
 
 
 @require_POST
 def callback_request(request):
     """Handle callback request form submission."""
-    from django.core.mail import send_mail
-    from django.conf import settings
-
     try:
         data = json.loads(request.body)
         name = data.get("name", "").strip()
@@ -442,19 +433,8 @@ def callback_request(request):
 Питання: {question if question else "Не вказано"}
         """
 
-        # Try to send email
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@120.com.ua',
-                recipient_list=['info@120.com.ua'],
-                fail_silently=False,
-            )
-        except Exception as e:
-            # If email fails, still return success (we can log the request)
-            print(f"Email error: {e}")
-            # In production, you might want to save to database instead
+        # Delivered by the send_outbox command
+        queue_mail(make_email(subject, message, [SHOP_EMAIL]))
 
         return JsonResponse({
             "success": True,
@@ -468,9 +448,6 @@ def callback_request(request):
 @require_POST
 def one_click_order(request):
     """Handle one-click order form submission."""
-    from django.core.mail import send_mail
-    from django.conf import settings
-
     try:
         data = json.loads(request.body)
         product_type = data.get("type", "").strip()
@@ -486,15 +463,15 @@ def one_click_order(request):
 
         if product_type == "tire":
             try:
-                tire = Tire.objects.select_related("brand").get(id=product_id)
-                product_name = f"{tire.brand.name} {tire.model_name} {tire.width}/{tire.profile} R{tire.diameter}"
+                tire = Tire.objects.get(id=product_id)
+                product_name = f"{tire.brand_name} {tire.model_name} {tire.width}/{tire.profile} R{tire.diameter}"
                 product_price = f"{tire.price:.0f}"
             except Tire.DoesNotExist:
                 pass
         elif product_type == "disk":
             try:
-                disk = Disk.objects.select_related("brand").get(id=product_id)
-                product_name = f"{disk.brand.name} {disk.model_name} {disk.width}x{disk.diameter}"
+                disk = Disk.objects.get(id=product_id)
+                product_name = f"{disk.brand_name} {disk.model_name} {disk.width}x{disk.diameter}"
                 product_price = f"{disk.price:.0f}"
             except Disk.DoesNotExist:
                 pass
@@ -509,17 +486,8 @@ def one_click_order(request):
 Телефон клієнта: {phone}
         """
 
-        # Try to send email
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@120.com.ua',
-                recipient_list=['info@120.com.ua'],
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Email error: {e}")
+        # Delivered by the send_outbox command
+        queue_mail(make_email(subject, message, [SHOP_EMAIL]))
 
         return JsonResponse({
             "success": True,
@@ -532,48 +500,53 @@ def one_click_order(request):
 
 # ===== Tire Calculator =====
 
+@conditional_page(*version_validators())
+@cache_catalog_page
 def tire_calculator(request):
     """Tire size comparison calculator."""
     return render(request, "catalog/calculator.html")
 
 
+@conditional_page(*version_validators((FITMENT,)))
+@cache_catalog_page(versions=(FITMENT,))
 def calculator_by_car(request):
     """Car fitment selection page."""
-    vendors = CarFitment.objects.values_list("vendor", flat=True).distinct().order_by("vendor")
-    return render(request, "catalog/calculator_by_car.html", {"vendors": list(vendors)})
+    return render(request, "catalog/calculator_by_car.html", {"vendors": fitment_data.vendors()})
 
 
+@conditional_page(*version_validators((FITMENT,), public=True))
+def calculator_tree(request):
+    """AJAX: Whole vendor -> model -> year -> modification tree, or one vendor's part of it."""
+    from django.http import HttpResponse
+
+    content, _ = fitment_data.tree_json(request.GET.get("vendor") or None)
+    if content is None:
+        return JsonResponse({"error": "Vendor not found"}, status=404)
+    response = HttpResponse(content, content_type="application/json")
+    patch_cache_control(response, public=True, max_age=3600)
+    return response
+
+
+@conditional_page(*version_validators((FITMENT,), public=True))
 def calculator_get_models(request):
     """AJAX: Get car models for selected vendor."""
     vendor = request.GET.get("vendor", "")
     if not vendor:
         return JsonResponse({"models": []})
-
-    models = (
-        CarFitment.objects.filter(vendor=vendor)
-        .values_list("car", flat=True)
-        .distinct()
-        .order_by("car")
-    )
-    return JsonResponse({"models": list(models)})
+    return JsonResponse({"models": fitment_data.models_for(vendor)})
 
 
+@conditional_page(*version_validators((FITMENT,), public=True))
 def calculator_get_years(request):
     """AJAX: Get years for selected vendor and model."""
     vendor = request.GET.get("vendor", "")
     car = request.GET.get("car", "")
     if not vendor or not car:
         return JsonResponse({"years": []})
-
-    years = (
-        CarFitment.objects.filter(vendor=vendor, car=car)
-        .values_list("year", flat=True)
-        .distinct()
-        .order_by("year")
-    )
-    return JsonResponse({"years": list(years)})
+    return JsonResponse({"years": fitment_data.years_for(vendor, car)})
 
 
+@conditional_page(*version_validators((FITMENT,), public=True))
 def calculator_get_modifications(request):
     """AJAX: Get modifications for selected vendor, model, and year."""
     vendor = request.GET.get("vendor", "")
@@ -581,119 +554,92 @@ def calculator_get_modifications(request):
     year = request.GET.get("year", "")
     if not vendor or not car or not year:
         return JsonResponse({"modifications": []})
-
-    modifications = CarFitment.objects.filter(
-        vendor=vendor, car=car, year=year
-    ).values("id", "modification")
-
-    return JsonResponse({"modifications": list(modifications)})
+    return JsonResponse({"modifications": fitment_data.modifications_for(vendor, car, year)})
 
 
+@conditional_page(*version_validators((FITMENT, CATALOG), public=True))
 def calculator_get_fitment(request):
-    """AJAX: Get fitment data for selected car."""
+    """AJAX: Get fitment data (prepared at import) and matching in-stock tires and wheels for selected car."""
     fitment_id = request.GET.get("id", "")
     if not fitment_id:
         return JsonResponse({"error": "ID not provided"}, status=400)
 
     try:
-        fitment = CarFitment.objects.get(id=fitment_id)
-    except CarFitment.DoesNotExist:
+        # The raw size lists are only loaded by the fallback below
+        fitment = CarFitment.objects.only("id", "data_json").get(id=fitment_id)
+    except (CarFitment.DoesNotExist, ValueError):
         return JsonResponse({"error": "Fitment not found"}, status=404)
 
-    def parse_sizes(text):
-        """Parse sizes separated by | and # (front/rear)."""
-        if not text:
-            return []
-        sizes = []
-        for item in text.split("|"):
-            item = item.strip()
-            if not item:
-                continue
-            if "#" in item:
-                parts = item.split("#")
-                sizes.append({
-                    "front": parts[0].strip(),
-                    "rear": parts[1].strip() if len(parts) > 1 else parts[0].strip(),
-                    "staggered": True
-                })
-            else:
-                sizes.append({"size": item, "staggered": False})
-        return sizes
-
-    data = {
-        "car": f"{fitment.vendor} {fitment.car} {fitment.year} {fitment.modification}",
-        "pcd": fitment.pcd,
-        "center_bore": fitment.center_bore,
-        "bolt_type": fitment.bolt_type,
-        "tires": {
-            "oem": parse_sizes(fitment.oem_tires),
-            "replacement": parse_sizes(fitment.replacement_tires),
-            "tuning": parse_sizes(fitment.tuning_tires),
-        },
-        "wheels": {
-            "oem": parse_sizes(fitment.oem_wheels),
-            "replacement": parse_sizes(fitment.replacement_wheels),
-            "tuning": parse_sizes(fitment.tuning_wheels),
-        },
-    }
-
+    if fitment.data_json:
+        data = json.loads(fitment.data_json)
+    else:
+        # Imported before sizes were prepared (see rebuild_fitment command)
+        fitment = CarFitment.objects.select_related("car_model__vendor").get(id=fitment.id)
+        fitment_data.parse_wheel_specs(fitment)
+        data = fitment_data.fitment_payload(fitment)
+
+    # Stock changes more often than fitment data, so this part is live
+    data["products"] = fitment_data.matching_tires(data.pop("tire_sizes", []))
+    data["wheel_products"] = fitment_data.matching_disks(data.pop("wheel_match", None))
     return JsonResponse(data)
 
 
+@conditional_page(*version_validators((CATALOG,), public=True))
+def calculator_equivalents(request):
+    """AJAX: In-stock tire sizes with an overall diameter close to the given size."""
+    import math
+    from urllib.parse import urlencode
+    from django.urls import reverse
+    from .sizes import parse_size_query
+
+    size = parse_size_query(request.GET.get("size", ""))["tire"] or {}
+    if len(size) < 3:
+        return JsonResponse({"error": "Вкажіть розмір у форматі 205/55 R16"}, status=400)
+    try:
+        tolerance = float(request.GET.get("tolerance") or equivalents.DEFAULT_TOLERANCE)
+    except ValueError:
+        tolerance = equivalents.DEFAULT_TOLERANCE
+    # float() accepts "nan" and "inf", which the clamp below can't handle
+    if not math.isfinite(tolerance):
+        tolerance = equivalents.DEFAULT_TOLERANCE
+    tolerance = min(max(tolerance, 0), equivalents.MAX_TOLERANCE)
+
+    list_url = reverse("catalog:tire_list")
+    sizes = []
+    for match in equivalents.equivalent_sizes(size["width"], size["profile"], size["diameter"], tolerance):
+        params = {k: match[k] for k in ("width", "profile", "diameter")}
+        sizes.append({
+            "label": "{width}/{profile} R{diameter}".format(**params),
+            "overall_diameter": match["overall_diameter"],
+            "difference": match["difference"],
+            "count": match["count"],
+            "min_price": f"{match['min_price']:.0f}",
+            "url": f"{list_url}?{urlencode(params)}",
+        })
+
+    return JsonResponse({
+        "size": {
+            "label": "{width}/{profile} R{diameter}".format(**size),
+            "overall_diameter": round(equivalents.overall_diameter(**size), 1),
+        },
+        "tolerance": tolerance,
+        "sizes": sizes,
+    })
+
+
 # ===== Checkout =====
 
 def checkout(request):
     """Checkout page - order form."""
-    cart = get_cart(request)
-
-    # Get cart items
-    tire_items = []
-    for tire_id, qty in cart.get("tires", {}).items():
-        try:
-            tire = Tire.objects.get(id=tire_id)
-            tire_items.append({
-                "product": tire,
-                "quantity": qty,
-                "total": tire.price * qty,
-                "type": "tire",
-            })
-        except Tire.DoesNotExist:
-            pass
-
-    disk_items = []
-    for disk_id, qty in cart.get("disks", {}).items():
-        try:
-            disk = Disk.objects.get(id=disk_id)
-            disk_items.append({
-                "product": disk,
-                "quantity": qty,
-                "total": disk.price * qty,
-                "type": "disk",
-            })
-        except Disk.DoesNotExist:
-            pass
-
-    items = tire_items + disk_items
-
-    if not items:
+    context = hydrate_cart(get_cart(request))
+    if not context["items"]:
         return redirect("catalog:cart")
-
-    total = sum(item["total"] for item in items)
-    item_count = sum(cart.get("tires", {}).values()) + sum(cart.get("disks", {}).values())
-
-    context = {
-        "items": items,
-        "total": total,
-        "item_count": item_count,
-    }
     return render(request, "catalog/checkout.html", context)
 
 
 @require_POST
 def checkout_submit(request):
-    """Process checkout form and send order email."""
-    from django.core.mail import send_mail
-    from django.conf import settings
+    """Process checkout form and queue order emails."""
     from datetime import datetime
 
     try:
@@ -713,43 +659,13 @@ def checkout_submit(request):
             return JsonResponse({"success": False, "error": "Заповніть ім'я та телефон"})
 
         # Get cart items
-        cart = get_cart(request)
-
-        tire_items = []
-        for tire_id, qty in cart.get("tires", {}).items():
-            try:
-                tire = Tire.objects.select_related("brand").get(id=tire_id)
-                tire_items.append({
-                    "name": f"{tire.brand.name} {tire.model_name} {tire.width}/{tire.profile} R{tire.diameter}",
-                    "article": tire.article,
-                    "price": tire.price,
-                    "quantity": qty,
-                    "total": tire.price * qty,
-                })
-            except Tire.DoesNotExist:
-                pass
-
-        disk_items = []
-        for disk_id, qty in cart.get("disks", {}).items():
-            try:
-                disk = Disk.objects.select_related("brand").get(id=disk_id)
-                disk_items.append({
-                    "name": f"{disk.brand.name} {disk.model_name} {disk.width}x{disk.diameter}",
-                    "article": disk.article,
-                    "price": disk.price,
-                    "quantity": qty,
-                    "total": disk.price * qty,
-                })
-            except Disk.DoesNotExist:
-                pass
-
-        all_items = tire_items + disk_items
+        contents = hydrate_cart(get_cart(request))
+        all_items = contents["items"]
 
         if not all_items:
             return JsonResponse({"success": False, "error": "Кошик порожній"})
 
-        # Calculate total
-        order_total = sum(item["total"] for item in all_items)
+        order_total = contents["total"]
 
         # Generate order number
         order_number = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -758,7 +674,7 @@ def checkout_submit(request):
         items_text = ""
         for i, item in enumerate(all_items, 1):
             items_text += f"{i}. {item['name']}\n"
-            items_text += f"   Артикул: {item['article']}\n"
+            items_text += f"   Артикул: {item['product'].article}\n"
             items_text += f"   Ціна: {item['price']:.0f} ₴ x {item['quantity']} шт = {item['total']:.0f} ₴\n\n"
 
         # Delivery method text
@@ -800,17 +716,7 @@ def checkout_submit(request):
 Замовлення з сайту 120.com.ua
         """
 
-        # Send email to shop
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=['info@120.com.ua'],
-                fail_silently=False,
-            )
-        except Exception as e:
-            print(f"Email to shop error: {e}")
+        emails = [make_email(subject, message, [SHOP_EMAIL])]
 
         # Send confirmation email to customer (if email provided)
         if email:
@@ -835,26 +741,20 @@ def checkout_submit(request):
 З повагою,
 Команда КМ/Ч 120
             """
-            try:
-                send_mail(
-                    subject=customer_subject,
-                    message=customer_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[email],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"Email to customer error: {e}")
+            emails.append(make_email(customer_subject, customer_message, [email]))
+
+        # Both emails in one INSERT; delivered by the send_outbox command
+        queue_mail(*emails)
 
         # Clear cart after successful order
-        request.session["cart"] = {"tires": {}, "disks": {}}
-        request.session.modified = True
+        save_cart(request, empty_cart())
 
-        return JsonResponse({
+        response = JsonResponse({
             "success": True,
             "message": f"Замовлення #{order_number} успішно оформлено!",
             "order_number": order_number,
         })
+        return set_cart_cookies(request, response)
 
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)})
@@ -147,6 +147,49 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 
+# Runtime state shared by all gunicorn workers (version stamps, generated files)
+CATALOG_STATE_DIR = os.getenv("CATALOG_STATE_DIR", str(BASE_DIR / "var"))
+
+# Cache - file-based so that all gunicorn workers share it
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(CATALOG_STATE_DIR, "cache"),
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+    # Rendered product cards, per worker; keyed by product id and updated_at
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "TIMEOUT": 24 * 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+# Anonymous catalog pages (see catalog/page_cache.py)
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "True") == "True"
+PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", 60 * 60))
+
+# Pre-rendered price feeds (catalog/feeds.py) are handed to nginx under this
+# internal location when set, e.g. "/_feeds/"; empty serves them from Django
+FEED_ACCEL_REDIRECT = os.getenv("FEED_ACCEL_REDIRECT", "")
+
+# Public address of the shop, used for the links in the price feeds
+SITE_URL = os.getenv("SITE_URL", "https://120.com.ua")
+
+# Price feed variants (format, type, suppliers, in_stock) kept on disk;
+# requests for further new variants are refused
+FEED_MAX_VARIANTS = int(os.getenv("FEED_MAX_VARIANTS", 200))
+
+# Shop id in the Hotline.ua price feed
+HOTLINE_FIRM_ID = os.getenv("HOTLINE_FIRM_ID", "")
+
+# Wheels fit a car when their ET is within this many mm of the factory ET
+WHEEL_ET_TOLERANCE = int(os.getenv("WHEEL_ET_TOLERANCE", 5))
+
+# Cart storage: "cookie" (signed cookie, no DB access) or "session"
+CART_STORAGE = os.getenv("CART_STORAGE", "cookie")
+
 # Logging - записує помилки у файл
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
@@ -41,6 +41,7 @@ if [ ! -f .env ]; then
 SECRET_KEY=$SECRET
 DEBUG=False
 ALLOWED_HOSTS=*
+FEED_ACCEL_REDIRECT=/_feeds/
 EOF
     echo "   .env створено"
 fi
@@ -70,6 +71,26 @@ RestartSec=3
 WantedBy=multi-user.target
 EOF
 
+# Відправка листів з черги (замовлення, зворотні дзвінки)
+sudo tee /etc/systemd/system/tireshop-mail.service > /dev/null << EOF
+[Unit]
+Description=KM/H 120 outbox sender
+After=network.target
+
+[Service]
+User=$USER
+Group=$USER
+WorkingDirectory=$DIR
+Environment="PATH=$DIR/.venv/bin"
+ExecStart=$DIR/.venv/bin/python manage.py send_outbox --loop
+
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
 # 7. Налаштувати Nginx
 echo ""
 echo ">>> Налаштування Nginx..."
@@ -90,6 +111,14 @@ server {
         expires 30d;
     }
 
+    # Pre-rendered price feeds, sent by Django via X-Accel-Redirect
+    location /_feeds/ {
+        internal;
+        alias $DIR/var/feeds/;
+        gzip_static always;
+        gunzip on;
+    }
+
     location / {
         proxy_pass http://127.0.0.1:8000;
         proxy_set_header Host \$host;
@@ -115,6 +144,8 @@ echo ">>> Запуск сервісів..."
 sudo systemctl daemon-reload
 sudo systemctl enable tireshop
 sudo systemctl restart tireshop
+sudo systemctl enable tireshop-mail
+sudo systemctl restart tireshop-mail
 sudo systemctl restart nginx
 
 echo ""
@@ -129,5 +160,6 @@ echo "  Корисні команди:"
 echo "  sudo systemctl status tireshop   - статус сайту"
 echo "  sudo systemctl restart tireshop  - перезапустити сайт"
 echo "  sudo systemctl stop tireshop     - зупинити сайт"
+echo "  sudo systemctl status tireshop-mail - відправка листів"
 echo "  journalctl -u tireshop -f        - логи в реальному часі"
 echo "========================================="